@@ -16,6 +16,7 @@ import adafruit_gps
 #Device driver and data handler modules
 import openpylivox as opl
 import pointcloudprocessor as pcp
+import slotring as sr
 
 #Function for obtaining date-time string for file naming from GPS module
 def GetTimeGPS(gps_object, attempts, delay, utc_offset):
@@ -71,15 +72,18 @@ def SensorInit(sensor_object, ret_mode):
 
         
         
-def SensorOperation(sensor_object, number_records, record_duration, shared_dt_string, data_processor_empty, gps, gps_attempts, gps_delay, hour_offset):
+def SensorOperation(sensor_object, number_records, record_duration, shared_dt_string, data_processor_empty, gps, gps_attempts, gps_delay, hour_offset,
+                    slot_ring=None):
     #Time for waiting between collections, should not be 0
     secWaitBeforeCollect = 0.1
     
     for n in range(number_records):
         #Start data stream thread
         sensor_object.dataStart_RT_B()
-        #Wait until processor is empty
-        data_processor_empty.wait()
+        #Wait until processor is empty (with a slot ring the capture thread waits for a free slot, still draining the
+        #data socket, before it latches the start time of the record)
+        if slot_ring is None:
+            data_processor_empty.wait()
         print("Main says: Beginning collection " + str(n))
         #Uncomment to use datetime() method for file name
         dt_string = GetDateTimeTest()
@@ -93,6 +97,8 @@ def SensorOperation(sensor_object, number_records, record_duration, shared_dt_st
             continue
         #Must stop/start thread for repeat collections
         sensor_object.dataStop()
+        #Packet loss and kernel drop counts for the record just captured
+        print("Main says: collection " + str(n) + " statistics: " + str(sensor_object.captureStatistics()))
     
     #Set lidar to idle state
     sensor_object.lidarSpinDown()
@@ -132,11 +138,13 @@ if __name__ == '__main__':
     # Get LiDAR parameters from config. file
     return_mode = int(conf['LiDAR Parameters']['return_mode'])
     rain_fog_suppress = bool(conf['LiDAR Parameters']['rain_fog_mode'])
+    receive_buffer_size = int(conf['LiDAR Parameters'].get('receive_buffer_size', '0'))
     
     # Get other script params from conf. file
     gps_fix_attempts = int(conf['Script Parameters']['gps_fix_attempts'])
     gps_fix_delay = int(conf['Script Parameters']['gps_fix_delay'])
     utc_hour_offset = int(conf['Script Parameters']['timezone_offset'])
+    buffer_slots = int(conf['Script Parameters'].get('buffer_slots', '0'))
     
     
     #Calculate points per cloud for array preallocation
@@ -144,7 +152,13 @@ if __name__ == '__main__':
     #print("Points per record: ", points_per_record)
     
     # Create array in shared memory (num_points * 3 coords per point * 4 bytes per coord ==> num_points*12)
-    SHARED_DATA_ARRAY = shared_memory.SharedMemory(name='SHARED_BUFF', create=True, size=points_per_record*12)
+    # or a ring of buffer_slots such arrays so collection of a record overlaps processing of the previous one
+    SHARED_DATA_ARRAY = None
+    SLOT_RING = None
+    if buffer_slots > 0:
+        SLOT_RING = sr.SlotRing(buffer_slots, points_per_record)
+    else:
+        SHARED_DATA_ARRAY = shared_memory.SharedMemory(name='SHARED_BUFF', create=True, size=points_per_record*12)
     #print("MAIN SAYS: SHARED_DATA_ARRAY: ",SHARED_DATA_ARRAY)
     
     #Create a mp.Array to store current string
@@ -155,9 +169,11 @@ if __name__ == '__main__':
     DATA_READY_4_PROCESSING = mp.Event()
     DATA_PROCESSOR_EMPTY  = mp.Event()
     DATA_PROCESSOR_NOT_COPYING = mp.Event()
+    DATA_RECORD_CONSUMED = mp.Event()
     #Set true for initial collection blocks
     DATA_PROCESSOR_EMPTY.set()
     DATA_PROCESSOR_NOT_COPYING.set()
+    DATA_RECORD_CONSUMED.set()
     
     #!!!! COMMENT OUT OR GET RID OF IF USING GPS !!!!
     #------------------------------------------------
@@ -171,18 +187,25 @@ if __name__ == '__main__':
         #Instantiate LiDAR driver object with shared values passed as arguments
         # Optional final Boolean argument sets whether messages are printed
         sensor = opl.openpylivox(SHARED_STRING_ARRAY, NULL_POINTS, DATA_READY_4_PROCESSING, DATA_PROCESSOR_EMPTY, 
-                                 DATA_PROCESSOR_NOT_COPYING, points_per_record, True)
+                                 DATA_PROCESSOR_NOT_COPYING, points_per_record, True, slotRing=SLOT_RING,
+                                 recordConsumed=DATA_RECORD_CONSUMED)
+        #Size the data socket receive buffer before it is created in SensorInit (0 keeps the kernel default)
+        sensor.setReceiveBufferSize(receive_buffer_size)
         #Initialize sensor
         SensorInit(sensor, return_mode)
         #Instantiate data processor object with shared values passed as arguments
         data_handler = pcp.PointCloudProcessor(SHARED_STRING_ARRAY, NULL_POINTS, points_per_record, DATA_READY_4_PROCESSING,
-                                                DATA_PROCESSOR_EMPTY, DATA_PROCESSOR_NOT_COPYING)
+                                                DATA_PROCESSOR_EMPTY, DATA_PROCESSOR_NOT_COPYING, slot_ring=SLOT_RING,
+                                                record_consumed=DATA_RECORD_CONSUMED)
         #Bind run method of data processor to a separate process                                        
         data_process = mp.Process(target=data_handler.run_processing, args=(number_records,))
         data_process.start()
         #Begin LiDAR collection
         SensorOperation(sensor, number_records, record_duration, SHARED_STRING_ARRAY, DATA_PROCESSOR_EMPTY,
-                        gps, gps_fix_attempts, gps_fix_delay, utc_hour_offset)
+                        gps, gps_fix_attempts, gps_fix_delay, utc_hour_offset, slot_ring=SLOT_RING)
+        #No more records, the processor stops waiting for slots that were never filled
+        if SLOT_RING is not None:
+            SLOT_RING.finish()
         #Join data process after all collections made
         data_process.join()
        
@@ -191,8 +214,13 @@ if __name__ == '__main__':
         traceback.print_exc()
     finally:
         #Clean up shared_memory array
-        SHARED_DATA_ARRAY.close()
-        SHARED_DATA_ARRAY.unlink()
+        if SHARED_DATA_ARRAY is not None:
+            SHARED_DATA_ARRAY.close()
+            SHARED_DATA_ARRAY.unlink()
+        if SLOT_RING is not None:
+            SLOT_RING.finish()
+            SLOT_RING.close()
+            SLOT_RING.unlink()
         #print("Finally block executes")
         import sys
         sys.exit()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# Benchmark of the 3D density routines of processing_functions on recorded clouds.
+
+# Every cloud is binned over the fixed [Density3D] grid of processing_config.ini (origin_*,
+# max_distance_*, bin_size_*) by np.histogramdd (range = the grid) and by FixedBinning3D
+# (linear bin index and bincount, uint16 counts), dense and sparse, and over bins derived
+# from the data by Binning3D. The counts of FixedBinning3D are compared to histogramdd over the
+# coordinates in whole millimeters (exact edges, the resolution of the sensor), and the points
+# are checked to lie within the edges saved with the sparse grid.
+
+# Clouds are OPENPYLIVOX binary point data files (Cartesian) or .npy arrays of shape
+# (# points, 3) in meters; without files a synthetic Mid-70 record is used.
+
+#     python bench/bench_binning3d.py storm_1.bin storm_2.bin --repeat 3
+
+
+#Import necessary libraries
+import argparse
+import configparser
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import processing_functions as pf
+
+
+def loadCloud(filePathAndName):
+
+    # (# points, 3) float32 array of x,y,z in meters
+    if filePathAndName.endswith(".npy"):
+        return np.load(filePathAndName).astype('float32')[:, :3]
+
+    import openpylivox as opl
+    info, records = opl.readBinFile(filePathAndName)
+    if 'x' not in records.dtype.names:
+        raise ValueError("not a Cartesian point data file: " + filePathAndName)
+    cloud = np.column_stack([records['x'], records['y'], records['z']]).astype('float32') / 1000.0
+    if 'x2' in records.dtype.names:
+        cloud = np.concatenate([cloud, np.column_stack([records['x2'], records['y2'], records['z2']]).astype('float32') / 1000.0])
+    return cloud
+
+
+def syntheticCloud(num_points):
+
+    import livoxemulator as emu
+    points = emu._syntheticPoints(num_points, 2, 5.0, 0.01)
+    points = points[points['y'] != 0]
+    return np.column_stack([points['x'], points['y'], points['z']]).astype('float32') / 1000.0
+
+
+def timeCall(repeat, function, *args):
+
+    best = None
+    for _ in range(repeat):
+        callTime = time.perf_counter()
+        result = function(*args)
+        callTime = time.perf_counter() - callTime
+        best = callTime if best is None else min(best, callTime)
+    return best, result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="np.histogramdd against the fixed-edge bincount path of FixedBinning3D")
+    parser.add_argument("files", nargs="*", help="OPENPYLIVOX .bin files or .npy point arrays (synthetic record if none)")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "processing_config.ini"),
+                        help="processing_config.ini with the [Density3D] grid")
+    parser.add_argument("--points", type=int, default=300000, help="points of the synthetic record")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    conf = configparser.ConfigParser()
+    conf.read(args.config)
+    density = conf['Density3D']
+    bin_sizes = tuple(float(density['bin_size_' + axis]) for axis in 'xyz')
+    extents = tuple(float(density['max_distance_' + axis]) for axis in 'xyz')
+    origin = tuple(float(density.get('origin_' + axis, '0')) for axis in 'xyz')
+    num_bins = tuple(int(round(e / s)) for e, s in zip(extents, bin_sizes))
+    grid_range = [(o, o + n * s) for o, n, s in zip(origin, num_bins, bin_sizes)]
+    print("grid " + "x".join(str(n) for n in num_bins) + " voxels from " + str(origin) + "\n")
+
+    clouds = [(path, loadCloud(path)) for path in args.files]
+    if not clouds:
+        clouds = [("synthetic Mid-70 record", syntheticCloud(args.points))]
+
+    for name, cloud in clouds:
+        print(name + ": " + str(len(cloud)) + " points")
+        histTime, (hist, _) = timeCall(args.repeat, np.histogramdd, cloud, num_bins, grid_range)
+        denseTime, dense = timeCall(args.repeat, pf.FixedBinning3D, cloud, origin, bin_sizes, num_bins, 'uint16', 'dense')
+        sparseTime, sparse = timeCall(args.repeat, pf.FixedBinning3D, cloud, origin, bin_sizes, num_bins, 'uint16', 'sparse')
+        dataTime, _ = timeCall(args.repeat, pf.Binning3D, cloud, bin_sizes, (False, False, False), extents)
+
+        # same grid in millimeters (histogramdd also counts points on the upper edge of the grid in its last bins)
+        cloud_mm = np.rint(cloud.astype('float64') * 1000.0)
+        hist_mm, _ = np.histogramdd(cloud_mm, num_bins, [(round(lo * 1000), round(hi * 1000)) for lo, hi in grid_range])
+        differing = int(np.count_nonzero(hist_mm != dense))
+
+        # every counted point lies within the edges of its voxel: edge <= coordinate < next edge
+        indices = [np.searchsorted(sparse.edges[d], cloud_mm[:, d] / 1000.0, side='right') - 1 for d in range(3)]
+        in_grid = np.all([(index >= 0) & (index < n) for index, n in zip(indices, num_bins)], axis=0)
+        keys = np.ravel_multi_index([index[in_grid] for index in indices], num_bins)
+        consistent = np.array_equal(np.bincount(keys, minlength=int(np.prod(num_bins))), sparse.to_dense('int64').ravel())
+        print("    histogramdd, fixed grid (float64)       {0:>8.3f} s   {1:>8.1f} MB".format(histTime, hist.nbytes / 2**20))
+        print("    FixedBinning3D dense (uint16)           {0:>8.3f} s   {1:>8.1f} MB   {2:>5.1f}x".format(denseTime, dense.nbytes / 2**20, histTime / denseTime))
+        print("    FixedBinning3D sparse (uint32+uint16)   {0:>8.3f} s   {1:>8.1f} MB   {2:>5.1f}x".format(sparseTime, sparse.nbytes / 2**20, histTime / sparseTime))
+        print("    Binning3D, bins from the data           {0:>8.3f} s".format(dataTime))
+        print("    voxels differing from histogramdd in millimeters: " + str(differing) + ", counts match the saved edges: " + str(consistent)
+              + ", points counted: " + str(int(dense.sum(dtype='int64'))) + " / " + str(int(hist.sum())) + "\n")
+
+
+if __name__ == '__main__':
+    main()
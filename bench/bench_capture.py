@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# End-to-end capture benchmark against the simulated Mid-70 (src/livoxemulator.py).
+
+# For every point rate the emulator is started in its own process on localhost, then
+# openpylivox runs auto_connect, lidarSpinUp, dataStart_RT_B and saveDataToFile for one
+# record, and the capture statistics (received and missing packets, kernel drops, capture
+# thread CPU usage) are reported. The highest rate captured without loss is the maximum
+# sustainable point rate of the capture thread on this machine.
+
+#     python bench/bench_capture.py --rates 100000 200000 400000 800000 --duration 3
+
+
+#Import necessary libraries
+import argparse
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from ctypes import c_char, c_long
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import openpylivox as opl
+import livoxemulator as emu
+
+
+def _runEmulator(rate, ready, stop):
+
+    emulator = emu.Mid70Emulator("127.0.0.1", rate)
+    emulator.start()
+    ready.set()
+    stop.wait()
+    emulator.stop()
+
+
+def benchRate(rate, duration, return_mode, directory, show=False):
+
+    ready = mp.Event()
+    stop = mp.Event()
+    emulator = mp.Process(target=_runEmulator, args=(rate, ready, stop))
+    emulator.start()
+    ready.wait()
+
+    # room for the whole record plus margin, the capture thread clamps at this size
+    num_points = int(1.5 * max(rate, 100000) * duration) + 100000
+    shared = shared_memory.SharedMemory(name='SHARED_BUFF', create=True, size=num_points * 12)
+    data_ready = mp.Event()
+    processor_empty = mp.Event()
+    not_copying = mp.Event()
+    consumed = mp.Event()
+    processor_empty.set()
+    not_copying.set()
+    consumed.set()
+
+    try:
+        sensor = opl.openpylivox(mp.Array(c_char, b'YYYY-MM-DD__hh--mm--ss'), mp.Value(c_long, 0), data_ready, processor_empty,
+                                 not_copying, num_points, show, recordConsumed=consumed)
+        # a discovery broadcast can fall outside the listening window of auto_connect, try again before giving up
+        connectTime = time.perf_counter()
+        for _ in range(3):
+            sensor.auto_connect("127.0.0.1")
+            if sensor._isConnected:
+                break
+        connectTime = time.perf_counter() - connectTime
+        if not sensor._isConnected:
+            return None, None, None, None
+        sensor.lidarSpinUp()
+        sensor.setLidarReturnMode(return_mode)
+
+        sensor.dataStart_RT_B()
+        captureTime = time.perf_counter()
+        sensor.saveDataToFile(os.path.join(directory, "bench_" + str(rate) + ".bin"), 0.1, duration)
+        while not sensor.doneCapturing():
+            continue
+        captureTime = time.perf_counter() - captureTime
+        sensor.dataStop()
+
+        stats = sensor.captureStatistics()
+        cpu = sensor.captureCPUUsage()
+        sensor.lidarSpinDown()
+        sensor.disconnect()
+    finally:
+        shared.close()
+        shared.unlink()
+        stop.set()
+        emulator.join()
+
+    return connectTime, captureTime, stats, cpu
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Capture thread throughput against the simulated Mid-70")
+    parser.add_argument("--rates", type=int, nargs="+", default=[100000, 200000, 400000, 800000], help="point rates to test (points/s)")
+    parser.add_argument("--duration", type=float, default=3.0, help="record duration (s)")
+    parser.add_argument("--return-mode", type=int, default=0, help="0 = single first, 1 = single strongest, 2 = dual")
+    parser.add_argument("--show", action="store_true", help="show openpylivox messages")
+    args = parser.parse_args()
+
+    sustainable = 0
+    with tempfile.TemporaryDirectory() as directory:
+        print("    rate (pts/s)   connect (s)   capture (s)   packets   missing   kernel drops   capture CPU (%)")
+        for rate in args.rates:
+            connectTime, captureTime, stats, cpu = benchRate(rate, args.duration, args.return_mode, directory, args.show)
+            if connectTime is None:
+                print("{0:>16d}   not connected".format(rate))
+                continue
+            if stats is None:
+                print("{0:>16d}   no record captured".format(rate))
+                continue
+            print("{0:>16d}{1:>14.2f}{2:>14.2f}{3:>10d}{4:>10d}{5:>15d}{6:>18.1f}".format(
+                rate, connectTime, captureTime, stats["packets"], stats["lost_packets"], stats["kernel_drops"], cpu))
+            if stats["lost_packets"] == 0 and stats["kernel_drops"] <= 0:
+                sustainable = max(sustainable, rate)
+
+    print("\nmaximum sustainable point rate: " + (str(sustainable) + " pts/s" if sustainable else "none of the tested rates"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# Benchmark of processing_functions.GroundVolumeMeasure against the point-by-point reference.
+
+# For every cloud size a synthetic record is generated (a snow surface about 2 m below the
+# sensor with noise, plus a fraction of falling snow / clutter points above it), the grid
+# reduction is run with the [GroundVolumeMeasure] defaults of processing_config.ini, and the
+# result (avg_elevations, air_points) is compared to the per-point min pass and thresholded
+# sum/count pass the routine used before it was vectorized. Every size is run on a cloud
+# inside the grid and on one with points beyond it and on its y edge (float32 values just
+# below max_y/2 that fall in the bin past the grid once shifted).
+
+#     python bench/bench_ground_volume.py --points 300000 1000000 3000000
+
+# The reference loops take seconds per million points (minutes on a Pi), --reference-limit skips them above
+# a cloud size.
+
+
+#Import necessary libraries
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import processing_functions as pf
+
+
+def syntheticCloud(num_points, max_x, max_y, air_fraction=0.05, outside_fraction=0.0, seed=0):
+
+    rng = np.random.default_rng(seed)
+    points = np.empty((num_points, 3), dtype='float32')
+    points[:, 0] = rng.uniform(0.0, max_x, num_points)
+    points[:, 1] = rng.uniform(-max_y / 2, max_y / 2, num_points)
+    points[:, 2] = -2.0 + 0.01 * points[:, 0] + 0.02 * rng.standard_normal(num_points)
+    air = rng.random(num_points) < air_fraction
+    points[air, 2] += rng.uniform(0.1, 1.5, int(np.count_nonzero(air)))
+
+    # points beyond the grid, half of them on its y edges
+    outside = np.flatnonzero(rng.random(num_points) < outside_fraction)
+    far, edge = outside[0::2], outside[1::2]
+    points[far, 0] = rng.uniform(0.0, 1.5 * max_x, len(far))
+    points[far, 1] = rng.uniform(-0.75 * max_y, 0.75 * max_y, len(far))
+    points[edge, 1] = np.where(rng.random(len(edge)) < 0.5, np.nextafter(np.float32(max_y / 2), np.float32(0)),
+                               np.nextafter(np.float32(-max_y / 2), np.float32(0)))
+    return points
+
+
+def referenceGroundVolume(datapoints, ground_truth_elevations, save_above_ground, bin_size, min_thresh, max_x, max_y):
+
+    # point-by-point min pass and thresholded sum/count pass (max_distance_enable = True)
+    datapoints = datapoints[(datapoints[:, 0] < max_x) & (datapoints[:, 1] < max_y / 2) & (datapoints[:, 1] > -max_y / 2)]
+    datapoints[:, 1] += max_y / 2
+
+    num_bins_x = int(max_x / bin_size)
+    num_bins_y = int(max_y / bin_size)
+    sum_z = np.zeros((num_bins_x, num_bins_y), dtype='float32')
+    min_z = np.full((num_bins_x, num_bins_y), np.inf, dtype='float32')
+    count_z = np.zeros((num_bins_x, num_bins_y), dtype='int32')
+    above_ground_mask = np.zeros(datapoints.shape[0], dtype='bool')
+
+    x_bin = np.floor(datapoints[:, 0] / bin_size).astype(int)
+    y_bin = np.floor(datapoints[:, 1] / bin_size).astype(int)
+    in_grid = (x_bin >= 0) & (x_bin < num_bins_x) & (y_bin >= 0) & (y_bin < num_bins_y)
+    x_bin = x_bin.tolist()
+    y_bin = y_bin.tolist()
+    z = datapoints[:, 2]
+
+    for p1 in range(datapoints.shape[0]):
+        if in_grid[p1]:
+            min_z[x_bin[p1], y_bin[p1]] = min(min_z[x_bin[p1], y_bin[p1]], z[p1])
+
+    for p2 in range(datapoints.shape[0]):
+        if not in_grid[p2]:
+            continue
+        if float(z[p2]) <= float(min_z[x_bin[p2], y_bin[p2]]) + min_thresh:
+            count_z[x_bin[p2], y_bin[p2]] += 1
+            sum_z[x_bin[p2], y_bin[p2]] += z[p2]
+        elif save_above_ground:
+            above_ground_mask[p2] = True
+
+    avg_height = np.zeros((num_bins_x, num_bins_y), dtype='float64')
+    np.divide(sum_z, count_z, out=avg_height, where=count_z > 0)
+    return avg_height - ground_truth_elevations, datapoints[above_ground_mask, :]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="GroundVolumeMeasure grid reduction against the point-by-point reference")
+    parser.add_argument("--points", type=int, nargs="+", default=[300000, 1000000, 3000000], help="cloud sizes to test")
+    parser.add_argument("--bin-size", type=float, default=0.1, help="bin side length (m)")
+    parser.add_argument("--min-threshold", type=float, default=0.05, help="max height above the bin minimum (m)")
+    parser.add_argument("--max-x", type=float, default=10.0, help="max distance along x (m)")
+    parser.add_argument("--max-y", type=float, default=10.0, help="max distance along y (m)")
+    parser.add_argument("--outside-fraction", type=float, default=0.02, help="fraction of points beyond the grid in the second cloud")
+    parser.add_argument("--reference-limit", type=int, default=3000000, help="largest cloud the reference loops are run on")
+    args = parser.parse_args()
+
+    ground = np.zeros((int(args.max_x / args.bin_size), int(args.max_y / args.bin_size)), dtype='float32')
+
+    print("          points      cloud   vectorized (s)   reference (s)   speedup   identical")
+    for num_points, outside_fraction in [(n, f) for n in args.points for f in (0.0, args.outside_fraction)]:
+        cloud = syntheticCloud(num_points, args.max_x, args.max_y, outside_fraction=outside_fraction)
+        label = "outside" if outside_fraction else "in grid"
+
+        # the routine's progress prints are kept out of the table
+        with contextlib.redirect_stdout(io.StringIO()):
+            vectorTime = time.perf_counter()
+            elevations, air_points = pf.GroundVolumeMeasure(cloud.copy(), ground, True, args.bin_size, args.min_threshold,
+                                                            True, args.max_x, args.max_y)
+            vectorTime = time.perf_counter() - vectorTime
+
+        if num_points > args.reference_limit:
+            print("{0:>16d}{1:>11s}{2:>17.3f}{3:>16s}".format(num_points, label, vectorTime, "skipped"))
+            continue
+
+        referenceTime = time.perf_counter()
+        refElevations, refAir = referenceGroundVolume(cloud.copy(), ground, True, args.bin_size, args.min_threshold,
+                                                      args.max_x, args.max_y)
+        referenceTime = time.perf_counter() - referenceTime
+
+        identical = np.array_equal(elevations, refElevations) and np.array_equal(air_points, refAir)
+        print("{0:>16d}{1:>11s}{2:>17.3f}{3:>16.3f}{4:>10.0f}{5:>12s}".format(
+            num_points, label, vectorTime, referenceTime, referenceTime / vectorTime, str(identical)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+
+# Module with an asyncio driver for one or many Livox sensors, built on the openpylivox
+# protocol logic (livoxcodec.py) and record decoding.
+
+# Every sensor gets three asyncio DatagramProtocol endpoints (command, point data and IMU)
+# on ephemeral ports of the computer IP, so any number of sensors can share one event loop
+# and one thread. Command requests are matched to their ACK by command set and id, with a
+# timeout and a few retries, and the heartbeat is an event loop task instead of a thread.
+# During a capture the data endpoint only keeps the raw datagrams; they are decoded into
+# OPENPYLIVOX binary file records by a worker (the loop's default thread pool, or any
+# concurrent.futures executor, e.g. a ProcessPoolExecutor on a multi-core Pi).
+
+#     async def main():
+#         sensors = [AsyncLivox(ip, "192.168.1.2") for ip in ("192.168.1.11", "192.168.1.12")]
+#         await connectAll(sensors)
+#         await asyncio.gather(*(sensor.spin_up() for sensor in sensors))
+#         records = await captureAll(sensors, 10.0, ["left.bin", "right.bin"])
+#         await asyncio.gather(*(sensor.disconnect() for sensor in sensors))
+#     asyncio.run(main())
+
+#     python livoxasync.py 127.0.0.1 127.0.0.1 --duration 2 --out /tmp
+
+# Written for the SnowMeasureLivox-NCAR project, found at:
+#     https://github.com/fwadswor/SnowMeasureLivox-NCAR
+
+
+#Import necessary libraries
+import argparse
+import asyncio
+import os
+import socket
+
+import numpy as np
+
+import livoxcodec
+import openpylivox as opl
+
+
+_SENSOR_PORT = 65000
+
+#Lidar work states reported in the heartbeat ACK
+_STATE_NORMAL = 1
+_STATE_ERROR = 4
+
+
+def packetTimestampNs(datagram):
+
+    # timestamp of a point cloud or IMU packet as integer nanoseconds (same rules as getTimestampNs)
+    timestamp_type = datagram[8]
+    if timestamp_type == 0 or timestamp_type == 1 or timestamp_type == 4:
+        return int.from_bytes(datagram[10:18], byteorder='little')
+    elif timestamp_type == 3:
+        return (datagram[13] * 3600000000 + int.from_bytes(datagram[14:18], byteorder='little')) * 1000
+    return 0
+
+
+def decodePackets(packets, firmwareType):
+
+    # decode the point cloud packets of a capture in one block, returns (data type, records, null points)
+    # the records have the dtype of the OPENPYLIVOX binary file (v2) of the firmware type / data type
+    # only packets of the first packet's data type are kept, a file holds a single data type
+    if not packets:
+        return -1, np.empty(0, dtype=opl._MID70_RECORD_DTYPE), 0
+
+    dataType = packets[0][9]
+    size = len(packets[0])
+    packets = [packet for packet in packets if len(packet) == size and packet[9] == dataType]
+    block = np.frombuffer(b''.join(packets), dtype=np.uint8).reshape(len(packets), size)
+    packet_ns = np.array([packetTimestampNs(packet) for packet in packets], dtype=np.int64)
+    fileDtype = opl._binFileDtype(firmwareType, dataType)
+
+    if firmwareType == 1 and dataType == 2:
+        # Mid-70 single return, 96 points per packet
+        points = np.ascontiguousarray(block[:, 18:18 + 96 * 14]).view(opl._MID70_POINT_DTYPE)
+        valid = points['y'] != 0
+        records = np.empty(int(np.count_nonzero(valid)), dtype=opl._MID70_RECORD_DTYPE)
+        records['point'] = points[valid]
+        records['time'] = opl._nsToSeconds((packet_ns[:, None] + opl._MID70_TIME_OFFSETS)[valid])
+        return dataType, records.view(fileDtype), valid.size - len(records)
+
+    if firmwareType == 1 and dataType == 4:
+        # Mid-70 dual return, 48 return pairs per packet
+        pairs = np.ascontiguousarray(block[:, 18:18 + 48 * 28]).view(opl._MID70_DUAL_DTYPE)
+        valid = pairs['first']['y'] != 0
+        records = np.empty(int(np.count_nonzero(valid)), dtype=opl._MID70_DUAL_RECORD_DTYPE)
+        records['pair'] = pairs[valid]
+        records['time'] = opl._nsToSeconds((packet_ns[:, None] + opl._MID70_DUAL_TIME_OFFSETS)[valid])
+        return dataType, records.view(fileDtype), valid.size - len(records)
+
+    layout = opl._BIN_RECORD_LAYOUTS.get((firmwareType, dataType))
+    if layout is None or fileDtype is None:
+        return dataType, np.empty(0, dtype=opl._MID70_RECORD_DTYPE), 0
+
+    # remaining packet types, same validity check, timestamps and return numbers as _packetRecords
+    pointSize, numPoints, checkDistance, offset, step, group, returnNum, keepAll = layout
+    recordDtype, timeOffsets, returnChars, returnNums = opl._binRecordTable(layout)
+    pointBytes = np.ascontiguousarray(block[:, 18:18 + numPoints * pointSize]).reshape(len(packets), numPoints, pointSize)
+    if checkDistance:
+        valid = np.ascontiguousarray(pointBytes[:, :, 0:4]).view('<u4')[:, :, 0] != 0
+    else:
+        valid = np.ascontiguousarray(pointBytes[:, :, 4:8]).view('<i4')[:, :, 0] != 0
+
+    records = np.empty(int(np.count_nonzero(valid)), dtype=recordDtype)
+    records['point'] = pointBytes.view('V' + str(pointSize))[:, :, 0][valid]
+    records['time'] = opl._nsToSeconds((packet_ns[:, None] + timeOffsets)[valid])
+    if returnNum:
+        records['return'] = np.broadcast_to(returnNums, valid.shape)[valid]
+    return dataType, records.view(fileDtype), valid.size - len(records)
+
+
+def decodeIMUPackets(packets):
+
+    # IMU packets to the records of the OPENPYLIVOX IMU file (gyro x,y,z, acc x,y,z, time)
+    records = np.empty(len(packets), dtype=opl._IMU_RECORD_DTYPE)
+    for i, packet in enumerate(packets):
+        records[i] = tuple(np.frombuffer(packet, dtype='<f4', count=6, offset=18)) + (opl._nsToSeconds(packetTimestampNs(packet)),)
+    return records
+
+
+def writeBinFile(filePathAndName, firmwareType, dataType, records):
+
+    # OPENPYLIVOX binary point data file (v2) of decoded capture records
+    binFile = opl._binRecordWriter(filePathAndName)
+    binFile.writeHeader(firmwareType, dataType)
+    if len(records):
+        binFile.write(records)
+    binFile.close()
+
+
+class _SensorProtocol(asyncio.DatagramProtocol):
+
+    # routes the datagrams of one endpoint to a handler of the sensor
+    def __init__(self, handler):
+        self.handler = handler
+
+    def datagram_received(self, data, addr):
+        self.handler(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc., the request retries cover it
+        pass
+
+
+class AsyncLivox(object):
+
+    def __init__(self, sensorIP, computerIP, showMessages=False, executor=None, timeout=0.5, retries=3,
+                 heartbeatInterval=1.0, receiveBuffer=8 * 1024 * 1024):
+
+        self.sensorIP = sensorIP
+        self.computerIP = computerIP
+        self.showMessages = showMessages
+        self.executor = executor
+        self.timeout = timeout
+        self.retries = retries
+        self.heartbeatInterval = heartbeatInterval
+        self.receiveBuffer = receiveBuffer
+
+        self.connected = False
+        self.firmware = "UNKNOWN"
+        self.firmwareType = 1
+        self.work_state = -1
+        self.abnormalStatus = False
+        self.dataStreaming = False
+        self.dataType = -1
+        self.nullPoints = 0
+        self.imuRecords = np.empty(0, dtype=opl._IMU_RECORD_DTYPE)
+
+        self._cmd = None
+        self._data = None
+        self._imu = None
+        self._heartbeat = None
+        self._pending = {}
+        self._stateChanged = None
+
+        # capture window (integer ns of the sensor clock) and the datagrams collected in it
+        self._capturing = False
+        self._captureStart = None
+        self._captureEnd = None
+        self._captureDelay = 0
+        self._captureLength = 0
+        self._captureDone = None
+        self._packets = []
+        self._imuPackets = []
+
+    def _message(self, text):
+        if self.showMessages: print("   " + self.sensorIP + "   " + text)
+
+    #----- endpoints -----
+
+    async def _endpoint(self, handler):
+
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _SensorProtocol(handler),
+                                                           local_addr=(self.computerIP, 0), family=socket.AF_INET)
+        return transport
+
+    def _commandReceived(self, datagram):
+
+        result, cmd_type, cmd_set, cmd_id = livoxcodec.parseFrame(datagram)
+        if result != livoxcodec.FRAME_OK:
+            return
+
+        if cmd_type == livoxcodec.CMD_TYPE_ACK:
+            payload = datagram[livoxcodec.PAYLOAD_OFFSET:-4]
+            if cmd_set == livoxcodec.CMD_SET_GENERAL and cmd_id == 3 and len(payload) >= 2 and payload[0] == 0:
+                self.work_state = payload[1]
+                self._stateChanged.set()
+                if self.work_state == _STATE_ERROR:
+                    print("   " + self.sensorIP + "   -->     *** ERROR: HEARTBEAT ERROR MESSAGE RECEIVED ***")
+            request = self._pending.get((cmd_set, cmd_id))
+            if request is not None and not request.done():
+                request.set_result(payload)
+
+        elif cmd_type == livoxcodec.CMD_TYPE_MSG and cmd_set == livoxcodec.CMD_SET_GENERAL and cmd_id == 7:
+            # not given an option to hide this message!!
+            print("   " + self.sensorIP + "   -->     *** ERROR: ABNORMAL STATUS MESSAGE RECEIVED ***")
+            self.abnormalStatus = True
+
+    def _dataReceived(self, datagram):
+
+        if not self._capturing or len(datagram) < 18:
+            return
+
+        packet_ns = packetTimestampNs(datagram)
+        if self._captureStart is None:
+            # the capture window is measured on the sensor clock, from the first packet (plus the delay)
+            self._captureStart = packet_ns + self._captureDelay
+            self._captureEnd = self._captureStart + self._captureLength
+        if packet_ns < self._captureStart:
+            return
+
+        self._packets.append(datagram)
+        if packet_ns > self._captureEnd:
+            self._capturing = False
+            if not self._captureDone.done():
+                self._captureDone.set_result(None)
+
+    def _imuReceived(self, datagram):
+
+        if self._capturing and self._captureStart is not None and len(datagram) >= 42:
+            self._imuPackets.append(datagram)
+
+    #----- commands -----
+
+    async def _request(self, frame, cmd_set, cmd_id):
+
+        # send a command and wait for its ACK, returns the ACK payload or None
+        loop = asyncio.get_running_loop()
+        key = (cmd_set, cmd_id)
+        for attempt in range(self.retries):
+            response = loop.create_future()
+            self._pending[key] = response
+            self._cmd.sendto(frame, (self.sensorIP, _SENSOR_PORT))
+            try:
+                return await asyncio.wait_for(response, self.timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                self._pending.pop(key, None)
+        return None
+
+    async def _command(self, frame, cmd_set, cmd_id, description):
+
+        # simple command with a return code, returns True if the sensor accepted it
+        payload = await self._request(frame, cmd_set, cmd_id)
+        if payload is None or len(payload) < 1:
+            self._message("-->     no response to " + description + " request")
+            return False
+        if payload[0] != 0:
+            self._message("-->     FAILED to " + description)
+            return False
+        return True
+
+    async def _heartbeatLoop(self):
+
+        while True:
+            self._cmd.sendto(livoxcodec.CMD_HEARTBEAT, (self.sensorIP, _SENSOR_PORT))
+            await asyncio.sleep(self.heartbeatInterval)
+
+    async def connect(self):
+
+        if self.connected:
+            return True
+
+        self._stateChanged = asyncio.Event()
+        self._cmd = await self._endpoint(self._commandReceived)
+        self._data = await self._endpoint(self._dataReceived)
+        self._imu = await self._endpoint(self._imuReceived)
+        dataSocket = self._data.get_extra_info('socket')
+        try:
+            dataSocket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receiveBuffer)
+        except OSError:
+            pass
+
+        ports = [transport.get_extra_info('sockname')[1] for transport in (self._data, self._cmd, self._imu)]
+        if not await self._command(livoxcodec.connectRequest(self.computerIP, *ports), 0, 1, "connect"):
+            self._close()
+            return False
+
+        self.connected = True
+        self._heartbeat = asyncio.ensure_future(self._heartbeatLoop())
+
+        # firmware version, decides how the point cloud packets are decoded
+        payload = await self._request(livoxcodec.CMD_QUERY, 0, 2)
+        if payload is not None and len(payload) >= 5 and payload[0] == 0:
+            self.firmware = str(payload[1]).zfill(2) + "." + str(payload[2]).zfill(2) + "." + str(payload[3]).zfill(2) + str(payload[4]).zfill(2)
+            self.firmwareType = opl.openpylivox._SPECIAL_FIRMWARE_TYPE_DICT.get(self.firmware, 1)
+
+        self._message("-->     connected (firmware " + self.firmware + ")")
+        return True
+
+    async def spin_up(self, timeout=30.0):
+
+        if not await self._command(livoxcodec.CMD_LIDAR_START, 1, 0, "spin up the lidar"):
+            return False
+        self._message("<--     sent lidar spin up request")
+
+        # the heartbeat reports the normal work state once the lidar is up to speed
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.work_state != _STATE_NORMAL:
+            self._stateChanged.clear()
+            try:
+                await asyncio.wait_for(self._stateChanged.wait(), max(deadline - loop.time(), 0.0))
+            except asyncio.TimeoutError:
+                self._message("-->     lidar did not reach the normal state")
+                return False
+        self._message("-->     lidar is ready")
+        return True
+
+    async def spin_down(self):
+
+        await self.data_stop()
+        return await self._command(livoxcodec.CMD_LIDAR_POWERSAVE, 1, 0, "spin down the lidar")
+
+    async def data_start(self):
+
+        if not self.dataStreaming:
+            self.dataStreaming = await self._command(livoxcodec.CMD_DATA_START, 0, 4, "start data stream")
+        return self.dataStreaming
+
+    async def data_stop(self):
+
+        if self.dataStreaming:
+            self.dataStreaming = not await self._command(livoxcodec.CMD_DATA_STOP, 0, 4, "stop data stream")
+        return not self.dataStreaming
+
+    async def set_imu_push(self, on):
+
+        frame = livoxcodec.CMD_IMU_DATA_ON if on else livoxcodec.CMD_IMU_DATA_OFF
+        return await self._command(frame, 1, 8, "set IMU push")
+
+    async def capture(self, duration, filePathAndName=None, secsToWait=0.0):
+
+        # capture duration seconds (sensor clock) of point data, decoded by the executor
+        # returns the records (OPENPYLIVOX binary file dtype), also written to filePathAndName if given
+        if not self.connected or not await self.data_start():
+            return None
+
+        loop = asyncio.get_running_loop()
+        self._packets = []
+        self._imuPackets = []
+        self._captureStart = None
+        self._captureDelay = int(round(secsToWait * 1e9))
+        self._captureLength = int(round(duration * 1e9))
+        self._captureDone = loop.create_future()
+        self._capturing = True
+        self._message("-->     CAPTURING DATA...")
+        try:
+            # give up if the stream stops, whatever was received is still decoded
+            await asyncio.wait_for(self._captureDone, duration + secsToWait + 5.0)
+        except asyncio.TimeoutError:
+            self._message("-->     * ISSUE: data stream stopped before the end of the capture")
+        finally:
+            self._capturing = False
+
+        packets, self._packets = self._packets, []
+        imuPackets, self._imuPackets = self._imuPackets, []
+        self.dataType, records, self.nullPoints = await loop.run_in_executor(self.executor, decodePackets, packets, self.firmwareType)
+        if imuPackets:
+            self.imuRecords = await loop.run_in_executor(self.executor, decodeIMUPackets, imuPackets)
+
+        if filePathAndName and self.dataType >= 0:
+            await loop.run_in_executor(self.executor, writeBinFile, filePathAndName, self.firmwareType, self.dataType, records)
+            self._message("-->     wrote " + str(len(records)) + " points to " + filePathAndName)
+
+        return records
+
+    def _close(self):
+
+        for transport in (self._cmd, self._data, self._imu):
+            if transport is not None:
+                transport.close()
+        self._cmd = self._data = self._imu = None
+
+    async def disconnect(self):
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self.connected:
+            await self._command(livoxcodec.CMD_DISCONNECT, 0, 6, "disconnect")
+            self.connected = False
+            self.dataStreaming = False
+        self._close()
+
+
+async def connectAll(sensors):
+
+    # connect several sensors concurrently, returns a list of connection results
+    return await asyncio.gather(*(sensor.connect() for sensor in sensors))
+
+
+async def captureAll(sensors, duration, filePathsAndNames=None, secsToWait=0.0):
+
+    # capture the same duration from several sensors concurrently, returns a list of records
+    if filePathsAndNames is None:
+        filePathsAndNames = [None] * len(sensors)
+    return await asyncio.gather(*(sensor.capture(duration, path, secsToWait) for sensor, path in zip(sensors, filePathsAndNames)))
+
+
+async def _run(args):
+
+    sensors = [AsyncLivox(sensorIP, args.computer_ip, not args.quiet) for sensorIP in args.sensor_ips]
+    try:
+        if not all(await connectAll(sensors)):
+            return
+        if not all(await asyncio.gather(*(sensor.spin_up() for sensor in sensors))):
+            return
+        paths = [os.path.join(args.out, "capture_" + sensor.sensorIP.replace(".", "_") + "_" + str(i) + ".bin")
+                 for i, sensor in enumerate(sensors)]
+        records = await captureAll(sensors, args.duration, paths)
+        for sensor, path, sensorRecords in zip(sensors, paths, records):
+            if sensorRecords is not None:
+                print(sensor.sensorIP + ": " + str(len(sensorRecords)) + " points, " + str(sensor.nullPoints) + " null points -> " + path)
+        await asyncio.gather(*(sensor.spin_down() for sensor in sensors))
+    finally:
+        await asyncio.gather(*(sensor.disconnect() for sensor in sensors))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Capture from one or many Livox sensors on a single asyncio event loop")
+    parser.add_argument("computer_ip", help="computer IP the sensors send their data to")
+    parser.add_argument("sensor_ips", nargs="+", help="sensor IP(s)")
+    parser.add_argument("--duration", type=float, default=1.0, help="capture duration (s)")
+    parser.add_argument("--out", default=".", help="directory of the OPENPYLIVOX binary files")
+    parser.add_argument("--quiet", action="store_true", help="hide driver messages")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# Module with the Livox SDK 1 command protocol codec shared by openpylivox, its heartbeat
+# thread and the Mid-70 emulator (livoxemulator.py).
+
+# Every command, ACK and message frame has the layout (little-endian):
+#     sof (0xAA), version (1), frame length (uint16), cmd type (0 = CMD, 1 = ACK, 2 = MSG),
+#     sequence (uint16), header crc16 (over the first 7 bytes), cmd set, cmd id, payload,
+#     frame crc32 (over everything before it)
+# The CRCs are computed on bytes directly (a 256 entry table for the CRC16, zlib for the
+# CRC32), the fixed commands are built once at import, and parseFrame checks and decodes a
+# received frame in place, returning small integers instead of per-byte copies and strings.
+
+# Written for the SnowMeasureLivox-NCAR project, found at:
+#     https://github.com/fwadswor/SnowMeasureLivox-NCAR
+
+
+#Import necessary libraries
+import struct
+import zlib
+
+
+#Frame types
+CMD_TYPE_CMD = 0
+CMD_TYPE_ACK = 1
+CMD_TYPE_MSG = 2
+
+#Command sets
+CMD_SET_GENERAL = 0
+CMD_SET_LIDAR = 1
+CMD_SET_HUB = 2
+
+#parseFrame results
+FRAME_OK = 0
+FRAME_BAD = 1
+FRAME_BAD_CRC16 = 2
+FRAME_BAD_CRC32 = 3
+
+MAX_FRAME_LENGTH = 1400
+PAYLOAD_OFFSET = 11
+
+_HEADER = struct.Struct('<BBHBH')
+_CRC16 = struct.Struct('<H')
+_CRC32 = struct.Struct('<I')
+
+_CRC16_INIT = 0x4C49
+_CRC32_INIT = 0x564F580A
+
+
+def _crc16Table():
+
+    # reflected CCITT polynomial 0x1021
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _crc16Table()
+
+
+def crc16(data):
+
+    # CRC-16/CCITT, reflected, initial value 0x4C49 (Livox frame header checksum)
+    crc = _CRC16_INIT
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc32(data):
+
+    # CRC-32, reflected, initial value 0x564F580A, final xor 0xFFFFFFFF (Livox frame checksum)
+    # zlib's seed is the previous (already xor'ed) checksum, which is exactly this initial value
+    return zlib.crc32(data, _CRC32_INIT)
+
+
+def buildFrame(cmd_type, cmd_set, cmd_id, payload=b'', seq=0):
+
+    header = _HEADER.pack(0xAA, 1, 15 + len(payload), cmd_type, seq)
+    frame = header + _CRC16.pack(crc16(header)) + bytes((cmd_set, cmd_id)) + payload
+    return frame + _CRC32.pack(crc32(frame))
+
+
+def parseFrame(binData):
+
+    # returns (result, cmd type, cmd set, cmd id), the payload is binData[PAYLOAD_OFFSET:-4]
+    length = len(binData)
+    if length < 15:
+        return FRAME_BAD, -1, -1, -1
+    if _CRC16.unpack_from(binData, 7)[0] != crc16(binData[:7]):
+        return FRAME_BAD_CRC16, -1, -1, -1
+    if _CRC32.unpack_from(binData, length - 4)[0] != crc32(binData[:length - 4]):
+        return FRAME_BAD_CRC32, -1, -1, -1
+
+    sof, version, frameLength, cmd_type, _ = _HEADER.unpack_from(binData)
+    cmd_set = binData[9]
+    cmd_id = binData[10]
+    if sof != 0xAA or version != 1 or frameLength > MAX_FRAME_LENGTH or cmd_type > CMD_TYPE_MSG or cmd_set > CMD_SET_HUB:
+        return FRAME_BAD, cmd_type, cmd_set, cmd_id
+
+    return FRAME_OK, cmd_type, cmd_set, cmd_id
+
+
+#----- fixed commands (host -> sensor) -----
+
+CMD_QUERY = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x02)
+CMD_HEARTBEAT = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x03)
+CMD_DATA_STOP = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x04, b'\x00')
+CMD_DATA_START = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x04, b'\x01')
+CMD_CARTESIAN_CS = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x05, b'\x00')
+CMD_SPHERICAL_CS = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x05, b'\x01')
+CMD_DISCONNECT = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x06)
+CMD_DYNAMIC_IP = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x08, b'\x00' + bytes(4))
+CMD_REBOOT = buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x0A, b'\x00\x00')
+
+CMD_LIDAR_START = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x00, b'\x01')
+CMD_LIDAR_POWERSAVE = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x00, b'\x02')
+CMD_LIDAR_STANDBY = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x00, b'\x03')
+CMD_WRITE_ZERO_EO = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x01, bytes(24))
+CMD_READ_EXTRINSIC = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x02)
+CMD_RAIN_FOG_OFF = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x03, b'\x00')
+CMD_RAIN_FOG_ON = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x03, b'\x01')
+CMD_FAN_OFF = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x04, b'\x00')
+CMD_FAN_ON = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x04, b'\x01')
+CMD_GET_FAN = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x05)
+CMD_LIDAR_SINGLE_1ST = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x06, b'\x00')
+CMD_LIDAR_SINGLE_STRONGEST = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x06, b'\x01')
+CMD_LIDAR_DUAL = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x06, b'\x02')
+CMD_IMU_DATA_OFF = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x08, b'\x00')
+CMD_IMU_DATA_ON = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x08, b'\x01')
+CMD_GET_IMU = buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x09)
+
+
+#----- parameterised commands -----
+
+def connectRequest(computerIP, dataPort, cmdPort, imuPort):
+
+    # handshake: computer IP followed by the data, command and IMU ports
+    payload = bytes(int(part) for part in computerIP.split(".")) + struct.pack('<HHH', dataPort, cmdPort, imuPort)
+    return buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x01, payload)
+
+
+def staticIPRequest(ipAddress):
+
+    payload = b'\x01' + bytes(int(part) for part in ipAddress.split("."))
+    return buildFrame(CMD_TYPE_CMD, CMD_SET_GENERAL, 0x08, payload)
+
+
+def extrinsicRequest(x_mm, y_mm, z_mm, roll, pitch, yaw):
+
+    # angles (float32, degrees) come before the offsets (int32, millimeters) in the payload
+    payload = struct.pack('<fffiii', roll, pitch, yaw, x_mm, y_mm, z_mm)
+    return buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x01, payload)
+
+
+def utcRequest(year, month, day, hour, microsec):
+
+    # year is counted from 2000, microsec from the start of the hour
+    payload = struct.pack('<BBBBI', year, month, day, hour, microsec)
+    return buildFrame(CMD_TYPE_CMD, CMD_SET_LIDAR, 0x0A, payload)
+
+
+def ack(cmd_set, cmd_id, payload=b'\x00'):
+
+    return buildFrame(CMD_TYPE_ACK, cmd_set, cmd_id, payload)
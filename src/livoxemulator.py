@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+# Module with a simulated Livox Mid-70 for running openpylivox without the sensor hardware.
+
+# The emulator binds its command port (65000) on a local address, broadcasts the Livox
+# discovery message to port 55000 five times a second (auto_connect listens for 1 s) and
+# answers the command set that openpylivox sends (handshake, query, heartbeat, sampling
+# start/stop, lidar mode, return mode, rain-fog suppression, fan, IMU push, extrinsics,
+# disconnect). While sampling is on it streams synthetic dataType 2 (single return) or
+# dataType 4 (dual return) point cloud packets to the data port given in the handshake, at a
+# configurable point rate, or replays the datagrams of a raw capture file (rawcapture.py) in
+# place of the synthetic stream.
+
+# Typical use (the computer IP given to auto_connect must be the emulator's local address):
+#     python livoxemulator.py --rate 300000
+#     sensor.auto_connect('127.0.0.1')
+
+# Written for the SnowMeasureLivox-NCAR project, found at:
+#     https://github.com/fwadswor/SnowMeasureLivox-NCAR
+
+
+#Import necessary libraries
+import argparse
+import select
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+import livoxcodec
+import rawcapture
+
+
+#Lidar work states reported in the heartbeat ACK
+_STATE_INIT = 0
+_STATE_NORMAL = 1
+_STATE_POWERSAVE = 2
+_STATE_STANDBY = 3
+
+#Mid-70 point cloud packet: 18 byte header and 96 points (dataType 2) or 48 point pairs (dataType 4)
+_POINTS_PER_PACKET = 96
+_POINT_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('z', '<i4'), ('reflectivity', 'u1'), ('tag', 'u1')])
+
+
+_ack = livoxcodec.ack
+
+
+def _syntheticPoints(num_points, dataType, range_m, null_fraction, seed=0):
+
+    # points scattered over the Mid-70's 70.4 deg circular field of view, hitting a surface
+    # about range_m in front of the sensor (x axis), with a fraction of null (all zero) returns
+    rng = np.random.default_rng(seed)
+    radius = np.radians(35.2) * np.sqrt(rng.random(num_points))
+    angle = 2 * np.pi * rng.random(num_points)
+    distance = range_m + 0.02 * rng.standard_normal(num_points)
+
+    points = np.zeros(num_points, dtype=_POINT_DTYPE)
+    points['x'] = np.round(1000 * distance)
+    points['y'] = np.round(1000 * distance * np.tan(radius * np.cos(angle)))
+    points['z'] = np.round(1000 * distance * np.tan(radius * np.sin(angle)))
+    points['reflectivity'] = rng.integers(0, 256, num_points)
+    # y == 0 marks a null point for openpylivox
+    points['y'][points['y'] == 0] = 1
+
+    if dataType == 4:
+        # second return slightly behind the first, tagged as second return
+        pairs = points.reshape(-1, 2)
+        pairs[:, 1] = pairs[:, 0]
+        pairs[:, 1]['x'] += 50
+        pairs[:, 0]['tag'] = 0x10
+        pairs[:, 1]['tag'] = 0x20
+
+    null = rng.random(num_points) < null_fraction
+    if dataType == 4:
+        null = np.repeat(null[::2], 2)
+    points[null] = 0
+
+    return points
+
+
+class Mid70Emulator(object):
+
+    def __init__(self, ip="127.0.0.1", rate=100000, serial="3WEDH760010000", ipRangeCode=1, broadcastIP="127.0.0.1",
+                 range_m=5.0, null_fraction=0.01, num_pool_packets=256, showMessages=False, replayFile=None, replaySpeed=1.0):
+
+        self.ip = ip
+        # points per second (both returns counted in dual return mode), 0 = send as fast as possible
+        self.rate = rate
+        self.serial = serial
+        self.ipRangeCode = ipRangeCode
+        self.broadcastIP = broadcastIP
+        self.range_m = range_m
+        self.null_fraction = null_fraction
+        self.num_pool_packets = num_pool_packets
+        self._showMessages = showMessages
+        # raw capture replayed (once per sampling start) instead of the synthetic stream, speed 0 = as fast as possible
+        self.replayFile = replayFile
+        self.replaySpeed = replaySpeed
+
+        self.firmware = (3, 10, 0, 0)
+        self.work_state = _STATE_NORMAL
+        self.return_mode = 0
+        self.rain_fog = 0
+        self.fan = 1
+        self.imu_push = 0
+        self.extrinsic = (0.0, 0.0, 0.0, 0, 0, 0)
+
+        self.host = None
+        self.imuPort = -1
+        self.sampling = False
+        self.started = False
+        self.packets_sent = 0
+
+        self._pools = {}
+        self._cmdSocket = None
+        self._dataSocket = None
+        self._cmdThread = None
+        self._dataThread = None
+
+    #----- lifetime -----
+
+    def start(self):
+
+        self._cmdSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._cmdSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._cmdSocket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self._cmdSocket.bind((self.ip, 65000))
+        self._dataSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._dataSocket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        self._dataSocket.bind((self.ip, 0))
+
+        # packet pools are built up front so streaming only patches timestamps
+        for dataType in (2, 4):
+            self._pools[dataType] = self._buildPool(dataType)
+
+        self.started = True
+        self._cmdThread = threading.Thread(target=self._commandLoop, args=())
+        self._cmdThread.daemon = True
+        self._cmdThread.start()
+        self._dataThread = threading.Thread(target=self._dataLoop, args=())
+        self._dataThread.daemon = True
+        self._dataThread.start()
+
+        if self._showMessages: print("Livox Mid-70 emulator running at IP: " + self.ip + " (" + str(self.rate) + " points/s)")
+
+    def stop(self):
+
+        self.started = False
+        if self._cmdThread is not None:
+            self._cmdThread.join()
+            self._dataThread.join()
+            self._cmdThread = None
+            self._dataThread = None
+        if self._cmdSocket is not None:
+            self._cmdSocket.close()
+            self._dataSocket.close()
+            self._cmdSocket = None
+            self._dataSocket = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    #----- discovery and commands -----
+
+    def _broadcastMessage(self):
+
+        # 16 byte broadcast code (serial, Mid-100 style range code digit, terminator), device type 6 = Mid-70
+        code = (self.serial[:14].ljust(14, '0') + str(self.ipRangeCode)).encode('ascii') + b'\x00'
+        return livoxcodec.buildFrame(livoxcodec.CMD_TYPE_MSG, 0, 0, code + b'\x06\x00\x00')
+
+    def _commandLoop(self):
+
+        broadcast = self._broadcastMessage()
+        nextBroadcast = 0.0
+
+        while self.started:
+            now = time.monotonic()
+            if now >= nextBroadcast and self.host is None:
+                self._cmdSocket.sendto(broadcast, (self.broadcastIP, 55000))
+                nextBroadcast = now + 0.2
+
+            if select.select([self._cmdSocket], [], [], 0.1)[0]:
+                binData, addr = self._cmdSocket.recvfrom(1500)
+                reply = self._handleCommand(binData)
+                if reply is not None:
+                    self._cmdSocket.sendto(reply, addr)
+
+    def _handleCommand(self, binData):
+
+        result, _, cmd_set, cmd_id = livoxcodec.parseFrame(binData)
+        if result != livoxcodec.FRAME_OK:
+            return None
+
+        payload = binData[livoxcodec.PAYLOAD_OFFSET:-4]
+
+        if cmd_set == 0:
+            # handshake: host IP, data port, command port, IMU port
+            if cmd_id == 1:
+                hostIP = ".".join(str(b) for b in payload[0:4])
+                dataPort, cmdPort, imuPort = struct.unpack('<HHH', payload[4:10])
+                self.host = (hostIP, dataPort)
+                self.imuPort = imuPort
+                if self._showMessages: print("   emulator   -->     handshake from " + hostIP + " (data port " + str(dataPort) + ")")
+                return _ack(0, 1)
+            # query: return code and firmware version
+            elif cmd_id == 2:
+                return _ack(0, 2, b'\x00' + bytes(self.firmware))
+            # heartbeat: return code, work state, feature message, ACK message
+            elif cmd_id == 3:
+                return _ack(0, 3, bytes((0, self.work_state, 0)) + b'\x00\x00\x00\x00')
+            # sampling start/stop
+            elif cmd_id == 4:
+                self.sampling = bool(payload[0]) and self.host is not None
+                return _ack(0, 4)
+            # coordinate system (only Cartesian is emulated)
+            elif cmd_id == 5:
+                return _ack(0, 5, b'\x00' if payload[0] == 0 else b'\x01')
+            # disconnect
+            elif cmd_id == 6:
+                self.sampling = False
+                self.host = None
+                return _ack(0, 6)
+            # dynamic/static IP, reboot
+            elif cmd_id == 8 or cmd_id == 10:
+                return _ack(0, cmd_id)
+
+        elif cmd_set == 1:
+            # lidar mode: 1 = normal, 2 = power-saving, 3 = standby
+            if cmd_id == 0:
+                mode = payload[0]
+                if mode in (_STATE_NORMAL, _STATE_POWERSAVE, _STATE_STANDBY):
+                    self.work_state = mode
+                    return _ack(1, 0)
+                return _ack(1, 0, b'\x01')
+            # write/read extrinsic parameters
+            elif cmd_id == 1:
+                self.extrinsic = struct.unpack('<fffiii', payload[0:24])
+                return _ack(1, 1)
+            elif cmd_id == 2:
+                return _ack(1, 2, b'\x00' + struct.pack('<fffiii', *self.extrinsic))
+            # rain-fog suppression
+            elif cmd_id == 3:
+                self.rain_fog = payload[0]
+                return _ack(1, 3)
+            # fan on/off and state
+            elif cmd_id == 4:
+                self.fan = payload[0]
+                return _ack(1, 4)
+            elif cmd_id == 5:
+                return _ack(1, 5, bytes((0, self.fan)))
+            # return mode: 0 = single first, 1 = single strongest, 2 = dual
+            elif cmd_id == 6:
+                if payload[0] <= 2:
+                    self.return_mode = payload[0]
+                    return _ack(1, 6)
+                return _ack(1, 6, b'\x01')
+            # IMU push on/off and state (the Mid-70 has no IMU, nothing is ever pushed)
+            elif cmd_id == 8:
+                self.imu_push = payload[0]
+                return _ack(1, 8)
+            elif cmd_id == 9:
+                return _ack(1, 9, bytes((0, self.imu_push)))
+
+        # unsupported command
+        return _ack(cmd_set, cmd_id, b'\x01')
+
+    #----- point cloud stream -----
+
+    def _buildPool(self, dataType):
+
+        points = _syntheticPoints(self.num_pool_packets * _POINTS_PER_PACKET, dataType, self.range_m, self.null_fraction)
+        points = points.reshape(self.num_pool_packets, _POINTS_PER_PACKET)
+
+        pool = []
+        for i in range(self.num_pool_packets):
+            # version 5, slot 1, lidar id 1, reserved, status 0 (all normal), timestamp type 0 (nanoseconds)
+            header = struct.pack('<BBBBIBBQ', 5, 1, 1, 0, 0, 0, dataType, 0)
+            pool.append(bytearray(header + points[i].tobytes()))
+
+        return pool
+
+    def _dataLoop(self):
+
+        while self.started:
+            if not (self.sampling and self.work_state == _STATE_NORMAL):
+                time.sleep(0.01)
+                continue
+            if self.replayFile:
+                self._replay()
+            else:
+                self._stream()
+
+    def _replay(self):
+
+        host = self.host
+        imuAddress = (host[0], self.imuPort) if self.imuPort > 0 else None
+        sent = rawcapture.replayRawCapture(self.replayFile, host, imuAddress, self.replaySpeed,
+                                           stop=lambda: not (self.started and self.sampling), sock=self._dataSocket)
+        self.packets_sent += sent
+        if self._showMessages: print("   emulator   -->     replayed " + str(sent) + " datagrams from " + self.replayFile)
+
+        # the capture is not looped (its timestamps would run backwards), stay silent until sampling is restarted
+        while self.started and self.sampling:
+            time.sleep(0.01)
+
+    def _stream(self):
+
+        dataType = 4 if self.return_mode == 2 else 2
+        pool = self._pools[dataType]
+        host = self.host
+
+        # packet timestamps follow the nominal point rate (100,000 points/s when sending unthrottled)
+        rate = self.rate if self.rate > 0 else 100000
+        packetInterval = _POINTS_PER_PACKET / float(rate)
+        packetStep = int(round(packetInterval * 1e9))
+        timestampNs = time.monotonic_ns()
+
+        startTime = time.perf_counter()
+        sent = 0
+        while self.started and self.sampling and self.work_state == _STATE_NORMAL and (self.return_mode == 2) == (dataType == 4):
+            if self.rate > 0:
+                due = int((time.perf_counter() - startTime) / packetInterval) - sent
+                if due <= 0:
+                    time.sleep(min(packetInterval, 0.001))
+                    continue
+                # do not flood the receiver with a backlog after a long stall
+                due = min(due, 256)
+            else:
+                due = 64
+
+            for i in range(due):
+                packet = pool[(self.packets_sent + i) % len(pool)]
+                struct.pack_into('<Q', packet, 10, timestampNs)
+                try:
+                    self._dataSocket.sendto(packet, host)
+                except OSError:
+                    # receiver buffer full (loopback), the packet is lost like on the wire
+                    pass
+                timestampNs += packetStep
+
+            sent += due
+            self.packets_sent += due
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Simulated Livox Mid-70 for hardware-free openpylivox runs")
+    parser.add_argument("--ip", default="127.0.0.1", help="local address to bind the command port (65000) on")
+    parser.add_argument("--broadcast-ip", default="127.0.0.1", help="address the discovery message is sent to (port 55000)")
+    parser.add_argument("--rate", type=int, default=100000, help="points per second, 0 = as fast as possible")
+    parser.add_argument("--serial", default="3WEDH760010000", help="14 character serial number")
+    parser.add_argument("--range", type=float, default=5.0, help="distance to the synthetic surface (m)")
+    parser.add_argument("--null-fraction", type=float, default=0.01, help="fraction of null points")
+    parser.add_argument("--replay", default=None, help="raw capture file to replay instead of synthetic points")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (multiple of the original), 0 = as fast as possible")
+    args = parser.parse_args()
+
+    emulator = Mid70Emulator(args.ip, args.rate, args.serial, 1, args.broadcast_ip, args.range, args.null_fraction, showMessages=True,
+                             replayFile=args.replay, replaySpeed=args.speed)
+    emulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        print("Packets sent: " + str(emulator.packets_sent))
+
+
+if __name__ == '__main__':
+    main()
@@ -21,8 +21,10 @@ Livox SDK link: https://github.com/Livox-SDK/Livox-SDK/wiki/Livox-SDK-Communicat
 """
 
 # standard modules
-import binascii
+import collections
+import json
 import select
+import selectors
 import socket
 import struct
 import threading
@@ -30,16 +32,688 @@ import multiprocessing as mp
 import time
 import sys
 import os
+import queue
 from pathlib import Path
 from multiprocessing import shared_memory
 
 # additional modules
-import crcmod
 import numpy as np
 from tqdm import tqdm
 import laspy
 from deprecated import deprecated
 
+# project modules
+import livoxcodec
+import rawcapture
+
+
+# Mid-70 point as it appears in the payload of a dataType 2 packet (14 bytes, little-endian)
+_MID70_POINT_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('z', '<i4'), ('reflectivity', 'u1'), ('tag', 'u1')])
+
+# first and second return of a Mid-70 dual return packet (dataType 4, 28 bytes)
+_MID70_DUAL_DTYPE = np.dtype([('first', _MID70_POINT_DTYPE), ('second', _MID70_POINT_DTYPE)])
+
+# valid Mid-70 point followed by its timestamp, exactly as written to the OPENPYLIVOX binary file
+_MID70_RECORD_DTYPE = np.dtype([('point', _MID70_POINT_DTYPE), ('time', '<f8')])
+_MID70_DUAL_RECORD_DTYPE = np.dtype([('pair', _MID70_DUAL_DTYPE), ('time', '<f8')])
+
+
+def _decodeMid70Single(data_pc):
+
+    # view the 96 points of a Mid-70 single return packet (dataType 2) in place, no per-point unpacking
+    points = np.frombuffer(data_pc, dtype=_MID70_POINT_DTYPE, count=96, offset=18)
+
+    # a point is null when its Y coordinate is zero (same check as the point-by-point loop)
+    valid = points['y'] != 0
+
+    return points, valid
+
+
+def _decodeMid70Dual(data_pc):
+
+    # view the 48 return pairs of a Mid-70 dual return packet (dataType 4) in place
+    pairs = np.frombuffer(data_pc, dtype=_MID70_DUAL_DTYPE, count=48, offset=18)
+
+    # a pair is null when the Y coordinate of its first return is zero (same check as the loop)
+    valid = pairs['first']['y'] != 0
+    numNull = 48 - int(np.count_nonzero(valid))
+
+    # contiguous arrays of the valid first and second returns
+    first = np.ascontiguousarray(pairs['first'][valid])
+    second = np.ascontiguousarray(pairs['second'][valid])
+
+    return first, second, valid, numNull
+
+
+# OPENPYLIVOX binary file record layouts of the remaining packet types, keyed by (firmware type, data type):
+#   point size, points per packet, null check on the distance (uint32 at 0) instead of Y (int32 at 4),
+#   time offset and step of the point timestamps, points sharing a timestamp (also the number of returns),
+#   ASCII return number appended to the record, all points kept for the Mid-100 (Cartesian only)
+# the timestamp of point i is packet timestamp + offset + (i // group) * step, as in the point-by-point loops
+_BIN_RECORD_LAYOUTS = {
+    (1, 0): (13, 100, False, 0.0, 0.00001, 1, False, True),                 # Mid-40/100 Cartesian
+    (1, 1): (9, 100, True, 0.0, 0.00001, 1, False, False),                  # Mid-40/100 Spherical
+    (1, 3): (10, 96, True, 0.00001 - 0.000004167, 0.00001, 1, False, False),  # Horizon/Tele-15 Spherical
+    (1, 5): (16, 48, True, 0.00001 - 0.000002083, 0.00001, 1, False, False),  # Horizon/Tele-15 Spherical dual
+    (2, 0): (13, 100, False, 0.0, 0.00001, 2, True, True),                  # double return Cartesian
+    (2, 1): (9, 100, True, 0.0, 0.00001, 2, True, False),                   # double return Spherical
+    (3, 0): (13, 100, False, 0.000016666 - 0.000016667, 0.000016666, 3, True, True),  # triple return Cartesian
+    (3, 1): (9, 100, True, 0.000016666 - 0.000016667, 0.000016666, 3, True, False),   # triple return Spherical
+}
+
+_BIN_RECORD_TABLES = {}
+
+# point time offsets (integer ns from the packet timestamp) of the Mid-70 single (100,000 p/s) and dual return (200,000 p/s) packets
+_MID70_TIME_OFFSETS = np.arange(96, dtype=np.int64) * 10000
+_MID70_DUAL_TIME_OFFSETS = np.arange(48, dtype=np.int64) * 5000
+
+
+def _nsToSeconds(timestamp_ns):
+
+    # integer nanoseconds (int or int64 array) to float64 seconds, whole seconds and the fraction are
+    # converted separately so large epoch timestamps are rounded only once
+    return (timestamp_ns // 1000000000) + (timestamp_ns % 1000000000) * 1e-09
+
+
+def _pointTimestamps(packet_ns, timeOffsets):
+
+    # timestamps (float64 s) of the points of a packet from the packet timestamp and the point time offsets (ns)
+    return _nsToSeconds(packet_ns + timeOffsets)
+
+
+def _binRecordTable(layout):
+
+    # record dtype, point time offsets (ns) and return number characters of a layout (built once)
+    table = _BIN_RECORD_TABLES.get(layout)
+    if table is None:
+        pointSize, numPoints, checkDistance, offset, step, group, returnNum, keepAll = layout
+        fields = [('point', 'V' + str(pointSize)), ('time', '<f8')]
+        if returnNum:
+            fields.append(('return', 'u1'))
+        index = np.arange(numPoints, dtype=np.int64)
+        returnNums = (1 + index % group).astype('u1')
+        timeOffsets = int(round(offset * 1e9)) + (index // group) * int(round(step * 1e9))
+        table = (np.dtype(fields), timeOffsets, returnNums + ord('0'), returnNums)
+        _BIN_RECORD_TABLES[layout] = table
+
+    return table
+
+
+def _packetRecords(data_pc, layout, packet_ns, keepNull=False, asciiReturn=True):
+
+    # all valid records of a packet as one structured array, returns (records, number valid, last point timestamp (s))
+    # the return number is written as an ASCII digit (binary format v1) or as a uint8 (v2)
+    pointSize, numPoints, checkDistance, offset, step, group, returnNum, keepAll = layout
+    dtype, timeOffsets, returnChars, returnNums = _binRecordTable(layout)
+    if not asciiReturn:
+        returnChars = returnNums
+
+    points = np.frombuffer(data_pc, dtype='V' + str(pointSize), count=numPoints, offset=18)
+    if keepNull and keepAll:
+        valid = slice(None)
+        numValid = numPoints
+    else:
+        if checkDistance:
+            check = np.ndarray((numPoints,), '<u4', data_pc, 18, (pointSize,))
+        else:
+            check = np.ndarray((numPoints,), '<i4', data_pc, 22, (pointSize,))
+        valid = check != 0
+        numValid = int(np.count_nonzero(valid))
+
+    records = np.empty(numValid, dtype=dtype)
+    if numValid:
+        records['point'] = points[valid]
+        records['time'] = _pointTimestamps(packet_ns, timeOffsets[valid])
+        if returnNum:
+            records['return'] = returnChars[valid]
+
+    return records, numValid, _nsToSeconds(packet_ns + int(timeOffsets[-1]))
+
+
+# OPENPYLIVOX binary point data file formats
+#   v1: "OPENPYLIVOX", firmware type (int16), data type (int16), then the records with the return number
+#       (multiple return firmware) stored as an ASCII digit
+#   v2: "OPENPYLIVOX", 0x00, version (uint16), firmware type (int16), data type (int16), size of the record
+#       description (uint32), number of records (uint64), record description (JSON of the numpy dtype.descr,
+#       padded with spaces so the records start on a 16 byte boundary), then fixed-size little-endian records
+#       with the return number stored as a uint8, the records can be mapped directly with np.memmap
+#   a v1 file always has a non-zero firmware type after the magic, a v2 file has the 0x00 marker
+_BIN_MAGIC = b"OPENPYLIVOX"
+_BIN_V2_HEADER = struct.Struct('<xHhhIQ')
+_BIN_V2_COUNT_OFFSET = len(_BIN_MAGIC) + 11
+_BIN_VERSION = 2
+
+_BIN_XYZ = [('x', '<i4'), ('y', '<i4'), ('z', '<i4')]
+_BIN_SPHERICAL = [('distance', '<u4'), ('zenith', '<u2'), ('azimuth', '<u2')]
+
+# record fields of every data class of the converters (the return field is added separately)
+_BIN_FILE_FIELDS = {
+    1: _BIN_XYZ + [('intensity', 'u1'), ('time', '<f8')],                        # Mid-40/100 Cartesian single return
+    2: _BIN_SPHERICAL + [('intensity', 'u1'), ('time', '<f8')],                  # Mid-40/100 Spherical single return
+    3: _BIN_XYZ + [('intensity', 'u1'), ('time', '<f8')],                        # Mid-40/100 Cartesian multiple return
+    4: _BIN_SPHERICAL + [('intensity', 'u1'), ('time', '<f8')],                  # Mid-40/100 Spherical multiple return
+    5: _BIN_XYZ + [('intensity', 'u1'), ('tag', 'u1'), ('time', '<f8')],         # Horizon/Tele-15/Mid-70 Cartesian single return
+    6: _BIN_SPHERICAL + [('intensity', 'u1'), ('tag', 'u1'), ('time', '<f8')],   # Horizon/Tele-15 Spherical single return
+    7: _BIN_XYZ + [('intensity', 'u1'), ('tag', 'u1'),                           # Horizon/Tele-15/Mid-70 Cartesian dual return
+       ('x2', '<i4'), ('y2', '<i4'), ('z2', '<i4'), ('intensity2', 'u1'), ('tag2', 'u1'), ('time', '<f8')],
+    8: [('zenith', '<u2'), ('azimuth', '<u2'), ('distance', '<u4'), ('intensity', 'u1'), ('tag', 'u1'),  # Horizon/Tele-15 Spherical dual return
+        ('distance2', '<u4'), ('intensity2', 'u1'), ('tag2', 'u1'), ('time', '<f8')],
+}
+
+
+def _binDataClass(firmwareType, dataType):
+
+    # data class of the converters for a firmware type and data type, 0 if not supported
+    if firmwareType == 1:
+        return {0: 1, 1: 2, 2: 5, 3: 6, 4: 7, 5: 8}.get(dataType, 0)
+    elif firmwareType == 2 or firmwareType == 3:
+        return {0: 3, 1: 4}.get(dataType, 0)
+    return 0
+
+
+def _binFileDtype(firmwareType, dataType, version=_BIN_VERSION):
+
+    # record dtype of an OPENPYLIVOX binary file, None if the firmware type / data type is not supported
+    dataClass = _binDataClass(firmwareType, dataType)
+    if not dataClass:
+        return None
+    fields = list(_BIN_FILE_FIELDS[dataClass])
+    if dataClass == 3 or dataClass == 4:
+        fields.append(('return', 'S1' if version == 1 else 'u1'))
+    return np.dtype(fields)
+
+
+def _readBinHeader(binFile):
+
+    # parse the header of an open OPENPYLIVOX binary point data file and leave the file at the first record
+    # returns a dict (version, firmwareType, dataType, dataClass, dtype, count, offset), None if not an OPL point data file
+    binFile.seek(0, os.SEEK_END)
+    fileSize = binFile.tell()
+    binFile.seek(0)
+
+    if binFile.read(len(_BIN_MAGIC)) != _BIN_MAGIC:
+        return None
+    marker = binFile.read(1)
+    if len(marker) != 1:
+        return None
+
+    if marker != b"\x00":
+        binFile.seek(len(_BIN_MAGIC))
+        firmwareType, dataType = struct.unpack('<hh', binFile.read(4))
+        version = 1
+        dtype = _binFileDtype(firmwareType, dataType, 1)
+        count = 0
+    else:
+        binFile.seek(len(_BIN_MAGIC))
+        version, firmwareType, dataType, descrSize, count = _BIN_V2_HEADER.unpack(binFile.read(_BIN_V2_HEADER.size))
+        descr = json.loads(binFile.read(descrSize).decode('UTF-8'))
+        dtype = np.dtype([tuple(field) for field in descr]) if descr else None
+
+    offset = binFile.tell()
+    if dtype is not None and dtype.itemsize:
+        # the number of records is only written when the file is closed, count from the size if it is missing
+        complete = (fileSize - offset) // dtype.itemsize
+        count = min(count, complete) if count else complete
+
+    return {"version": version, "firmwareType": firmwareType, "dataType": dataType,
+            "dataClass": _binDataClass(firmwareType, dataType), "dtype": dtype, "count": count, "offset": offset}
+
+
+def readBinFile(filePathAndName, mmap=True):
+
+    # read an OPENPYLIVOX binary point data file (v1 or v2), returns (header dict, structured array of the records)
+    # the records are memory-mapped (read only) unless mmap is False, a v1 return number is an ASCII digit ('S1')
+    with open(filePathAndName, "rb") as binFile:
+        info = _readBinHeader(binFile)
+    if info is None:
+        raise ValueError("not an OPENPYLIVOX binary point data file: " + str(filePathAndName))
+    if info["dtype"] is None:
+        raise ValueError("unsupported firmware type / data type in OPENPYLIVOX file: " + str(filePathAndName))
+
+    if info["count"] == 0:
+        records = np.empty(0, dtype=info["dtype"])
+    elif mmap:
+        records = np.memmap(filePathAndName, dtype=info["dtype"], mode='r', offset=info["offset"], shape=(info["count"],))
+    else:
+        records = np.fromfile(filePathAndName, dtype=info["dtype"], count=info["count"], offset=info["offset"])
+
+    return info, records
+
+
+class _binRecordWriter(object):
+
+    # collects the records of many packets in one preallocated buffer and writes it to the file in large blocks
+    def __init__(self, filePathAndName, bufferSize=4 * 1024 * 1024, version=_BIN_VERSION):
+        self.file = open(filePathAndName, "wb")
+        self.buffer = bytearray(max(int(bufferSize), 0))
+        self.view = memoryview(self.buffer)
+        self.used = 0
+        self.written = 0
+        self.version = version
+        self.recordSize = 0
+        self.dataStart = 0
+        # bytes of return numbers 0-3 as stored after the record timestamp
+        if version == 1:
+            self.returnBytes = [str.encode(str(i)) for i in range(4)]
+        else:
+            self.returnBytes = [bytes([i]) for i in range(4)]
+
+    def writeHeader(self, firmwareType, dataType):
+        if self.version == 1:
+            self.write(_BIN_MAGIC)
+            self.write(struct.pack('<hh', firmwareType, dataType))
+        else:
+            dtype = _binFileDtype(firmwareType, dataType, self.version)
+            descr = str.encode(json.dumps(dtype.descr if dtype is not None else []))
+            descr += b" " * (-(len(_BIN_MAGIC) + _BIN_V2_HEADER.size + len(descr)) % 16)
+            self.write(_BIN_MAGIC)
+            self.write(_BIN_V2_HEADER.pack(self.version, firmwareType, dataType, len(descr), 0))
+            self.write(descr)
+            self.recordSize = dtype.itemsize if dtype is not None else 0
+        self.dataStart = self.written
+
+    def write(self, data):
+        if isinstance(data, np.ndarray):
+            data = data.reshape(-1).view(np.uint8)
+        size = len(data)
+        self.written += size
+        if self.used + size > len(self.buffer):
+            self.flush()
+            if size > len(self.buffer):
+                self.file.write(data)
+                return
+        self.view[self.used:self.used + size] = data
+        self.used += size
+
+    def flush(self):
+        if self.used:
+            self.file.write(self.view[:self.used])
+            self.used = 0
+
+    def close(self):
+        self.flush()
+        if self.recordSize:
+            # complete the v2 header with the number of records
+            self.file.seek(_BIN_V2_COUNT_OFFSET)
+            self.file.write(struct.pack('<Q', (self.written - self.dataStart) // self.recordSize))
+        self.file.close()
+
+
+# real-time CSV capture (run_realtime_csv): CSV header and line format keyed by (firmware type, data type)
+_CSV_CAPTURE_FORMATS = {
+    (1, 0): ("//X,Y,Z,Inten-sity,Time\n", "%.3f,%.3f,%.3f,%d,%.6f\n"),
+    (1, 1): ("//Distance,Zenith,Azimuth,Inten-sity,Time\n", "%.3f,%.2f,%.2f,%d,%.6f\n"),
+    (1, 2): ("//X,Y,Z,Inten-sity,Time\n", "%.3f,%.3f,%.3f,%d,%.6f\n"),                             # Mid-70
+    (1, 4): ("//X,Y,Z,Inten-sity,Time,ReturnNum\n", "%.3f,%.3f,%.3f,%d,%.6f,%d\n"),                 # Mid-70 dual return
+    (2, 0): ("//X,Y,Z,Inten-sity,Time,ReturnNum\n", "%.3f,%.3f,%.3f,%d,%.6f,%d\n"),
+    (2, 1): ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n", "%.3f,%.2f,%.2f,%d,%.6f,%d\n"),
+    (3, 0): ("//X,Y,Z,Inten-sity,Time,ReturnNum\n", "%.3f,%.3f,%.3f,%d,%.6f,%d\n"),
+    (3, 1): ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n", "%.3f,%.2f,%.2f,%d,%.6f,%d\n"),
+}
+
+# Mid-40/100 points as they appear in the packets of data type 0 and 1
+_CSV_XYZ_POINT = np.dtype(_BIN_XYZ + [('intensity', 'u1')])
+_CSV_SPHERICAL_POINT = np.dtype(_BIN_SPHERICAL + [('intensity', 'u1')])
+
+
+def _xyzRows(points, intensity, times, numColumns):
+
+    # rows of scaled Cartesian coordinates, intensity and time, the remaining columns are left to the caller
+    rows = np.empty((len(points), numColumns), dtype=np.float64)
+    rows[:, 0] = points['x'] / 1000.0
+    rows[:, 1] = points['y'] / 1000.0
+    rows[:, 2] = points['z'] / 1000.0
+    rows[:, 3] = intensity
+    rows[:, 4] = times
+    return rows
+
+
+def _csvPacketRows(data_pc, firmwareType, dataType, packet_ns):
+
+    # CSV values of the valid points of a packet, one row per line of _CSV_CAPTURE_FORMATS
+    # returns (rows, number valid, points in the packet, last point timestamp (s))
+
+    # Mid-70 Cartesian (single return)
+    if firmwareType == 1 and dataType == 2:
+        points, valid = _decodeMid70Single(data_pc)
+        points = points[valid]
+        rows = _xyzRows(points, points['reflectivity'], _pointTimestamps(packet_ns, _MID70_TIME_OFFSETS[valid]), 5)
+        return rows, len(rows), 96, _nsToSeconds(packet_ns + int(_MID70_TIME_OFFSETS[-1]))
+
+    # Mid-70 Cartesian dual return, both returns share a timestamp
+    if firmwareType == 1 and dataType == 4:
+        first, second, valid, numNull = _decodeMid70Dual(data_pc)
+        times = _pointTimestamps(packet_ns, _MID70_DUAL_TIME_OFFSETS[valid])
+        rows = np.empty((48 - numNull, 2, 6), dtype=np.float64)
+        rows[:, 0, :] = _xyzRows(first, first['reflectivity'], times, 6)
+        rows[:, 1, :] = _xyzRows(second, second['reflectivity'], times, 6)
+        rows[:, 0, 5] = 1
+        rows[:, 1, 5] = 2
+        return rows.reshape(-1, 6), 48 - numNull, 48, _nsToSeconds(packet_ns + int(_MID70_DUAL_TIME_OFFSETS[-1]))
+
+    # Mid-40/100 single, double and triple return firmware, Cartesian or Spherical
+    layout = _BIN_RECORD_LAYOUTS[(firmwareType, dataType)]
+    numPoints = layout[1]
+    dtype, timeOffsets, returnChars, returnNums = _binRecordTable(layout)
+    numColumns = 5 if firmwareType == 1 else 6
+
+    if dataType == 0:
+        points = np.frombuffer(data_pc, dtype=_CSV_XYZ_POINT, count=numPoints, offset=18)
+        valid = points['y'] != 0
+        points = points[valid]
+        rows = _xyzRows(points, points['intensity'], _pointTimestamps(packet_ns, timeOffsets[valid]), numColumns)
+    else:
+        points = np.frombuffer(data_pc, dtype=_CSV_SPHERICAL_POINT, count=numPoints, offset=18)
+        valid = points['distance'] != 0
+        points = points[valid]
+        rows = np.empty((len(points), numColumns), dtype=np.float64)
+        rows[:, 0] = points['distance'] / 1000.0
+        rows[:, 1] = points['zenith'] / 100.0
+        rows[:, 2] = points['azimuth'] / 100.0
+        rows[:, 3] = points['intensity']
+        rows[:, 4] = _pointTimestamps(packet_ns, timeOffsets[valid])
+    if numColumns == 6:
+        rows[:, 5] = returnNums[valid]
+
+    return rows, len(rows), numPoints, _nsToSeconds(packet_ns + int(timeOffsets[-1]))
+
+
+class _csvBlockWriter(object):
+
+    # formats and writes CSV rows in a background thread, the capture thread only hands over arrays of values:
+    # rows are collected per batch and passed through a bounded queue, when the queue is full the capture
+    # thread keeps collecting and retries with the next packet, so receiving never waits on text formatting;
+    # once maxPendingBatches batches are waiting as well the collected rows are dropped (counted in droppedRows)
+    def __init__(self, filePathAndName, header, lineFormat, batchRows=8192, maxBatches=32, maxPendingBatches=4, bufferSize=1024 * 1024):
+        self.file = open(filePathAndName, "w", bufferSize)
+        self.file.write(header)
+        self.lineFormat = lineFormat
+        self.batchRows = batchRows
+        self.maxPendingRows = maxPendingBatches * batchRows
+        self.queue = queue.Queue(maxsize=maxBatches)
+        self.pending = []
+        self.pendingRows = 0
+        self.droppedRows = 0
+        self.thread = threading.Thread(target=self._run, args=())
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, rows):
+        self.pending.append(rows)
+        self.pendingRows += len(rows)
+        if self.pendingRows >= self.batchRows:
+            try:
+                self.queue.put_nowait(self.pending)
+            except queue.Full:
+                if self.pendingRows < self.maxPendingRows and self.thread.is_alive():
+                    return
+                self.droppedRows += self.pendingRows
+            self.pending = []
+            self.pendingRows = 0
+
+    def close(self):
+        if self.pending:
+            if not self._put(self.pending):
+                self.droppedRows += self.pendingRows
+            self.pending = []
+            self.pendingRows = 0
+        self._put(None)
+        self.thread.join()
+        # batches left behind by a writer thread that stopped early
+        while not self.queue.empty():
+            batch = self.queue.get_nowait()
+            if batch is not None:
+                self.droppedRows += sum(len(rows) for rows in batch)
+        self.file.close()
+
+    # blocking put that gives up once the writer thread has stopped (its queue would never drain)
+    def _put(self, item):
+        while self.thread.is_alive():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            rows = np.concatenate(batch)
+            # formatted in slices so the GIL is given back to the capture thread regularly
+            for start in range(0, len(rows), 4096):
+                block = rows[start:start + 4096]
+                self.file.write((self.lineFormat * len(block)) % tuple(block.ravel().tolist()))
+
+
+# stored ASCII capture (run): expected points per second and return, and the largest initial buffer size (points)
+_STORED_POINT_RATE = 100000
+_STORED_MAX_INITIAL_POINTS = 1 << 20
+
+
+class _pointColumns(object):
+
+    # growable numpy columns of decoded points (coordinates as the raw integers of the packet), the capacity
+    # doubles when full so appending a packet is a slice copy per column
+    _COLUMNS = (('coord1', '<i4'), ('coord2', '<i4'), ('coord3', '<i4'), ('intensity', 'u1'), ('time', '<f8'), ('returnNum', 'u1'))
+
+    def __init__(self, capacity):
+        capacity = max(int(capacity), 1024)
+        self.columns = dict((name, np.empty(capacity, dtype=dtype)) for name, dtype in self._COLUMNS)
+        self.size = 0
+
+    def _reserve(self, count):
+        capacity = len(self.columns['time'])
+        if self.size + count > capacity:
+            capacity = max(2 * capacity, self.size + count)
+            for name in self.columns:
+                grown = np.empty(capacity, dtype=self.columns[name].dtype)
+                grown[:self.size] = self.columns[name][:self.size]
+                self.columns[name] = grown
+
+    def append(self, coord1, coord2, coord3, intensity, times, returnNums):
+        count = len(times)
+        self._reserve(count)
+        end = self.size + count
+        self.columns['coord1'][self.size:end] = coord1
+        self.columns['coord2'][self.size:end] = coord2
+        self.columns['coord3'][self.size:end] = coord3
+        self.columns['intensity'][self.size:end] = intensity
+        self.columns['time'][self.size:end] = times
+        self.columns['returnNum'][self.size:end] = returnNums
+        self.size = end
+
+    def appendPacket(self, data_pc, firmwareType, dataType, packet_ns):
+
+        # store all points of a packet, returns the timestamp of its last point (s)
+
+        # Mid-70 Cartesian (single return)
+        if firmwareType == 1 and dataType == 2:
+            points = np.frombuffer(data_pc, dtype=_MID70_POINT_DTYPE, count=96, offset=18)
+            self.append(points['x'], points['y'], points['z'], points['reflectivity'], _pointTimestamps(packet_ns, _MID70_TIME_OFFSETS), 1)
+            return _nsToSeconds(packet_ns + int(_MID70_TIME_OFFSETS[-1]))
+
+        # Mid-70 Cartesian dual return, first and second returns interleaved
+        if firmwareType == 1 and dataType == 4:
+            points = np.frombuffer(data_pc, dtype=_MID70_POINT_DTYPE, count=96, offset=18)
+            self.append(points['x'], points['y'], points['z'], points['reflectivity'],
+                        _pointTimestamps(packet_ns, np.repeat(_MID70_DUAL_TIME_OFFSETS, 2)), np.tile(np.array([1, 2], dtype=np.uint8), 48))
+            return _nsToSeconds(packet_ns + int(_MID70_DUAL_TIME_OFFSETS[-1]))
+
+        # Mid-40/100 single, double and triple return firmware, Cartesian or Spherical
+        layout = _BIN_RECORD_LAYOUTS[(firmwareType, dataType)]
+        dtype, timeOffsets, returnChars, returnNums = _binRecordTable(layout)
+        if dataType == 0:
+            points = np.frombuffer(data_pc, dtype=_CSV_XYZ_POINT, count=layout[1], offset=18)
+            self.append(points['x'], points['y'], points['z'], points['intensity'], _pointTimestamps(packet_ns, timeOffsets), returnNums)
+        else:
+            points = np.frombuffer(data_pc, dtype=_CSV_SPHERICAL_POINT, count=layout[1], offset=18)
+            self.append(points['distance'], points['zenith'], points['azimuth'], points['intensity'],
+                        _pointTimestamps(packet_ns, timeOffsets), returnNums)
+        return _nsToSeconds(packet_ns + int(timeOffsets[-1]))
+
+    def writeCSV(self, csvFile, header, lineFormat, firmwareType, dataType, chunkSize=32768):
+
+        # write the non-null points in blocks, returns (points written, null points) counted like the real-time paths:
+        # a Mid-70 point is null when its Y coordinate is zero and a Mid-70 dual return pair (counted as one point)
+        # when the Y coordinate of its first return is, any other Cartesian point when all coordinates are zero,
+        # a Spherical point when its distance is zero
+        csvFile.write(header)
+        numColumns = lineFormat.count('%')
+        cartesian = dataType != 1
+        mid70 = firmwareType == 1 and dataType in (2, 4)
+        pairs = firmwareType == 1 and dataType == 4
+        if pairs:
+            chunkSize -= chunkSize % 2
+        numPts = 0
+        numNull = 0
+        for start in range(0, self.size, chunkSize):
+            end = min(start + chunkSize, self.size)
+            coord1 = self.columns['coord1'][start:end]
+            coord2 = self.columns['coord2'][start:end]
+            coord3 = self.columns['coord3'][start:end]
+            if pairs:
+                # returns are interleaved and chunks start on a pair, both rows follow the first return
+                valid = np.repeat(coord2[0::2] != 0, 2)
+            elif mid70:
+                valid = coord2 != 0
+            elif cartesian:
+                valid = (coord1 != 0) | (coord2 != 0) | (coord3 != 0)
+            else:
+                valid = coord1 != 0
+            count = int(np.count_nonzero(valid))
+            if pairs:
+                numPts += count // 2
+                numNull += (end - start - count) // 2
+            else:
+                numPts += count
+                numNull += end - start - count
+            if not count:
+                continue
+
+            rows = np.empty((count, numColumns), dtype=np.float64)
+            rows[:, 0] = coord1[valid] / 1000.0
+            rows[:, 1] = coord2[valid] / (1000.0 if cartesian else 100.0)
+            rows[:, 2] = coord3[valid] / (1000.0 if cartesian else 100.0)
+            rows[:, 3] = self.columns['intensity'][start:end][valid]
+            rows[:, 4] = self.columns['time'][start:end][valid]
+            if numColumns == 6:
+                rows[:, 5] = self.columns['returnNum'][start:end][valid]
+            csvFile.write((lineFormat * count) % tuple(rows.ravel().tolist()))
+
+        return numPts, numNull
+
+
+# fields of the 32 bit status word of a data packet (little-endian): attribute, shift, mask
+_STATUS_FIELDS = (
+    ("temp_status", 6, 3),
+    ("volt_status", 4, 3),
+    ("motor_status", 2, 3),
+    ("dirty_status", 0, 3),
+    ("firmware_status", 15, 1),
+    ("pps_status", 14, 1),
+    ("device_status", 13, 1),
+    ("fan_status", 12, 1),
+    ("self_heating_status", 11, 1),
+    ("ptp_status", 10, 1),
+    ("time_sync_status", 8, 3),
+    ("system_status", 24, 3),
+)
+
+# messages shown on a status transition: system status, attribute, value, message
+_STATUS_MESSAGES = (
+    (1, "temp_status", 1, "* WARNING: temperature *"),
+    (1, "volt_status", 1, "* WARNING: voltage *"),
+    (1, "motor_status", 1, "* WARNING: motor *"),
+    (1, "dirty_status", 1, "* WARNING: dirty or blocked *"),
+    (1, "device_status", 1, "* WARNING: approaching end of service life *"),
+    (1, "fan_status", 1, "* WARNING: fan *"),
+    (2, "temp_status", 2, "*** ERROR: TEMPERATURE ***"),
+    (2, "volt_status", 2, "*** ERROR: VOLTAGE ***"),
+    (2, "motor_status", 2, "*** ERROR: MOTOR ***"),
+    (2, "firmware_status", 1, "*** ERROR: ABNORMAL FIRMWARE ***"),
+)
+
+# status transitions kept per capture stream
+_STATUS_EVENTS_KEPT = 1000
+
+
+# non-blocking flag for recv_into (not available on every platform)
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)
+
+
+class _packetRing(object):
+
+    # preallocated receive buffer, datagrams are read in batches with recv_into so no bytes object
+    # is allocated per packet, packets are handed out as memoryview slices of the ring
+    def __init__(self, numSlots=256, slotSize=1500):
+        self.numSlots = numSlots
+        self.slotSize = slotSize
+        self.buffer = bytearray(numSlots * slotSize)
+        view = memoryview(self.buffer)
+        self.slots = [view[i * slotSize:(i + 1) * slotSize] for i in range(numSlots)]
+        self.lengths = [0] * numSlots
+        self.fillTime = 0.0
+        self.count = 0
+        self.index = 0
+
+    # read every datagram already waiting on the socket (up to the ring size), returns the number read
+    def fill(self, sock):
+        self.count = 0
+        self.index = 0
+        self.fillTime = time.time()
+        while self.count < self.numSlots:
+            if not _MSG_DONTWAIT and not select.select([sock], [], [], 0)[0]:
+                break
+            try:
+                self.lengths[self.count] = sock.recv_into(self.slots[self.count], self.slotSize, _MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                break
+            self.count += 1
+
+        return self.count
+
+    # memoryview of the next packet, only valid until the following fill()
+    def next(self):
+        i = self.index
+        self.index += 1
+        return self.slots[i][:self.lengths[i]]
+
+    def pending(self):
+        return self.count - self.index
+
+
+def _pointsToXYZ(points):
+
+    # (N, 3) block of x,y,z coordinates in meters
+    return np.column_stack((points['x'], points['y'], points['z'])) / 1000.0
+
+
+# drops counted by the kernel for a UDP socket (last column of /proc/net/udp, matched by socket inode), -1 if unavailable
+def _udpSocketDrops(sock):
+
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        for table in ("/proc/net/udp", "/proc/net/udp6"):
+            with open(table, "r") as udpFile:
+                next(udpFile)
+                for line in udpFile:
+                    fields = line.split()
+                    if len(fields) > 12 and fields[9] == inode:
+                        return int(fields[12])
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    return -1
+
+
+# names of the frame fields returned by openpylivox._parseResp
+_CMD_TYPE_NAMES = ("CMD (request)", "ACK (response)", "MSG (message)")
+_CMD_SET_NAMES = ("General", "Lidar", "Hub")
+_CMD_ID_NAMES = tuple(str(cmd_id) for cmd_id in range(256))
+
 
 class _heartbeatThread(object):
 
@@ -67,21 +741,23 @@ class _heartbeatThread(object):
                 # check for proper response from heartbeat request
                 if select.select([self.t_socket], [], [], 0.1)[0]:
                     binData, addr = self.t_socket.recvfrom(22)
-                    tempObj = openpylivox(0,0,0,0,0,True)
-                    _, ack, cmd_set, cmd_id, ret_code_bin = tempObj._parseResp(binData)
+                    result, ack, cmd_set, cmd_id = livoxcodec.parseFrame(binData)
+                    if result != livoxcodec.FRAME_OK:
+                        ack = -1
 
-                    if ack == "ACK (response)" and cmd_set == "General" and cmd_id == "3":
-                        ret_code = int.from_bytes(ret_code_bin[0], byteorder='little')
+                    if ack == livoxcodec.CMD_TYPE_ACK and cmd_set == livoxcodec.CMD_SET_GENERAL and cmd_id == 3 and len(binData) >= 17:
+                        # payload: return code, work state, feature message
+                        ret_code = binData[livoxcodec.PAYLOAD_OFFSET]
                         if ret_code != 0:
                             if self._showMessages: print("   " + self.IP + self._format_spaces + self._format_spaces + "   -->     incorrect heartbeat response")
                         else:
-                            self.work_state = int.from_bytes(ret_code_bin[1], byteorder='little')
+                            self.work_state = binData[livoxcodec.PAYLOAD_OFFSET + 1]
 
 
                             if self.work_state == 4:
                                 print("   " + self.IP + self._format_spaces + self._format_spaces + "   -->     *** ERROR: HEARTBEAT ERROR MESSAGE RECEIVED ***")
                                 sys.exit(0)
-                    elif ack == "MSG (message)" and cmd_set == "General" and cmd_id == "7":
+                    elif ack == livoxcodec.CMD_TYPE_MSG and cmd_set == livoxcodec.CMD_SET_GENERAL and cmd_id == 7:
                         # not given an option to hide this message!!
                         print("   " + self.IP + self._format_spaces + self._format_spaces + "   -->     *** ERROR: ABNORMAL STATUS MESSAGE RECEIVED ***")
                         sys.exit(1)
@@ -103,7 +779,9 @@ class _heartbeatThread(object):
 class _dataCaptureThread(object):
 
     def __init__(self, sensorIP, data_socket, imu_socket, filePathAndName, fileType, secsToWait, duration, firmwareType, showMessages, format_spaces, deviceType,
-                       data_ready_for_proc, data_processor_empty, data_processor_not_copying, num_points, null_points):
+                       data_ready_for_proc, data_processor_empty, data_processor_not_copying, num_points, null_points,
+                       vectorDecode=True, batchReceive=True, blockingReceive=True, directShared=True, slotRing=None, recordConsumed=None, rawFile="", writeBufferSize=4 * 1024 * 1024,
+                       binFormat=_BIN_VERSION):
 
         self.startTime = -1
         self.sensorIP = sensorIP
@@ -124,6 +802,32 @@ class _dataCaptureThread(object):
         self._showMessages = showMessages
         self._format_spaces = format_spaces
         self._deviceType = deviceType
+        # decode Mid-70 packets as numpy blocks (True) or with the original point-by-point loop (False)
+        self.vectorDecode = vectorDecode
+        # read data packets in batches into a preallocated ring (True) or one recvfrom per packet (False)
+        self._ring = _packetRing() if batchReceive else None
+        # size of the block buffer of the real-time binary file writer (bytes)
+        self.writeBufferSize = writeBufferSize
+        # OPENPYLIVOX binary file format version of the real-time binary files (1 or 2)
+        self.binFormat = binFormat
+        # wait for packets with a bounded blocking timeout (seconds) instead of spinning on select(..., 0)
+        self.receiveTimeout = 0.05 if blockingReceive else 0
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.d_socket, selectors.EVENT_READ)
+        self._imuWatched = False
+        # optional raw datagram recording (rawcapture format) of everything read from the data and IMU sockets
+        self._recorder = rawcapture.RawRecorder(rawFile) if rawFile else None
+        # CPU time used by the capture thread against its wall time (set when the thread finishes)
+        self.cpuTime = -1
+        self.wallTime = -1
+        # packet loss accounting for the record (see _startStatistics/_countPacket/_finishStatistics)
+        self.packets = 0
+        self.lostPackets = 0
+        self._lastPacketTime = None
+        self._packetInterval = 0
+        self._gapCounts = {}
+        self._dropsStart = -1
+        self.recordStats = None
         self.system_status = -1
         self.temp_status = -1
         self.volt_status = -1
@@ -136,6 +840,9 @@ class _dataCaptureThread(object):
         self.self_heating_status = -1
         self.ptp_status = -1
         self.time_sync_status = -1
+        # last raw status word and the timestamped status transitions of this stream
+        self._statusWord = None
+        self.statusEvents = collections.deque(maxlen=_STATUS_EVENTS_KEPT)
         #----- add mp.Event() flags as input to init of data capture class -----
         self.data_ready_for_proc_capture = data_ready_for_proc
         self.data_processor_empty_capture = data_processor_empty
@@ -143,11 +850,25 @@ class _dataCaptureThread(object):
         #----- take number of points as argument -----
         self.num_points_capture = num_points
         self.null_points_capture = null_points
-        #----- link to mp.shared_memory buffer created in main thread -----
-        self.shared_data_array_capture = shared_memory.SharedMemory(name='SHARED_BUFF')
-        #----- preallocate numpy array of appropriate size to store data as its collected -----
-        self.data_array_shared = np.ndarray((self.num_points_capture,3,), dtype='float32', buffer=self.shared_data_array_capture.buf)
-        self.data_array = np.zeros((self.num_points_capture, 3), dtype='float32')
+        # ring of shared point buffers (slotring.SlotRing), a slot is taken when capturing starts
+        self.slotRing = slotRing
+        self.slot = None
+        # decode straight into the shared segment (True) or into a private array copied over at the end (False),
+        # decoding in place needs the processor's record consumed event to know when the previous record is out
+        self.record_consumed_capture = recordConsumed
+        self.directShared = directShared and recordConsumed is not None
+        if self.slotRing is not None:
+            self.data_array_shared = None
+            self.data_array = None
+        else:
+            #----- link to mp.shared_memory buffer created in main thread -----
+            self.shared_data_array_capture = shared_memory.SharedMemory(name='SHARED_BUFF')
+            #----- preallocate numpy array of appropriate size to store data as its collected -----
+            self.data_array_shared = np.ndarray((self.num_points_capture,3,), dtype='float32', buffer=self.shared_data_array_capture.buf)
+            if self.directShared:
+                self.data_array = self.data_array_shared
+            else:
+                self.data_array = np.zeros((self.num_points_capture, 3), dtype='float32')
         print("Initializing data capture thread!")
         #print("Size of array backed by shared memory: ", self.data_array.shape)
         #print("Printing data array object: ",self.data_array)
@@ -158,15 +879,95 @@ class _dataCaptureThread(object):
         self.thread = None
 
         if self.fileType == 1:
-            self.thread = threading.Thread(target=self.run_realtime_csv, args=())
+            self.thread = threading.Thread(target=self._runMeasured, args=(self.run_realtime_csv,))
         elif self.fileType == 2:
-            self.thread = threading.Thread(target=self.run_realtime_bin, args=())
+            self.thread = threading.Thread(target=self._runMeasured, args=(self.run_realtime_bin,))
         else:
-            self.thread = threading.Thread(target=self.run, args=())
+            self.thread = threading.Thread(target=self._runMeasured, args=(self.run,))
 
         self.thread.daemon = True
         self.thread.start()
 
+    def _runMeasured(self, target):
+
+        cpuStart = time.thread_time()
+        wallStart = time.perf_counter()
+        try:
+            target()
+        finally:
+            self.cpuTime = time.thread_time() - cpuStart
+            self.wallTime = time.perf_counter() - wallStart
+            self._selector.close()
+            if self._recorder is not None:
+                self._recorder.close()
+            if self._showMessages: print("   " + self.sensorIP + self._format_spaces + "   -->     capture thread CPU usage: " + "{0:.1f}".format(self.cpuUsage()) + "%")
+
+    # CPU usage of the capture thread in percent of one core, -1 while the thread is still running
+    def cpuUsage(self):
+
+        if self.wallTime <= 0:
+            return -1
+
+        return 100.0 * self.cpuTime / self.wallTime
+
+    def _startStatistics(self):
+
+        self.packets = 0
+        self.lostPackets = 0
+        self._lastPacketTime = None
+        self._packetInterval = 0
+        self._gapCounts = {}
+        self._dropsStart = _udpSocketDrops(self.d_socket)
+
+    # counts a received data packet, missing packets are found from gaps between consecutive packet timestamps
+    def _countPacket(self, timestamp_sec):
+
+        self.packets += 1
+        lastTime = self._lastPacketTime
+        self._lastPacketTime = timestamp_sec
+        if lastTime is None:
+            return
+
+        # gaps are kept as microsecond counts, sensor timestamps are regular so only a few distinct values occur
+        gap = int(round((timestamp_sec - lastTime) * 1e6))
+        if gap <= 0:
+            return
+        count = self._gapCounts.get(gap, 0) + 1
+        self._gapCounts[gap] = count
+
+        # nominal packet interval is the most frequent gap (depends on sensor, data type and return mode), so a single
+        # short gap (timestamp resync) does not change it; when it changes the gaps seen so far are counted again
+        if gap != self._packetInterval and count > self._gapCounts.get(self._packetInterval, 0):
+            self._packetInterval = gap
+            self.lostPackets = sum((int(round(g / gap)) - 1) * n for g, n in self._gapCounts.items() if g > 1.5 * gap)
+        elif gap > 1.5 * self._packetInterval:
+            self.lostPackets += int(round(gap / self._packetInterval)) - 1
+
+    def _finishStatistics(self, numPts, nullPts):
+
+        dropsEnd = _udpSocketDrops(self.d_socket)
+        kernelDrops = -1
+        if self._dropsStart >= 0 and dropsEnd >= 0:
+            kernelDrops = dropsEnd - self._dropsStart
+
+        lostPoints = 0
+        if self.packets:
+            lostPoints = int(round(self.lostPackets * (numPts + nullPts) / self.packets))
+
+        try:
+            receiveBuffer = self.d_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        except (OSError, AttributeError):
+            receiveBuffer = -1
+
+        self.recordStats = {"file": self.filePathAndName, "points": numPts, "null_points": nullPts,
+                            "packets": self.packets, "lost_packets": self.lostPackets, "lost_points": lostPoints,
+                            "kernel_drops": kernelDrops, "kernel_drops_start": self._dropsStart, "kernel_drops_end": dropsEnd,
+                            "receive_buffer": receiveBuffer}
+
+        if self._showMessages:
+            print("   " + self.sensorIP + self._format_spaces + "   -->     packets: " + str(self.packets) + " received, " + str(self.lostPackets)
+                  + " missing (~" + str(lostPoints) + " points), kernel drops: " + str(kernelDrops))
+
     def run(self):
 
         # read point cloud data packet to get packet version and datatype
@@ -178,9 +979,8 @@ class _dataCaptureThread(object):
         while True:
 
             if self.started:
-                selectTest = select.select([self.d_socket], [], [], 0)
-                if selectTest[0]:
-                    data_pc, addr = self.d_socket.recvfrom(1500)
+                data_pc = self._nextPacket()
+                if data_pc is not None:
                     version = int.from_bytes(data_pc[0:1], byteorder='little')
                     self.dataType = int.from_bytes(data_pc[9:10], byteorder='little')
                     timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
@@ -198,18 +998,6 @@ class _dataCaptureThread(object):
             # check data packet is as expected (first byte anyways)
             if version == 5:
 
-                # lists to capture point cloud data stream info
-                # TODO: should use an object, I know, I know!
-                timestamps = []
-                timestamp_types = []
-                slot_ids = []
-                lidar_ids = []
-                coord1s = []
-                coord2s = []
-                coord3s = []
-                intensities = []
-                returnNums = []
-
                 # delayed start to capturing data check (secsToWait parameter)
                 timestamp2 = self.startTime
                 while True:
@@ -217,8 +1005,8 @@ class _dataCaptureThread(object):
                         timeSinceStart = timestamp2 - self.startTime
                         if timeSinceStart <= self.secsToWait:
                             # read data from receive buffer and keep 'consuming' it
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
                                 timestamp2 = self.getTimestamp(data_pc[10:18], timestamp_type)
                                 self.updateStatus(data_pc[4:8])
@@ -230,6 +1018,9 @@ class _dataCaptureThread(object):
 
                 if self._showMessages: print("   " + self.sensorIP + self._format_spaces + self._format_spaces + "   -->     CAPTURING DATA...")
 
+                # kernel drop counter and packet gap tracking for this record
+                self._startStatistics()
+
                 # duration adjustment (trying to get exactly 100,000 points / sec)
                 if self.duration != 126230400:
                     if self.firmwareType == 1:
@@ -240,6 +1031,15 @@ class _dataCaptureThread(object):
                         self.duration += (0.00055 * (self.duration / 2.0))
 
                 timestamp_sec = self.startTime
+
+                # decoded points of the whole capture, sized for the record and grown if needed
+                columns = None
+                csvFormat = _CSV_CAPTURE_FORMATS.get((self.firmwareType, self.dataType))
+                if csvFormat is not None:
+                    returns = 2 if (self.firmwareType, self.dataType) == (1, 4) else 1
+                    columns = _pointColumns(min(int(self.duration * _STORED_POINT_RATE * returns) + _STORED_POINT_RATE,
+                                                _STORED_MAX_INITIAL_POINTS))
+
                 # main loop that captures the desired point cloud data
                 while True:
                     if self.started:
@@ -248,12 +1048,12 @@ class _dataCaptureThread(object):
                         if timeSinceStart <= self.duration:
 
                             # read data from receive buffer
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
 
-                                version = int.from_bytes(data_pc[0:1], byteorder='little')
-                                slot_id = int.from_bytes(data_pc[1:2], byteorder='little')
-                                lidar_id = int.from_bytes(data_pc[2:3], byteorder='little')
+                                # version = int.from_bytes(data_pc[0:1], byteorder='little')
+                                # slot_id = int.from_bytes(data_pc[1:2], byteorder='little')
+                                # lidar_id = int.from_bytes(data_pc[2:3], byteorder='little')
 
                                 # byte 3 is reserved
 
@@ -261,242 +1061,13 @@ class _dataCaptureThread(object):
                                 self.updateStatus(data_pc[4:8])
 
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
-                                timestamp_sec = self.getTimestamp(data_pc[10:18], timestamp_type)
-
-                                bytePos = 18
-
-                                # single return firmware (most common)
-                                if self.firmwareType == 1:
-                                    # to account for first point's timestamp being increment in the loop
-                                    timestamp_sec -= 0.00001
-
-                                    # Cartesian Coordinate System
-                                    if self.dataType == 0:
-                                        for i in range(0, 100):
-                                            # X coordinate
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Y coordinate
-                                            coord2 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Z coordinate
-                                            coord3 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            # timestamp
-                                            timestamp_sec += 0.00001
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-
-                                    # Spherical Coordinate System
-                                    elif self.dataType == 1:
-                                        for i in range(0, 100):
-                                            # distance
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # zenith
-                                            coord2 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # azimuth
-                                            coord3 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            # timestamp
-                                            timestamp_sec += 0.00001
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-
-                                # double return firmware
-                                elif self.firmwareType == 2:
-                                    # to account for first point's timestamp being increment in the loop
-                                    timestamp_sec -= 0.00001
-
-                                    # Cartesian Coordinate System
-                                    if self.dataType == 0:
-                                        for i in range(0, 100):
-                                            returnNum = 1
-
-                                            # X coordinate
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Y coordinate
-                                            coord2 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Z coordinate
-                                            coord3 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            zeroORtwo = i % 2
-
-                                            # timestamp
-                                            timestamp_sec += float(not (zeroORtwo)) * 0.00001
-
-                                            # return number
-                                            returnNum += zeroORtwo * 1
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-                                            returnNums.append(returnNum)
-
-                                    # Spherical Coordinate System
-                                    elif self.dataType == 1:
-                                        for i in range(0, 100):
-                                            returnNum = 1
-
-                                            # distance
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # zenith
-                                            coord2 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # azimuth
-                                            coord3 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            zeroORtwo = i % 2
-
-                                            # timestamp
-                                            timestamp_sec += float(not (zeroORtwo)) * 0.00001
-
-                                            # return number
-                                            returnNum += zeroORtwo * 1
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-                                            returnNums.append(returnNum)
-
-                                # triple return firmware
-                                elif self.firmwareType == 3:
-                                    # to account for first point's timestamp being increment in the loop
-                                    timestamp_sec -= 0.000016666
-
-                                    # Cartesian Coordinate System
-                                    if self.dataType == 0:
-                                        for i in range(0, 100):
-                                            returnNum = 1
-
-                                            # X coordinate
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Y coordinate
-                                            coord2 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # Z coordinate
-                                            coord3 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            zeroORoneORtwo = i % 3
-
-                                            # timestamp
-                                            timestamp_sec += float(not (zeroORoneORtwo)) * 0.000016666
-
-                                            # return number
-                                            returnNum += zeroORoneORtwo * 1
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-                                            returnNums.append(returnNum)
-
-                                    # Spherical Coordinate System
-                                    elif self.dataType == 1:
-                                        for i in range(0, 100):
-                                            returnNum = 1
+                                packet_ns = self.getTimestampNs(data_pc[10:18], timestamp_type)
+                                timestamp_sec = _nsToSeconds(packet_ns)
+                                self._countPacket(timestamp_sec)
 
-                                            # distance
-                                            coord1 = data_pc[bytePos:bytePos + 4]
-                                            bytePos += 4
-
-                                            # zenith
-                                            coord2 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # azimuth
-                                            coord3 = data_pc[bytePos:bytePos + 2]
-                                            bytePos += 2
-
-                                            # intensity
-                                            intensity = data_pc[bytePos:bytePos + 1]
-                                            bytePos += 1
-
-                                            zeroORoneORtwo = i % 3
-
-                                            # timestamp
-                                            timestamp_sec += float(not (zeroORoneORtwo)) * 0.000016666
-
-                                            # return number
-                                            returnNum += zeroORoneORtwo * 1
-
-                                            timestamps.append(timestamp_sec)
-                                            timestamp_types.append(timestamp_type)
-                                            slot_ids.append(slot_id)
-                                            lidar_ids.append(lidar_id)
-                                            coord1s.append(coord1)
-                                            coord2s.append(coord2)
-                                            coord3s.append(coord3)
-                                            intensities.append(intensity)
-                                            returnNums.append(returnNum)
+                                # every point of the packet (null points included) is stored decoded
+                                if columns is not None:
+                                    timestamp_sec = columns.appendPacket(data_pc, self.firmwareType, self.dataType, packet_ns)
 
                         # duration check (exit point)
                         else:
@@ -508,102 +1079,23 @@ class _dataCaptureThread(object):
                         break
 
                 # make sure some data was captured
-                lenData = len(coord1s)
-                if lenData > 0:
+                if columns is not None and columns.size > 0:
 
                     if self._showMessages: print(
                         "   " + self.sensorIP + self._format_spaces + self._format_spaces + "   -->     writing data to ASCII file: " + self.filePathAndName)
-                    csvFile = open(self.filePathAndName, "w")
-
-                    numPts = 0
-                    nullPts = 0
-
-                    
-                    # single return fimware
-                    if self.firmwareType == 1:
-
-                        # Cartesian
-                        if self.dataType == 0:
-                            csvFile.write("//X,Y,Z,Inten-sity,Time\n")
-                            for i in range(0, lenData):
-                                coord1 = round(float(struct.unpack('<i', coord1s[i])[0]) / 1000.0, 3)
-                                coord2 = round(float(struct.unpack('<i', coord2s[i])[0]) / 1000.0, 3)
-                                coord3 = round(float(struct.unpack('<i', coord3s[i])[0]) / 1000.0, 3)
-                                if coord1 or coord2 or coord3:
-                                    numPts += 1
-                                    csvFile.write("{0:.3f}".format(coord1) \
-                                                  + "," + "{0:.3f}".format(coord2) \
-                                                  + "," + "{0:.3f}".format(coord3) \
-                                                  + "," + str(int.from_bytes(intensities[i], byteorder='little')) \
-                                                  + "," + "{0:.6f}".format(timestamps[i]) + "\n")
-                                else:
-                                    nullPts += 1
-
-                        # Spherical
-                        elif self.dataType == 1:
-                            csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time\n")
-                            for i in range(0, lenData):
-                                coord1 = round(float(struct.unpack('<I', coord1s[i])[0]) / 1000.0, 3)
-                                coord2 = round(float(struct.unpack('<H', coord2s[i])[0]) / 100.0, 2)
-                                coord3 = round(float(struct.unpack('<H', coord3s[i])[0]) / 100.0, 2)
-                                if coord1:
-                                    numPts += 1
-                                    csvFile.write("{0:.3f}".format(coord1) \
-                                                  + "," + "{0:.2f}".format(coord2) \
-                                                  + "," + "{0:.2f}".format(coord3) \
-                                                  + "," + str(int.from_bytes(intensities[i], byteorder='little')) \
-                                                  + "," + "{0:.6f}".format(timestamps[i]) + "\n")
-                                else:
-                                    nullPts += 1
-
-                    # multiple returns firmware
-                    elif self.firmwareType == 2 or self.firmwareType == 3:
-
-                        # Cartesian
-                        if self.dataType == 0:
-                            csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum\n")
-                            for i in range(0, lenData):
-                                coord1 = round(float(struct.unpack('<i', coord1s[i])[0]) / 1000.0, 3)
-                                coord2 = round(float(struct.unpack('<i', coord2s[i])[0]) / 1000.0, 3)
-                                coord3 = round(float(struct.unpack('<i', coord3s[i])[0]) / 1000.0, 3)
-                                if coord1 or coord2 or coord3:
-                                    numPts += 1
-                                    csvFile.write("{0:.3f}".format(coord1) \
-                                                  + "," + "{0:.3f}".format(coord2) \
-                                                  + "," + "{0:.3f}".format(coord3) \
-                                                  + "," + str(int.from_bytes(intensities[i], byteorder='little')) \
-                                                  + "," + "{0:.6f}".format(timestamps[i]) \
-                                                  + "," + str(returnNums[i]) + "\n")
-                                else:
-                                    nullPts += 1
 
-                        # Spherical
-                        elif self.dataType == 1:
-                            csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n")
-                            for i in range(0, lenData):
-                                coord1 = round(float(struct.unpack('<I', coord1s[i])[0]) / 1000.0, 3)
-                                coord2 = round(float(struct.unpack('<H', coord2s[i])[0]) / 100.0, 2)
-                                coord3 = round(float(struct.unpack('<H', coord3s[i])[0]) / 100.0, 2)
-                                if coord1:
-                                    numPts += 1
-                                    csvFile.write("{0:.3f}".format(coord1) \
-                                                  + "," + "{0:.2f}".format(coord2) \
-                                                  + "," + "{0:.2f}".format(coord3) \
-                                                  + "," + str(int.from_bytes(intensities[i], byteorder='little')) \
-                                                  + "," + "{0:.6f}".format(timestamps[i]) \
-                                                  + "," + str(returnNums[i]) + "\n")
-                                else:
-                                    nullPts += 1
+                    with open(self.filePathAndName, "w", 1024 * 1024) as csvFile:
+                        numPts, nullPts = columns.writeCSV(csvFile, csvFormat[0], csvFormat[1], self.firmwareType, self.dataType)
 
                     self.numPts = numPts
                     self.nullPts = nullPts
+                    self._finishStatistics(numPts, nullPts)
 
                     if self._showMessages:
                         print("   " + self.sensorIP + self._format_spaces + self._format_spaces + "   -->     closed ASCII file: " + self.filePathAndName)
                         print(
                             "                    (points: " + str(numPts) + " good, " + str(nullPts) + " null, " + str(
                                 numPts + nullPts) + " total)")
-                    csvFile.close()
 
                 else:
                     if self._showMessages: print(
@@ -623,9 +1115,8 @@ class _dataCaptureThread(object):
         while True:
 
             if self.started:
-                selectTest = select.select([self.d_socket], [], [], 0)
-                if selectTest[0]:
-                    data_pc, addr = self.d_socket.recvfrom(1500)
+                data_pc = self._nextPacket()
+                if data_pc is not None:
                     version = int.from_bytes(data_pc[0:1], byteorder='little')
                     self.dataType = int.from_bytes(data_pc[9:10], byteorder='little')
                     timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
@@ -650,8 +1141,8 @@ class _dataCaptureThread(object):
                         timeSinceStart = timestamp2 - self.startTime
                         if timeSinceStart <= self.secsToWait:
                             # read data from receive buffer and keep 'consuming' it
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
                                 timestamp2 = self.getTimestamp(data_pc[10:18], timestamp_type)
                                 self.updateStatus(data_pc[4:8])
@@ -663,6 +1154,9 @@ class _dataCaptureThread(object):
 
                 if self._showMessages: print("   " + self.sensorIP + self._format_spaces + "   -->     CAPTURING DATA...")
 
+                # kernel drop counter and packet gap tracking for this record
+                self._startStatistics()
+
                 # duration adjustment (trying to get exactly 100,000 points / sec)
                 if self.duration != 126230400:
                     if self.firmwareType == 1:
@@ -676,22 +1170,33 @@ class _dataCaptureThread(object):
 
                 if self._showMessages: print(
                     "   " + self.sensorIP + self._format_spaces + "   -->     writing real-time data to ASCII file: " + self.filePathAndName)
-                csvFile = open(self.filePathAndName, "w", 1)
-
                 numPts = 0
                 nullPts = 0
 
-                # write header info
-                if self.firmwareType == 1:  # single return firmware
-                    if self.dataType == 0:  # Cartesian
-                        csvFile.write("//X,Y,Z,Inten-sity,Time\n")
-                    elif self.dataType == 1:  # Spherical
-                        csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time\n")
-                elif self.firmwareType == 2 or self.firmwareType == 3:  # double or triple return firmware
-                    if self.dataType == 0:  # Cartesian
-                        csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum\n")
-                    elif self.dataType == 1:  # Spherical
-                        csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n")
+                # packets are decoded as arrays and written by a background formatter thread,
+                # the point-by-point loops below are only used with vectorDecoding(False)
+                csvFile = None
+                csvWriter = None
+                csvFormat = None
+                if self.vectorDecode:
+                    csvFormat = _CSV_CAPTURE_FORMATS.get((self.firmwareType, self.dataType))
+                if csvFormat is not None:
+                    # the writer starts the file with the header line
+                    csvWriter = _csvBlockWriter(self.filePathAndName, csvFormat[0], csvFormat[1])
+                else:
+                    csvFile = open(self.filePathAndName, "w", 1)
+
+                    # write header info
+                    if self.firmwareType == 1:  # single return firmware
+                        if self.dataType == 0:  # Cartesian
+                            csvFile.write("//X,Y,Z,Inten-sity,Time\n")
+                        elif self.dataType == 1:  # Spherical
+                            csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time\n")
+                    elif self.firmwareType == 2 or self.firmwareType == 3:  # double or triple return firmware
+                        if self.dataType == 0:  # Cartesian
+                            csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum\n")
+                        elif self.dataType == 1:  # Spherical
+                            csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n")
 
                 # main loop that captures the desired point cloud data
                 while True:
@@ -701,8 +1206,8 @@ class _dataCaptureThread(object):
                         if timeSinceStart <= self.duration:
 
                             # read data from receive buffer
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
 
                                 # version = int.from_bytes(data_pc[0:1], byteorder='little')
                                 # slot_id = int.from_bytes(data_pc[1:2], byteorder='little')
@@ -714,12 +1219,23 @@ class _dataCaptureThread(object):
                                 self.updateStatus(data_pc[4:8])
 
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
-                                timestamp_sec = self.getTimestamp(data_pc[10:18], timestamp_type)
+                                packet_ns = self.getTimestampNs(data_pc[10:18], timestamp_type)
+                                timestamp_sec = _nsToSeconds(packet_ns)
+                                self._countPacket(timestamp_sec)
 
                                 bytePos = 18
 
+                                # whole packet as one block of CSV values
+                                if csvWriter is not None:
+                                    rows, numValid, numPoints, timestamp_sec = _csvPacketRows(data_pc, self.firmwareType, self.dataType,
+                                                                                              packet_ns)
+                                    numPts += numValid
+                                    nullPts += numPoints - numValid
+                                    if numValid:
+                                        csvWriter.write(rows)
+
                                 # single return firmware (most common)
-                                if self.firmwareType == 1:
+                                elif self.firmwareType == 1:
                                     # to account for first point's timestamp being increment in the loop
                                     timestamp_sec -= 0.00001
 
@@ -969,23 +1485,45 @@ class _dataCaptureThread(object):
 
                 self.numPts = numPts
                 self.nullPts = nullPts
+                self._finishStatistics(numPts, nullPts)
 
                 if self._showMessages:
                     print("   " + self.sensorIP + self._format_spaces + "   -->     closed ASCII file: " + self.filePathAndName)
                     print("                                (points: " + str(numPts) + " good, " + str(nullPts) + " null, " + str(numPts + nullPts) + " total)")
 
-                csvFile.close()
+                if csvWriter is not None:
+                    csvWriter.close()
+                    # rows the formatting thread could not keep up with
+                    self.recordStats["csv_dropped_rows"] = csvWriter.droppedRows
+                    if csvWriter.droppedRows and self._showMessages:
+                        print("   " + self.sensorIP + self._format_spaces + "   -->     * ISSUE: " + str(csvWriter.droppedRows)
+                              + " CSV rows dropped, formatting could not keep up")
+                else:
+                    csvFile.close()
 
             else:
                 if self._showMessages: print("   " + self.sensorIP + self._format_spaces + "   -->     Incorrect lidar packet version")
 
     def run_realtime_bin(self):
 
+        try:
+            self._captureRealtimeBin()
+        finally:
+            #a slot of the ring that was not published (stopped before capturing, unexpected packet version, error)
+            #goes back to the ring so the session keeps all of its slots
+            if self.slot is not None:
+                self.slotRing.release(self.slot)
+                self.slot = None
+
+    def _captureRealtimeBin(self):
+
         # read point cloud data packet to get packet version and datatype
         # keep looping to 'consume' data that we don't want included in the captured point cloud data
         print("&&&&& Entered _dataCaptureThread.run_realtime_bin() at ~line 975 &&&&&")
         #Reset flag to indicate data is not ready
-        self.data_ready_for_proc_capture.clear()
+        #(in direct mode the processor clears it once it has copied the previous record out of the shared array)
+        if not self.directShared and self.slotRing is None:
+            self.data_ready_for_proc_capture.clear()
         breakByCapture = False
 
         #used to check if the sensor is a Mid-100
@@ -998,18 +1536,20 @@ class _dataCaptureThread(object):
         while True:
 
             if self.started:
-                selectTest = select.select([self.d_socket], [], [], 0)
-                if selectTest[0]:
-                    data_pc, addr = self.d_socket.recvfrom(1500)
+                data_pc = self._nextPacket()
+                if data_pc is not None:
                     version = int.from_bytes(data_pc[0:1], byteorder='little')
                     self.dataType = int.from_bytes(data_pc[9:10], byteorder='little')
                     timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
                     timestamp1 = self.getTimestamp(data_pc[10:18], timestamp_type)
                     self.updateStatus(data_pc[4:8])
-                    if self.isCapturing:
+                    if self.isCapturing and self._recordBufferFree(0):
                         self.startTime = timestamp1
                         breakByCapture = True
                         break
+                elif self.isCapturing:
+                    #socket is idle, block on the record buffer for a moment (the next packet latches the start time)
+                    self._recordBufferFree(0.01)
             else:
                 break
 
@@ -1018,6 +1558,9 @@ class _dataCaptureThread(object):
             # check data packet is as expected (first byte anyways)
             if version == 5:
 
+                # the IMU socket is read from here on, include it in the blocking wait
+                self._watchIMU()
+
                 # delayed start to capturing data check (secsToWait parameter)
                 timestamp2 = self.startTime
                 while True:
@@ -1025,13 +1568,13 @@ class _dataCaptureThread(object):
                         timeSinceStart = timestamp2 - self.startTime
                         if timeSinceStart <= self.secsToWait:
                             # read data from receive buffer and keep 'consuming' it
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
                                 timestamp2 = self.getTimestamp(data_pc[10:18], timestamp_type)
                                 self.updateStatus(data_pc[4:8])
                             if select.select([self.i_socket], [], [], 0)[0]:
-                                imu_data, addr2 = self.i_socket.recvfrom(50)
+                                imu_data = self._readIMU()
                         else:
                             self.startTime = timestamp2
                             break
@@ -1043,11 +1586,14 @@ class _dataCaptureThread(object):
 
                 if self._showMessages: print("   " + self.sensorIP + self._format_spaces + "   -->     CAPTURING DATA...")
 
+                # kernel drop counter and packet gap tracking for this record
+                self._startStatistics()
+
                 timestamp_sec = self.startTime
 
                 if self._showMessages: print(
                     "   " + self.sensorIP + self._format_spaces + "   -->     writing real-time data to BINARY file: " + self.filePathAndName)
-                binFile = open(self.filePathAndName, "wb")
+                binFile = _binRecordWriter(self.filePathAndName, self.writeBufferSize, self.binFormat)
                 IMU_file = None
 
                 IMU_reporting = False
@@ -1057,17 +1603,19 @@ class _dataCaptureThread(object):
                 imu_records = 0
 
                 # write header info to know how to parse the data later
-                binFile.write(str.encode("OPENPYLIVOX"))
-                binFile.write(struct.pack('<h', self.firmwareType))
-                binFile.write(struct.pack('<h', self.dataType))
+                binFile.writeHeader(self.firmwareType, self.dataType)
 
                 # main loop that captures the desired point cloud data
                 # TODO : marker
                 
-                #Wait for data processor to indicate that shared array can be changed (unlock)
-                print("OpenPyLivox says: waiting for data_copying_capture event to be passed")
-                self.data_not_copying_capture.wait()
-                print("OpenPyLivox says: in run_realtime_bin, data_copying_capture Event wait is passed, value is False")
+                if self.slotRing is not None:
+                    #Fill the slot of the ring taken before the start time was latched
+                    self.data_array = self.slotRing.array(self.slot)
+                else:
+                    #Wait for data processor to indicate that shared array can be changed (unlock)
+                    print("OpenPyLivox says: waiting for data_copying_capture event to be passed")
+                    self.data_not_copying_capture.wait()
+                    print("OpenPyLivox says: in run_realtime_bin, data_copying_capture Event wait is passed, value is False")
                 
                 while True:
                     if self.started:
@@ -1076,8 +1624,8 @@ class _dataCaptureThread(object):
                         if timeSinceStart <= self.duration:
 
                             # read points from data buffer
-                            if select.select([self.d_socket], [], [], 0)[0]:
-                                data_pc, addr = self.d_socket.recvfrom(1500)
+                            data_pc = self._nextPacket()
+                            if data_pc is not None:
 
                                 # version = int.from_bytes(data_pc[0:1], byteorder='little')
                                 # slot_id = int.from_bytes(data_pc[1:2], byteorder='little')
@@ -1089,14 +1637,29 @@ class _dataCaptureThread(object):
                                 self.updateStatus(data_pc[4:8])
                                 dataType = int.from_bytes(data_pc[9:10], byteorder='little')
                                 timestamp_type = int.from_bytes(data_pc[8:9], byteorder='little')
-                                timestamp_sec = self.getTimestamp(data_pc[10:18], timestamp_type)
+                                packet_ns = self.getTimestampNs(data_pc[10:18], timestamp_type)
+                                timestamp_sec = _nsToSeconds(packet_ns)
+                                self._countPacket(timestamp_sec)
 
                                 bytePos = 18
-                               
+
+                                # table-driven block decoding of the non Mid-70 packet types
+                                # (double/triple return firmware keeps using the data type of the first packet)
+                                layout = None
+                                if self.vectorDecode:
+                                    layout = _BIN_RECORD_LAYOUTS.get((self.firmwareType, dataType if self.firmwareType == 1 else self.dataType))
+
+                                if layout is not None:
+                                    records, numValid, timestamp_sec = _packetRecords(data_pc, layout, packet_ns, deviceCheck == 100,
+                                                                                     binFile.version == 1)
+                                    numPts += numValid
+                                    nullPts += layout[1] - numValid
+                                    if numValid:
+                                        binFile.write(records)
 
                                 # single return firmware (relevant for Mid-40 and Mid-100)
                                 # Horizon and Tele-15 sensors also fall under this 'if' statement
-                                if self.firmwareType == 1:
+                                elif self.firmwareType == 1:
 
                                     # Cartesian Coordinate System
                                     if dataType == 0:
@@ -1148,6 +1711,27 @@ class _dataCaptureThread(object):
                                             bytePos += 9
 
                                     # Mid-70 Cartesian (single return)
+                                    elif dataType == 2 and self.vectorDecode:
+                                        points, valid = _decodeMid70Single(data_pc)
+                                        numValid = int(np.count_nonzero(valid))
+                                        numPts += numValid
+                                        nullPts += 96 - numValid
+
+                                        if numValid:
+                                            # 100,000 p/s for Mid-70, first point carries the packet timestamp
+                                            records = np.empty(numValid, dtype=_MID70_RECORD_DTYPE)
+                                            records['point'] = points[valid]
+                                            records['time'] = _pointTimestamps(packet_ns, _MID70_TIME_OFFSETS[valid])
+                                            binFile.write(records)
+
+                                            # whole block of valid points in one slice assignment
+                                            numStored = min(numValid, self.num_points_capture - arrayIdx)
+                                            self.data_array[arrayIdx:arrayIdx + numStored, :] = _pointsToXYZ(records['point'][:numStored])
+                                            arrayIdx += numStored
+
+                                        # timestamp of the last point in the packet (used for the duration check)
+                                        timestamp_sec = _nsToSeconds(packet_ns + int(_MID70_TIME_OFFSETS[-1]))
+
                                     elif dataType == 2:
                                         # to account for first point's timestamp being increment in the loop
                                         #Change timestamp incr to reflect 100,000 p/s for Mid-70
@@ -1201,6 +1785,30 @@ class _dataCaptureThread(object):
                                             bytePos += 10
 
                                     # Mid-70 dual return cartesian
+                                    elif dataType == 4 and self.vectorDecode:
+                                        first, second, valid, numNull = _decodeMid70Dual(data_pc)
+                                        numValid = 48 - numNull
+                                        numPts += numValid
+                                        nullPts += numNull
+
+                                        if numValid:
+                                            # 200,000 p/s for Mid-70 dual return, both returns share a timestamp
+                                            records = np.empty(numValid, dtype=_MID70_DUAL_RECORD_DTYPE)
+                                            records['pair']['first'] = first
+                                            records['pair']['second'] = second
+                                            records['time'] = _pointTimestamps(packet_ns, _MID70_DUAL_TIME_OFFSETS[valid])
+                                            binFile.write(records)
+
+                                            # first and second returns stay interleaved in the capture array
+                                            numStored = min(numValid, (self.num_points_capture - arrayIdx) // 2)
+                                            block = self.data_array[arrayIdx:arrayIdx + 2 * numStored, :].reshape(numStored, 2, 3)
+                                            block[:, 0, :] = _pointsToXYZ(first[:numStored])
+                                            block[:, 1, :] = _pointsToXYZ(second[:numStored])
+                                            arrayIdx += 2 * numStored
+
+                                        # timestamp of the last point in the packet (used for the duration check)
+                                        timestamp_sec = _nsToSeconds(packet_ns + int(_MID70_DUAL_TIME_OFFSETS[-1]))
+
                                     elif dataType == 4:
                                         # to account for first point's timestamp being increment in the loop
                                         # changed timestamp incr to reflect 200,000 p/s for Mid-70 dual return
@@ -1276,13 +1884,13 @@ class _dataCaptureThread(object):
                                                 numPts += 1
                                                 binFile.write(data_pc[bytePos:bytePos + 13])
                                                 binFile.write(struct.pack('<d', timestamp_sec))
-                                                binFile.write(str.encode(str(returnNum)))
+                                                binFile.write(binFile.returnBytes[returnNum])
                                             else:
                                                 if coord2:
                                                     numPts += 1
                                                     binFile.write(data_pc[bytePos:bytePos + 13])
                                                     binFile.write(struct.pack('<d', timestamp_sec))
-                                                    binFile.write(str.encode(str(returnNum)))
+                                                    binFile.write(binFile.returnBytes[returnNum])
                                                 else:
                                                     nullPts += 1
 
@@ -1308,7 +1916,7 @@ class _dataCaptureThread(object):
                                                 numPts += 1
                                                 binFile.write(data_pc[bytePos:bytePos + 9])
                                                 binFile.write(struct.pack('<d', timestamp_sec))
-                                                binFile.write(str.encode(str(returnNum)))
+                                                binFile.write(binFile.returnBytes[returnNum])
                                             else:
                                                 nullPts += 1
 
@@ -1339,13 +1947,13 @@ class _dataCaptureThread(object):
                                                 numPts += 1
                                                 binFile.write(data_pc[bytePos:bytePos + 13])
                                                 binFile.write(struct.pack('<d', timestamp_sec))
-                                                binFile.write(str.encode(str(returnNum)))
+                                                binFile.write(binFile.returnBytes[returnNum])
                                             else:
                                                 if coord2:
                                                     numPts += 1
                                                     binFile.write(data_pc[bytePos:bytePos + 13])
                                                     binFile.write(struct.pack('<d', timestamp_sec))
-                                                    binFile.write(str.encode(str(returnNum)))
+                                                    binFile.write(binFile.returnBytes[returnNum])
                                                 else:
                                                     nullPts += 1
 
@@ -1371,7 +1979,7 @@ class _dataCaptureThread(object):
                                                 numPts += 1
                                                 binFile.write(data_pc[bytePos:bytePos + 9])
                                                 binFile.write(struct.pack('<d', timestamp_sec))
-                                                binFile.write(str.encode(str(returnNum)))
+                                                binFile.write(binFile.returnBytes[returnNum])
                                             else:
                                                 nullPts += 1
 
@@ -1379,7 +1987,7 @@ class _dataCaptureThread(object):
 
                             #IMU data capture
                             if select.select([self.i_socket], [], [], 0)[0]:
-                                imu_data, addr2 = self.i_socket.recvfrom(50)
+                                imu_data = self._readIMU()
 
                                 # version = int.from_bytes(imu_data[0:1], byteorder='little')
                                 # slot_id = int.from_bytes(imu_data[1:2], byteorder='little')
@@ -1419,9 +2027,22 @@ class _dataCaptureThread(object):
                     else:
                         break
                 # TODO : put shit here when all points collected (flags)
-                self.data_array_shared[:] = self.data_array[:]
-                self.null_points_capture.value = nullPts
-                self.data_ready_for_proc_capture.set()
+                if self.slotRing is not None:
+                    #slot was filled in place, clear what is left over from its previous record and hand it on
+                    self.data_array[arrayIdx:] = 0
+                    if self.slot is not None:
+                        self.slotRing.publish(self.slot, nullPts, self.filePathAndName)
+                        self.slot = None
+                elif self.directShared:
+                    #points were decoded in place, only clear what is left over from the previous record
+                    self.data_array[arrayIdx:] = 0
+                    self.null_points_capture.value = nullPts
+                    self.record_consumed_capture.clear()
+                    self.data_ready_for_proc_capture.set()
+                else:
+                    self.data_array_shared[:] = self.data_array[:]
+                    self.null_points_capture.value = nullPts
+                    self.data_ready_for_proc_capture.set()
                 print("Max of data_array in openpylivox: ",np.max(self.data_array))
                 print("Min of data_array in openpylivox: ",np.min(self.data_array))
                 print("Max of shared_data_array in openpylivox: ",np.max(self.data_array))
@@ -1429,6 +2050,7 @@ class _dataCaptureThread(object):
                 
                 self.numPts = numPts
                 self.nullPts = nullPts
+                self._finishStatistics(numPts, nullPts)
                 self.imu_records = imu_records
 
                 if self._showMessages:
@@ -1445,6 +2067,86 @@ class _dataCaptureThread(object):
             else:
                 if self._showMessages: print("   " + self.sensorIP + self._format_spaces + "   -->     Incorrect packet version")
 
+    # next point cloud data packet (memoryview into the receive ring, or bytes), None when nothing is waiting
+    def _nextPacket(self):
+
+        ring = self._ring
+        if ring is None:
+            if self._waitForData():
+                data_pc, addr = self.d_socket.recvfrom(1500)
+                if self._recorder is not None:
+                    self._recorder.write(rawcapture.SOURCE_DATA, data_pc)
+                return data_pc
+            return None
+
+        if not ring.pending():
+            if not ring.fill(self.d_socket):
+                if not self.receiveTimeout or not self._waitForData() or not ring.fill(self.d_socket):
+                    return None
+
+        data_pc = ring.next()
+        if self._recorder is not None:
+            self._recorder.write(rawcapture.SOURCE_DATA, data_pc, ring.fillTime)
+        return data_pc
+
+    # next IMU datagram, the caller checks that one is waiting
+    def _readIMU(self):
+
+        imu_data, addr = self.i_socket.recvfrom(50)
+        if self._recorder is not None:
+            self._recorder.write(rawcapture.SOURCE_IMU, imu_data)
+        return imu_data
+
+    # whether the buffer of the next record can be written, checked before the start time of the record is latched so
+    # the socket keeps being drained while waiting: a free slot of the ring (kept once taken), or in direct mode the
+    # shared array once the processor has copied the previous record out (record consumed event), waits up to timeout seconds
+    def _recordBufferFree(self, timeout):
+
+        if self.slotRing is not None:
+            if self.slot is None:
+                self.slot = self.slotRing.acquire(timeout=timeout)
+            return self.slot is not None
+
+        if self.directShared:
+            return self.record_consumed_capture.wait(timeout)
+
+        return True
+
+    # wait until the data socket is readable (or the IMU socket, once it is watched), returns True if data is waiting
+    def _waitForData(self):
+
+        if not self.receiveTimeout:
+            return bool(select.select([self.d_socket], [], [], 0)[0])
+
+        for key, events in self._selector.select(self.receiveTimeout):
+            if key.fileobj is self.d_socket:
+                return True
+
+        return False
+
+    # include the IMU socket in the blocking wait, only once the capture loop is reading IMU packets
+    def _watchIMU(self):
+
+        if self.receiveTimeout and not self._imuWatched and isinstance(self.i_socket, socket.socket):
+            self._selector.register(self.i_socket, selectors.EVENT_READ)
+            self._imuWatched = True
+
+    # packet timestamp as integer nanoseconds (no rounding)
+    def getTimestampNs(self, data_pc, timestamp_type):
+
+        timestamp_ns = 0
+
+        # nanosecond timestamp
+        if timestamp_type == 0 or timestamp_type == 1 or timestamp_type == 4:
+            timestamp_ns = int.from_bytes(data_pc[0:8], byteorder='little')
+
+        # UTC timestamp, microseconds past the hour
+        elif timestamp_type == 3:
+            timestamp_hour = int.from_bytes(data_pc[3:4], byteorder='little')
+            timestamp_ns = (timestamp_hour * 3600000000 + int.from_bytes(data_pc[4:8], byteorder='little')) * 1000
+
+        return timestamp_ns
+
     def getTimestamp(self, data_pc, timestamp_type):
 
         # nanosecond timestamp
@@ -1467,49 +2169,26 @@ class _dataCaptureThread(object):
     # parse lidar status codes and update object properties, can provide real-time warning/error message display
     def updateStatus(self, data_pc):
 
-        status_bits = str(bin(int.from_bytes(data_pc[0:1], byteorder='little')))[2:].zfill(8)
-        status_bits += str(bin(int.from_bytes(data_pc[1:2], byteorder='little')))[2:].zfill(8)
-        status_bits += str(bin(int.from_bytes(data_pc[2:3], byteorder='little')))[2:].zfill(8)
-        status_bits += str(bin(int.from_bytes(data_pc[3:4], byteorder='little')))[2:].zfill(8)
-
-        self.temp_status = int(status_bits[0:2], 2)
-        self.volt_status = int(status_bits[2:4], 2)
-        self.motor_status = int(status_bits[4:6], 2)
-        self.dirty_status = int(status_bits[6:8], 2)
-        self.firmware_status = int(status_bits[8:9], 2)
-        self.pps_status = int(status_bits[9:10], 2)
-        self.device_status = int(status_bits[10:11], 2)
-        self.fan_status = int(status_bits[11:12], 2)
-        self.self_heating_status = int(status_bits[12:13], 2)
-        self.ptp_status = int(status_bits[13:14], 2)
-        self.time_sync_status = int(status_bits[14:16], 2)
-        self.system_status = int(status_bits[30:], 2)
-
-        # check if the system status in NOT normal
-        if self.system_status:
-            if self._showMessages:
-                if self.system_status == 1:
-                    if self.temp_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: temperature *")
-                    if self.volt_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: voltage *")
-                    if self.motor_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: motor *")
-                    if self.dirty_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: dirty or blocked *")
-                    if self.device_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: approaching end of service life *")
-                    if self.fan_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     * WARNING: fan *")
-                elif self.system_status == 2:
-                    if self.temp_status == 2:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     *** ERROR: TEMPERATURE ***")
-                    if self.volt_status == 2:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     *** ERROR: VOLTAGE ***")
-                    if self.motor_status == 2:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     *** ERROR: MOTOR ***")
-                    if self.firmware_status == 1:
-                        print("   " + self.sensorIP + self._format_spaces + "   -->     *** ERROR: ABNORMAL FIRMWARE ***")
+        # the status word rarely changes, only a changed word is decoded
+        word = int.from_bytes(data_pc[0:4], byteorder='little')
+        if word == self._statusWord:
+            return
+        self._statusWord = word
+
+        changes = {}
+        for name, shift, mask in _STATUS_FIELDS:
+            value = (word >> shift) & mask
+            old = getattr(self, name)
+            if value != old:
+                setattr(self, name, value)
+                changes[name] = (old, value)
+        self.statusEvents.append({"time": time.time(), "status_word": word, "changes": changes})
+
+        # report a NOT normal system status once per transition
+        if self.system_status and self._showMessages:
+            for system_status, name, value, message in _STATUS_MESSAGES:
+                if self.system_status == system_status and getattr(self, name) == value:
+                    print("   " + self.sensorIP + self._format_spaces + "   -->     " + message)
 
     # returns latest status Codes from within the point cloud data packet
     def statusCodes(self):
@@ -1527,41 +2206,42 @@ class _dataCaptureThread(object):
 
 class openpylivox(object):
 
-    _CMD_QUERY =                  bytes.fromhex((b'AA010F0000000004D70002AE8A8A7B').decode('ascii'))
-    _CMD_HEARTBEAT =              bytes.fromhex((b'AA010F0000000004D7000338BA8D0C').decode('ascii'))
-    _CMD_DISCONNECT =             bytes.fromhex((b'AA010F0000000004D70006B74EE77C').decode('ascii'))
-    _CMD_READ_EXTRINSIC =         bytes.fromhex((b'AA010F0000000004D70102EFBB9162').decode('ascii'))
-    _CMD_GET_FAN =                bytes.fromhex((b'AA010F0000000004D701054C2EF5FC').decode('ascii'))
-    _CMD_GET_IMU =                bytes.fromhex((b'AA010F0000000004D70109676243F5').decode('ascii'))
-
-    _CMD_RAIN_FOG_ON =            bytes.fromhex((b'AA011000000000B809010301D271D049').decode('ascii'))
-    _CMD_RAIN_FOG_OFF =           bytes.fromhex((b'AA011000000000B8090103004441D73E').decode('ascii'))
-    _CMD_LIDAR_START =            bytes.fromhex((b'AA011000000000B8090100011122FD62').decode('ascii'))
-    _CMD_LIDAR_POWERSAVE =        bytes.fromhex((b'AA011000000000B809010002AB73F4FB').decode('ascii'))
-    _CMD_LIDAR_STANDBY =          bytes.fromhex((b'AA011000000000B8090100033D43F38C').decode('ascii'))
-    _CMD_DATA_STOP =              bytes.fromhex((b'AA011000000000B809000400B4BD5470').decode('ascii'))
-    _CMD_DATA_START =             bytes.fromhex((b'AA011000000000B809000401228D5307').decode('ascii'))
-    _CMD_CARTESIAN_CS =           bytes.fromhex((b'AA011000000000B809000500F58C4F69').decode('ascii'))
-    _CMD_SPHERICAL_CS =           bytes.fromhex((b'AA011000000000B80900050163BC481E').decode('ascii'))
-    _CMD_FAN_ON =                 bytes.fromhex((b'AA011000000000B80901040115E79106').decode('ascii'))
-    _CMD_FAN_OFF =                bytes.fromhex((b'AA011000000000B80901040083D79671').decode('ascii'))
-    _CMD_LIDAR_SINGLE_1ST =       bytes.fromhex((b'AA011000000000B80901060001B5A043').decode('ascii'))
-    _CMD_LIDAR_SINGLE_STRONGEST = bytes.fromhex((b'AA011000000000B8090106019785A734').decode('ascii'))
-    _CMD_LIDAR_DUAL =             bytes.fromhex((b'AA011000000000B8090106022DD4AEAD').decode('ascii'))
-    _CMD_IMU_DATA_ON =            bytes.fromhex((b'AA011000000000B80901080119A824AA').decode('ascii'))
-    _CMD_IMU_DATA_OFF =           bytes.fromhex((b'AA011000000000B8090108008F9823DD').decode('ascii'))
-
-    _CMD_REBOOT =                 bytes.fromhex((b'AA011100000000FC02000A000004477736').decode('ascii'))
-
-    _CMD_DYNAMIC_IP =             bytes.fromhex((b'AA011400000000A8240008000000000068F8DD50').decode('ascii'))
-    _CMD_WRITE_ZERO_EO =          bytes.fromhex((b'AA012700000000B5ED01010000000000000000000000000000000000000000000000004CDEA4E7').decode('ascii'))
+    _CMD_QUERY =                  livoxcodec.CMD_QUERY
+    _CMD_HEARTBEAT =              livoxcodec.CMD_HEARTBEAT
+    _CMD_DISCONNECT =             livoxcodec.CMD_DISCONNECT
+    _CMD_READ_EXTRINSIC =         livoxcodec.CMD_READ_EXTRINSIC
+    _CMD_GET_FAN =                livoxcodec.CMD_GET_FAN
+    _CMD_GET_IMU =                livoxcodec.CMD_GET_IMU
+
+    _CMD_RAIN_FOG_ON =            livoxcodec.CMD_RAIN_FOG_ON
+    _CMD_RAIN_FOG_OFF =           livoxcodec.CMD_RAIN_FOG_OFF
+    _CMD_LIDAR_START =            livoxcodec.CMD_LIDAR_START
+    _CMD_LIDAR_POWERSAVE =        livoxcodec.CMD_LIDAR_POWERSAVE
+    _CMD_LIDAR_STANDBY =          livoxcodec.CMD_LIDAR_STANDBY
+    _CMD_DATA_STOP =              livoxcodec.CMD_DATA_STOP
+    _CMD_DATA_START =             livoxcodec.CMD_DATA_START
+    _CMD_CARTESIAN_CS =           livoxcodec.CMD_CARTESIAN_CS
+    _CMD_SPHERICAL_CS =           livoxcodec.CMD_SPHERICAL_CS
+    _CMD_FAN_ON =                 livoxcodec.CMD_FAN_ON
+    _CMD_FAN_OFF =                livoxcodec.CMD_FAN_OFF
+    _CMD_LIDAR_SINGLE_1ST =       livoxcodec.CMD_LIDAR_SINGLE_1ST
+    _CMD_LIDAR_SINGLE_STRONGEST = livoxcodec.CMD_LIDAR_SINGLE_STRONGEST
+    _CMD_LIDAR_DUAL =             livoxcodec.CMD_LIDAR_DUAL
+    _CMD_IMU_DATA_ON =            livoxcodec.CMD_IMU_DATA_ON
+    _CMD_IMU_DATA_OFF =           livoxcodec.CMD_IMU_DATA_OFF
+
+    _CMD_REBOOT =                 livoxcodec.CMD_REBOOT
+
+    _CMD_DYNAMIC_IP =             livoxcodec.CMD_DYNAMIC_IP
+    _CMD_WRITE_ZERO_EO =          livoxcodec.CMD_WRITE_ZERO_EO
 
     _SPECIAL_FIRMWARE_TYPE_DICT = {"03.03.0001": 2,
                                    "03.03.0002": 3,
                                    "03.03.0006": 2,
                                    "03.03.0007": 3}
 
-    def __init__(self, filename_string, null_points, data_ready_for_proc, data_processor_empty, data_processor_not_copying, num_points, showMessages=False):
+    def __init__(self, filename_string, null_points, data_ready_for_proc, data_processor_empty, data_processor_not_copying, num_points, showMessages=False,
+                 slotRing=None, recordConsumed=None):
 
         self._isConnected = False
         self._isData = False
@@ -1591,6 +2271,17 @@ class openpylivox(object):
         self._deviceType = "UNKNOWN"
         self._mid100_sensors = []
         self._format_spaces = ""
+        self._vectorDecode = True
+        self._batchReceive = True
+        self._blockingReceive = True
+        self._directShared = True
+        self._lastCaptureCPU = -1
+        self._receiveBufferSize = 4 * 1024 * 1024
+        self._recordStats = []
+        self._rawFile = ""
+        self._writeBufferSize = 4 * 1024 * 1024
+        self._binFormat = _BIN_VERSION
+        self._lastStatusEvents = []
         
         #----- add mp.Event() flags to init arguments ------
         self.data_ready_for_proc_opl = data_ready_for_proc
@@ -1601,6 +2292,10 @@ class openpylivox(object):
         self.num_points_opl = num_points
         #----- add mp.Array() for filename string
         self.filename = filename_string
+        #----- optional ring of shared point buffers (slotring.SlotRing) used instead of SHARED_BUFF and the events -----
+        self.slotRing_opl = slotRing
+        #----- mp.Event() set by the processor once it has copied a record out of SHARED_BUFF (needed for direct decoding) -----
+        self.record_consumed_opl = recordConsumed
         #----- link to mp.shared_memory buffer created in main thread -----
         #self.shared_data_array_opl = shared_memory.SharedMemory(name='SHARED_BUFF')
         
@@ -1613,6 +2308,7 @@ class openpylivox(object):
         self._dataSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._cmdSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._imuSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._applyReceiveBufferSize()
 
         lidarSensorIPs, serialNums, ipRangeCodes, sensorTypes = self._searchForSensors(False)
 
@@ -1892,138 +2588,37 @@ class openpylivox(object):
 
     def _parseResp(self, binData):
 
-        dataBytes = []
-        dataString = ""
-        dataLength = len(binData)
-        for i in range(0, dataLength):
-            dataBytes.append(binData[i:i + 1])
-            dataString += (binascii.hexlify(binData[i:i + 1])).decode("utf-8")
-
-        crc16Data = b''
-        for i in range(0, 7):
-            crc16Data += binascii.hexlify(dataBytes[i])
-
-        crc16DataA = bytes.fromhex((crc16Data).decode('ascii'))
-        checkSum16I = self._crc16(crc16DataA)
-
-        frame_header_checksum_crc16 = int.from_bytes((dataBytes[7] + dataBytes[8]), byteorder='little')
-
-        cmdMessage, dataMessage, dataID, = "", "", ""
-        data = []
-
-        goodData = True
-
-        if frame_header_checksum_crc16 == checkSum16I:
-
-            crc32Data = b''
-            for i in range(0, dataLength - 4):
-                crc32Data += binascii.hexlify(dataBytes[i])
-
-            crc32DataA = bytes.fromhex((crc32Data).decode('ascii'))
-            checkSum32I = self._crc32(crc32DataA)
-
-            frame_header_checksum_crc32 = int.from_bytes((dataBytes[dataLength - 4] + dataBytes[dataLength - 3] +
-                                                          dataBytes[dataLength - 2] + dataBytes[dataLength - 1]),
-                                                         byteorder='little')
-
-            if frame_header_checksum_crc32 == checkSum32I:
-
-                frame_sof = int.from_bytes(dataBytes[0], byteorder='little')  # should be 170 = '\xAA'
-                frame_version = int.from_bytes(dataBytes[1], byteorder='little')  # should be 1
-                frame_length = int.from_bytes((dataBytes[2] + dataBytes[3]), byteorder='little')  # max value = 1400
-
-                if frame_sof == 170:
-                    if frame_version == 1:
-                        if frame_length <= 1400:
-                            frame_cmd_type = int.from_bytes(dataBytes[4], byteorder='little')
+        result, cmd_type, cmd_set, cmd_id = livoxcodec.parseFrame(binData)
 
-                            cmdMessage = ""
-                            if frame_cmd_type == 0:
-                                cmdMessage = "CMD (request)"
-                            elif frame_cmd_type == 1:
-                                cmdMessage = "ACK (response)"
-                            elif frame_cmd_type == 2:
-                                cmdMessage = "MSG (message)"
-                            else:
-                                goodData = False
-
-                            frame_data_cmd_set = int.from_bytes(dataBytes[9], byteorder='little')
-
-                            dataMessage = ""
-                            if frame_data_cmd_set == 0:
-                                dataMessage = "General"
-                            elif frame_data_cmd_set == 1:
-                                dataMessage = "Lidar"
-                            elif frame_data_cmd_set == 2:
-                                dataMessage = "Hub"
-                            else:
-                                goodData = False
-
-                            dataID = str(int.from_bytes(dataBytes[10], byteorder='little'))
-                            data = dataBytes[11:]
+        if result == livoxcodec.FRAME_OK:
+            # one single byte object per byte after the command id, as used by the response handlers
+            data = [binData[i:i + 1] for i in range(livoxcodec.PAYLOAD_OFFSET, len(binData))]
+            return True, _CMD_TYPE_NAMES[cmd_type], _CMD_SET_NAMES[cmd_set], _CMD_ID_NAMES[cmd_id], data
 
-                        else:
-                            goodData = False
-                    else:
-                        goodData = False
-                else:
-                    goodData = False
-            else:
-                goodData = False
-                if self._showMessages: print("CRC32 Checksum Error")
-        else:
-            goodData = False
+        if result == livoxcodec.FRAME_BAD_CRC16:
             if self._showMessages: print("CRC16 Checksum Error")
+        elif result == livoxcodec.FRAME_BAD_CRC32:
+            if self._showMessages: print("CRC32 Checksum Error")
 
-        return goodData, cmdMessage, dataMessage, dataID, data
+        return False, "", "", "", []
 
     def _crc16(self, data):
 
-        crc16 = crcmod.mkCrcFun(0x11021, rev=True, initCrc=0x4C49)
-        checkSum = crc16(data)
-        return checkSum
+        return livoxcodec.crc16(data)
 
     def _crc16fromStr(self, binString):
 
-        crcDataA = bytes.fromhex((binString).decode('ascii'))
-        checkSum = self._crc16(crcDataA)
-        strHexCheckSum = str(hex(checkSum))[2:]
-
-        strLen = len(strHexCheckSum)
-        for i in range(strLen, 4):
-            strHexCheckSum = "0" + strHexCheckSum
-
-        byte1 = strHexCheckSum[2:4]
-        byte2 = strHexCheckSum[0:2]
-
-        checkSumB = (byte1 + byte2)
-
-        return checkSumB
+        checkSum = livoxcodec.crc16(bytes.fromhex((binString).decode('ascii')))
+        return struct.pack('<H', checkSum).hex()
 
     def _crc32(self, data):
 
-        crc32 = crcmod.mkCrcFun(0x104C11DB7, rev=True, initCrc=0x564F580A, xorOut=0xFFFFFFFF)
-        checkSum = crc32(data)
-        return checkSum
+        return livoxcodec.crc32(data)
 
     def _crc32fromStr(self, binString):
 
-        crcDataA = bytes.fromhex((binString).decode('ascii'))
-        checkSum = self._crc32(crcDataA)
-        strHexCheckSum = str(hex(checkSum))[2:]
-
-        strLen = len(strHexCheckSum)
-        for i in range(strLen, 8):
-            strHexCheckSum = "0" + strHexCheckSum
-
-        byte1 = strHexCheckSum[6:8]
-        byte2 = strHexCheckSum[4:6]
-        byte3 = strHexCheckSum[2:4]
-        byte4 = strHexCheckSum[0:2]
-
-        checkSumB = (byte1 + byte2 + byte3 + byte4)
-
-        return checkSumB
+        checkSum = livoxcodec.crc32(bytes.fromhex((binString).decode('ascii')))
+        return struct.pack('<I', checkSum).hex()
 
     def discover(self, manualComputerIP=""):
 
@@ -2131,24 +2726,7 @@ class openpylivox(object):
 
                 self._dataPort, self._cmdPort, self._imuPort = self._bindPorts()
 
-                IP_parts = self._computerIP.split(".")
-                IPhex = str(hex(int(IP_parts[0]))).replace('0x', '').zfill(2)
-                IPhex += str(hex(int(IP_parts[1]))).replace('0x', '').zfill(2)
-                IPhex += str(hex(int(IP_parts[2]))).replace('0x', '').zfill(2)
-                IPhex += str(hex(int(IP_parts[3]))).replace('0x', '').zfill(2)
-                dataHexAll = str(hex(int(self._dataPort))).replace('0x', '').zfill(4)
-                dataHex = dataHexAll[2:] + dataHexAll[:-2]
-                cmdHexAll = str(hex(int(self._cmdPort))).replace('0x', '').zfill(4)
-                cmdHex = cmdHexAll[2:] + cmdHexAll[:-2]
-                imuHexAll = str(hex(int(self._imuPort))).replace('0x', '').zfill(4)
-                imuHex = imuHexAll[2:] + imuHexAll[:-2]
-                cmdString = "AA011900000000DC580001" + IPhex + dataHex + cmdHex + imuHex
-                binString = bytes(cmdString, encoding='utf-8')
-                crc32checksum = self._crc32fromStr(binString)
-                cmdString += crc32checksum
-                binString = bytes(cmdString, encoding='utf-8')
-
-                connect_request = bytes.fromhex((binString).decode('ascii'))
+                connect_request = livoxcodec.connectRequest(self._computerIP, int(self._dataPort), int(self._cmdPort), int(self._imuPort))
                 self._cmdSocket.sendto(connect_request, (self._sensorIP, 65000))
 
                 # check for proper response from connection request
@@ -2308,6 +2886,7 @@ class openpylivox(object):
             self._isData = False
             if self._captureStream is not None:
                 self._captureStream.stop()
+                self._saveCaptureStatistics()
                 self._captureStream = None
             time.sleep(0.1)
             self._isWriting = False
@@ -2339,6 +2918,7 @@ class openpylivox(object):
             self._isData = False
             if self._captureStream is not None:
                 self._captureStream.stop()
+                self._saveCaptureStatistics()
                 self._captureStream = None
             time.sleep(0.1)
             self._isWriting = False
@@ -2437,6 +3017,7 @@ class openpylivox(object):
                         self._isData = False
                         if self._captureStream is not None:
                             self._captureStream.stop()
+                            self._saveCaptureStatistics()
                             self._captureStream = None
                         self._isWriting = False
                         time.sleep(0.1)
@@ -2470,6 +3051,7 @@ class openpylivox(object):
                         self._isData = False
                         if self._captureStream is not None:
                             self._captureStream.stop()
+                            self._saveCaptureStatistics()
                             self._captureStream = None
                         self._isWriting = False
                         time.sleep(0.1)
@@ -2488,7 +3070,12 @@ class openpylivox(object):
 
         if self._isConnected:
             if not self._isData:
-                self._captureStream = _dataCaptureThread(self._sensorIP, self._dataSocket, "", 0, 0, 0, 0, self._showMessages, self._format_spaces, self._deviceType)
+                self._captureStream = _dataCaptureThread(self._sensorIP, self._dataSocket, self._imuSocket, "", 0, 0, 0, 0, self._showMessages,
+                                                         self._format_spaces, self._deviceType, self.data_ready_for_proc_opl, self.data_processor_empty_opl,
+                                                         self.data_processor_not_copying_opl, self.num_points_opl, self.null_points_opl,
+                                                         vectorDecode=self._vectorDecode, batchReceive=self._batchReceive,
+                                                         blockingReceive=self._blockingReceive, directShared=self._directShared,
+                                                         slotRing=self.slotRing_opl, recordConsumed=self.record_consumed_opl, rawFile=self._rawFile)
                 time.sleep(0.12)
                 self._waitForIdle()
                 self._cmdSocket.sendto(self._CMD_DATA_START, (self._sensorIP, 65000))
@@ -2505,6 +3092,7 @@ class openpylivox(object):
                             if self._showMessages: print("   " + self._sensorIP + self._format_spaces + "   -->     FAILED to start data stream")
                             if self._captureStream is not None:
                                 self._captureStream.stop()
+                                self._saveCaptureStatistics()
                             time.sleep(0.1)
                             self._isData = False
                         else:
@@ -2521,7 +3109,12 @@ class openpylivox(object):
 
         if self._isConnected:
             if not self._isData:
-                self._captureStream = _dataCaptureThread(self._sensorIP, self._dataSocket, "", 1, 0, 0, 0, self._showMessages, self._format_spaces, self._deviceType)
+                self._captureStream = _dataCaptureThread(self._sensorIP, self._dataSocket, self._imuSocket, "", 1, 0, 0, 0, self._showMessages,
+                                                         self._format_spaces, self._deviceType, self.data_ready_for_proc_opl, self.data_processor_empty_opl,
+                                                         self.data_processor_not_copying_opl, self.num_points_opl, self.null_points_opl,
+                                                         vectorDecode=self._vectorDecode, batchReceive=self._batchReceive,
+                                                         blockingReceive=self._blockingReceive, directShared=self._directShared,
+                                                         slotRing=self.slotRing_opl, recordConsumed=self.record_consumed_opl, rawFile=self._rawFile)
                 time.sleep(0.12)
                 self._waitForIdle()
                 self._cmdSocket.sendto(self._CMD_DATA_START, (self._sensorIP, 65000))
@@ -2538,6 +3131,7 @@ class openpylivox(object):
                             if self._showMessages: print("   " + self._sensorIP + self._format_spaces + "   -->     FAILED to start data stream")
                             if self._captureStream is not None:
                                 self._captureStream.stop()
+                                self._saveCaptureStatistics()
                             time.sleep(0.1)
                             self._isData = False
                         else:
@@ -2563,7 +3157,11 @@ class openpylivox(object):
             if not self._isData:
                 self._captureStream = _dataCaptureThread(self._sensorIP, self._dataSocket, self._imuSocket, "", 2, 0, 0, 0, self._showMessages, 
                                                          self._format_spaces, self._deviceType, self.data_ready_for_proc_opl, self.data_processor_empty_opl, 
-                                                         self.data_processor_not_copying_opl, self.num_points_opl, self.null_points_opl)
+                                                         self.data_processor_not_copying_opl, self.num_points_opl, self.null_points_opl,
+                                                         vectorDecode=self._vectorDecode, batchReceive=self._batchReceive,
+                                                         blockingReceive=self._blockingReceive, directShared=self._directShared,
+                                                         slotRing=self.slotRing_opl, recordConsumed=self.record_consumed_opl, rawFile=self._rawFile,
+                                                         writeBufferSize=self._writeBufferSize, binFormat=self._binFormat)
                 time.sleep(0.12)
                 self._waitForIdle()
                 self._cmdSocket.sendto(self._CMD_DATA_START, (self._sensorIP, 65000))
@@ -2580,6 +3178,7 @@ class openpylivox(object):
                             if self._showMessages: print("   " + self._sensorIP + self._format_spaces + "   -->     FAILED to start data stream")
                             if self._captureStream is not None:
                                 self._captureStream.stop()
+                                self._saveCaptureStatistics()
                             time.sleep(0.1)
                             self._isData = False
                         else:
@@ -2617,6 +3216,7 @@ class openpylivox(object):
                             self._isData = False
                             if self._captureStream is not None:
                                 self._captureStream.stop()
+                                self._saveCaptureStatistics()
                                 self._captureStream = None
                             self._isWriting = False
                             time.sleep(0.1)
@@ -2672,19 +3272,9 @@ class openpylivox(object):
             ipAddress = self._checkIP(ipAddress)
             if ipAddress:
                 IP_parts = ipAddress.split(".")
-                IPhex1 = str(hex(int(IP_parts[0]))).replace('0x', '').zfill(2)
-                IPhex2 = str(hex(int(IP_parts[1]))).replace('0x', '').zfill(2)
-                IPhex3 = str(hex(int(IP_parts[2]))).replace('0x', '').zfill(2)
-                IPhex4 = str(hex(int(IP_parts[3]))).replace('0x', '').zfill(2)
                 formattedIP = IP_parts[0].strip() + "." + IP_parts[1].strip() + "." + IP_parts[2].strip() + "." + \
                               IP_parts[3].strip()
-                cmdString = "AA011400000000a824000801" + IPhex1 + IPhex2 + IPhex3 + IPhex4
-                binString = bytes(cmdString, encoding='utf-8')
-                crc32checksum = self._crc32fromStr(binString)
-                cmdString += crc32checksum
-                binString = bytes(cmdString, encoding='utf-8')
-
-                staticIP_request = bytes.fromhex((binString).decode('ascii'))
+                staticIP_request = livoxcodec.staticIPRequest(formattedIP)
                 self._waitForIdle()
                 self._cmdSocket.sendto(staticIP_request, (self._sensorIP, 65000))
 
@@ -2855,19 +3445,7 @@ class openpylivox(object):
                     "*** Error - one or more of the extrinsic values specified are not of the correct type ***")
 
             if goodValues:
-                h_x = str(binascii.hexlify(struct.pack('<i', xi)))[2:-1]
-                h_y = str(binascii.hexlify(struct.pack('<i', yi)))[2:-1]
-                h_z = str(binascii.hexlify(struct.pack('<i', zi)))[2:-1]
-                h_roll = str(binascii.hexlify(struct.pack('<f', rollf)))[2:-1]
-                h_pitch = str(binascii.hexlify(struct.pack('<f', pitchf)))[2:-1]
-                h_yaw = str(binascii.hexlify(struct.pack('<f', yawf)))[2:-1]
-
-                cmdString = "AA012700000000b5ed0101" + h_roll + h_pitch + h_yaw + h_x + h_y + h_z
-                binString = bytes(cmdString, encoding='utf-8')
-                crc32checksum = self._crc32fromStr(binString)
-                cmdString += crc32checksum
-                binString = bytes(cmdString, encoding='utf-8')
-                setExtValues = bytes.fromhex((binString).decode('ascii'))
+                setExtValues = livoxcodec.extrinsicRequest(xi, yi, zi, rollf, pitchf, yawf)
 
                 self._waitForIdle()
                 self._cmdSocket.sendto(setExtValues, (self._sensorIP, 65000))
@@ -2915,19 +3493,8 @@ class openpylivox(object):
             if seci < 0 or seci > int(60 * 60 * 1000000):
                 seci = 0
 
-            year_b = str(binascii.hexlify(struct.pack('<B', yeari)))[2:-1]
-            month_b = str(binascii.hexlify(struct.pack('<B', monthi)))[2:-1]
-            day_b = str(binascii.hexlify(struct.pack('<B', dayi)))[2:-1]
-            hour_b = str(binascii.hexlify(struct.pack('<B', houri)))[2:-1]
-            sec_b = str(binascii.hexlify(struct.pack('<I', seci)))[2:-1]
-
             # test case Sept 10, 2020 at 17:15 UTC  -->  AA0117000000006439010A14090A1100E9A435D0337994
-            cmdString = "AA0117000000006439010A" + year_b + month_b + day_b + hour_b + sec_b
-            binString = bytes(cmdString, encoding='utf-8')
-            crc32checksum = self._crc32fromStr(binString)
-            cmdString += crc32checksum
-            binString = bytes(cmdString, encoding='utf-8')
-            setUTCValues = bytes.fromhex((binString).decode('ascii'))
+            setUTCValues = livoxcodec.utcRequest(yeari, monthi, dayi, houri, seci)
 
             self._waitForIdle()
             self._cmdSocket.sendto(setUTCValues, (self._sensorIP, 65000))
@@ -3198,6 +3765,7 @@ class openpylivox(object):
             if self._isWriting:
                 if self._captureStream is not None:
                     self._captureStream.stop()
+                    self._saveCaptureStatistics()
                 self._isWriting = False
 
 # TODO : marker
@@ -3271,6 +3839,7 @@ class openpylivox(object):
             if self._isWriting:
                 if self._captureStream is not None:
                     self._captureStream.stop()
+                    self._saveCaptureStatistics()
                 self._isWriting = False
 
     def closeFile(self):
@@ -3351,6 +3920,114 @@ class openpylivox(object):
         for i in range(len(self._mid100_sensors)):
             self._mid100_sensors[i]._showMessages = bool(new_value)
 
+    # switch between the numpy block decoders and the original point-by-point loops for real-time binary capture
+    def vectorDecoding(self, new_value):
+        self._vectorDecode = bool(new_value)
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._vectorDecode = bool(new_value)
+
+    # switch between batched recv_into reads into a preallocated ring and one recvfrom per packet
+    def batchReceive(self, new_value):
+        self._batchReceive = bool(new_value)
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._batchReceive = bool(new_value)
+
+    # switch between bounded blocking waits for packets and zero-timeout select polling
+    def blockingReceive(self, new_value):
+        self._blockingReceive = bool(new_value)
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._blockingReceive = bool(new_value)
+
+    # requested SO_RCVBUF (bytes) for the data socket, the kernel caps it at net.core.rmem_max
+    def setReceiveBufferSize(self, new_value):
+        self._receiveBufferSize = int(new_value)
+        self._applyReceiveBufferSize()
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i].setReceiveBufferSize(new_value)
+
+    def _applyReceiveBufferSize(self):
+        if isinstance(self._dataSocket, socket.socket) and self._receiveBufferSize > 0:
+            self._dataSocket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._receiveBufferSize)
+            # Linux reports twice the size that was granted (the kernel doubles it for bookkeeping overhead)
+            actual = self._dataSocket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            if sys.platform.startswith("linux"):
+                actual //= 2
+            if actual < self._receiveBufferSize:
+                if self._showMessages: print("   " + self._sensorIP + self._format_spaces + "   -->     * ISSUE: receive buffer limited to " + str(actual)
+                                             + " bytes (raise net.core.rmem_max)")
+
+    # size (bytes) of the block buffer used when writing real-time binary files, 0 writes every packet straight through
+    def setWriteBufferSize(self, new_value):
+        self._writeBufferSize = int(new_value)
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._writeBufferSize = int(new_value)
+
+    # OPENPYLIVOX binary file format written by dataStart_RT_B, 2 = memory-mappable (default), 1 = original format
+    def setBinFormat(self, new_value):
+        if new_value not in (1, 2):
+            if self._showMessages: print("   " + self._sensorIP + self._format_spaces + "   -->     * ISSUE: unknown binary file format, "
+                                         "must be 1 or 2")
+            return
+        self._binFormat = new_value
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._binFormat = new_value
+
+    # append the raw data/IMU datagrams of every following data stream to a rawcapture file ("" = off)
+    def recordRawPackets(self, filePathAndName):
+        self._rawFile = filePathAndName
+        path_file = Path(filePathAndName)
+        for i in range(len(self._mid100_sensors)):
+            new_file = ""
+            if filePathAndName:
+                if i == 0:
+                    new_file = str(path_file.with_name(path_file.stem + "_M" + path_file.suffix))
+                elif i == 1:
+                    new_file = str(path_file.with_name(path_file.stem + "_R" + path_file.suffix))
+            self._mid100_sensors[i]._rawFile = new_file
+
+    # switch between decoding straight into the SHARED_BUFF segment and copying a private array into it per record
+    # (decoding in place needs the recordConsumed event, without it records are always copied)
+    def directSharedDecoding(self, new_value):
+        self._directShared = bool(new_value)
+        for i in range(len(self._mid100_sensors)):
+            self._mid100_sensors[i]._directShared = bool(new_value)
+
+    # keep the CPU usage and the packet loss statistics of the capture stream that is being stopped
+    def _saveCaptureStatistics(self):
+        self._lastCaptureCPU = self._captureStream.cpuUsage()
+        self._lastStatusEvents = list(self._captureStream.statusEvents)
+        stats = self._captureStream.recordStats
+        if stats is not None and (not self._recordStats or self._recordStats[-1] is not stats):
+            stats["cpu_usage"] = self._lastCaptureCPU
+            self._recordStats.append(stats)
+
+    # packet loss statistics of the current or last captured record (dict), None if no record was captured
+    def captureStatistics(self):
+        if self._captureStream is not None and self._captureStream.recordStats is not None:
+            return self._captureStream.recordStats
+        if self._recordStats:
+            return self._recordStats[-1]
+        return None
+
+    # packet loss statistics of every record captured since the sensor object was created
+    def recordStatistics(self):
+        return list(self._recordStats)
+
+    # CPU usage (% of one core) of the current or most recently stopped capture thread, -1 if unknown
+    def captureCPUUsage(self):
+        if self._captureStream is not None:
+            usage = self._captureStream.cpuUsage()
+            if usage >= 0:
+                return usage
+        return self._lastCaptureCPU
+
+    # status transitions of the current or most recently stopped data stream, a list of dicts with the
+    # time (s since the epoch), the raw status word and the changed codes {attribute: (old value, new value)}
+    def lidarStatusEvents(self):
+        if self._captureStream is not None:
+            return list(self._captureStream.statusEvents)
+        return list(self._lastStatusEvents)
+
     def lidarStatusCodes(self):
         if self._isConnected:
             if self._captureStream is not None:
@@ -3504,226 +4181,194 @@ def allDoneCapturing(sensors):
     return all(stop)
 
 
-def _convertBin2CSV(filePathAndName, deleteBin):
+# OPENPYLIVOX_IMU binary file: the ASCII header "OPENPYLIVOX_IMU" followed by one 32 byte record per IMU packet
+_IMU_MAGIC = b"OPENPYLIVOX_IMU"
+_IMU_RECORD_DTYPE = np.dtype([('gyro_x', '<f4'), ('gyro_y', '<f4'), ('gyro_z', '<f4'),
+                              ('acc_x', '<f4'), ('acc_y', '<f4'), ('acc_z', '<f4'), ('time', '<f8')])
+
+
+def readIMUFile(filePathAndName, mmap=False):
+
+    # read all records of an OPENPYLIVOX_IMU binary file in one call, returns a structured array
+    # (gyro_x, gyro_y, gyro_z, acc_x, acc_y, acc_z, time), memory-mapped (read only) if mmap is True
+    with open(filePathAndName, "rb") as imuFile:
+        if imuFile.read(len(_IMU_MAGIC)) != _IMU_MAGIC:
+            raise ValueError("not an OPENPYLIVOX_IMU binary file: " + str(filePathAndName))
+    count = (Path(filePathAndName).stat().st_size - len(_IMU_MAGIC)) // _IMU_RECORD_DTYPE.itemsize
+
+    if count == 0:
+        return np.empty(0, dtype=_IMU_RECORD_DTYPE)
+    elif mmap:
+        return np.memmap(filePathAndName, dtype=_IMU_RECORD_DTYPE, mode='r', offset=len(_IMU_MAGIC), shape=(count,))
+    return np.fromfile(filePathAndName, dtype=_IMU_RECORD_DTYPE, count=count, offset=len(_IMU_MAGIC))
+
+
+def _writeIMUCSV(records, csvFile, progress=None, chunkSize=32768):
+
+    # write IMU records (any array with the _IMU_RECORD_DTYPE fields) to an open CSV file block by block,
+    # progress(records done, total records) is called after every block
+    total = len(records)
+    csvFile.write("//gyro_x,gyro_y,gyro_z,acc_x,acc_y,acc_z,time\n")
+    for start in range(0, total, chunkSize):
+        chunk = records[start:start + chunkSize]
+        block = np.empty((len(chunk), 7), dtype=np.float64)
+        for i, name in enumerate(_IMU_RECORD_DTYPE.names):
+            block[:, i] = chunk[name]
+        csvFile.write(("%.6f,%.6f,%.6f,%.6f,%.6f,%.6f,%.6f\n" * len(chunk)) % tuple(block.ravel().tolist()))
+        if progress is not None:
+            progress(start + len(chunk), total)
+
+
+def _convertIMUBin2CSV(IMU_file, deleteBin, progress=None):
+
+    try:
+        # mapped so only one block of the file is in memory at a time
+        records = readIMUFile(IMU_file, mmap=True)
+    except ValueError:
+        print("*** ERROR: The file was not recognized as an OpenPyLivox binary IMU data file ***")
+        return
+
+    pbari2 = None
+    if progress is None:
+        pbari2 = tqdm(total=len(records), unit=" records", desc="   ")
+        progress = lambda done, total: pbari2.update(done - pbari2.n)
+
+    with open(IMU_file + ".csv", "w") as csvFile2:
+        _writeIMUCSV(records, csvFile2, progress)
+
+    if pbari2 is not None:
+        pbari2.close()
+    del records
+    print("   - IMU data was converted successfully to CSV, see file: " + IMU_file + ".csv")
+    if deleteBin:
+        os.remove(IMU_file)
+        print("     * OPL IMU data binary file has been deleted")
+
+
+# records read per np.fromfile call by the converters, bounds their memory use (a few MB per chunk)
+_BIN_CHUNK_RECORDS = 32768
+
+# CSV header line and line format of every data class, dual return classes write two lines per record
+_BIN_CSV_FORMATS = {
+    1: ("//X,Y,Z,Inten-sity,Time,ReturnNum\n", "%.3f,%.3f,%.3f,%d,%.6f,1\n"),
+    2: ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n", "%.3f,%.2f,%.2f,%d,%.6f,1\n"),
+    3: ("//X,Y,Z,Inten-sity,Time,ReturnNum\n", "%.3f,%.3f,%.3f,%d,%.6f,%d\n"),
+    4: ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n", "%.3f,%.2f,%.2f,%d,%.6f,%d\n"),
+    5: ("//X,Y,Z,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n", "%.3f,%.3f,%.3f,%d,%.6f,1,%d,%d,%d\n"),
+    6: ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n", "%.3f,%.2f,%.2f,%d,%.6f,1,%d,%d,%d\n"),
+    7: ("//X,Y,Z,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n",
+        "%.3f,%.3f,%.3f,%d,%.6f,1,%d,%d,%d\n%.3f,%.3f,%.3f,%d,%.6f,2,%d,%d,%d\n"),
+    8: ("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n",
+        "%.3f,%.2f,%.2f,%d,%.6f,1,%d,%d,%d\n%.3f,%.2f,%.2f,%d,%.6f,2,%d,%d,%d\n"),
+}
+
+
+def _binReturnNumbers(records, version):
+
+    # return numbers of a block of records, an ASCII digit in v1 files
+    if version == 1:
+        return records['return'].view('u1').astype(np.int16) - ord('0')
+    return records['return']
+
+
+def _binTagColumns(tag):
+
+    # return type, spatial confidence and intensity confidence of the tag bits
+    return [(tag >> 2) & 3, (tag >> 6) & 3, (tag >> 4) & 3]
+
+
+def _binCsvColumns(records, dataClass, version):
+
+    # values of the CSV columns of a block of records (one row per record), in the order of _BIN_CSV_FORMATS
+    if dataClass in (1, 3, 5, 7):
+        columns = [records['x'] / 1000.0, records['y'] / 1000.0, records['z'] / 1000.0, records['intensity'], records['time']]
+    else:
+        columns = [records['distance'] / 1000.0, records['zenith'] / 100.0, records['azimuth'] / 100.0, records['intensity'],
+                   records['time']]
+
+    if dataClass == 3 or dataClass == 4:
+        columns.append(_binReturnNumbers(records, version))
+    elif dataClass >= 5:
+        columns += _binTagColumns(records['tag'])
+
+    if dataClass == 7:
+        columns += [records['x2'] / 1000.0, records['y2'] / 1000.0, records['z2'] / 1000.0, records['intensity2'], records['time']]
+        columns += _binTagColumns(records['tag2'])
+    elif dataClass == 8:
+        columns += [records['distance2'] / 1000.0, records['zenith'] / 100.0, records['azimuth'] / 100.0, records['intensity2'],
+                    records['time']]
+        columns += _binTagColumns(records['tag2'])
+
+    block = np.empty((len(records), len(columns)), dtype=np.float64)
+    for i in range(len(columns)):
+        block[:, i] = columns[i]
+    return block
+
+
+def _writeBinCSV(binFile, binInfo, csvFile, progress=None, chunkSize=_BIN_CHUNK_RECORDS):
+
+    # convert the records of an open OPENPYLIVOX file (positioned at the first record) block by block,
+    # progress(records done, total records) is called after every block, returns the number of records converted
+    dataClass = binInfo["dataClass"]
+    lineFormat = _BIN_CSV_FORMATS[dataClass][1]
+    total = binInfo["count"]
+    done = 0
+
+    csvFile.write(_BIN_CSV_FORMATS[dataClass][0])
+    while done < total:
+        records = np.fromfile(binFile, dtype=binInfo["dtype"], count=min(chunkSize, total - done))
+        if len(records) == 0:
+            break
+        # one %-format call formats the whole block
+        csvFile.write((lineFormat * len(records)) % tuple(_binCsvColumns(records, dataClass, binInfo["version"]).ravel().tolist()))
+        done += len(records)
+        if progress is not None:
+            progress(done, total)
+
+    return done
+
+
+def _convertBin2CSV(filePathAndName, deleteBin, progress=None):
 
     binFile = None
-    csvFile = None
-    imuFile = None
-    imu_csvFile = None
 
     try:
-        dataClass = 0
         if os.path.exists(filePathAndName) and os.path.isfile(filePathAndName):
-            bin_size = Path(filePathAndName).stat().st_size - 15
             binFile = open(filePathAndName, "rb")
 
-            checkMessage = (binFile.read(11)).decode('UTF-8')
-            if checkMessage == "OPENPYLIVOX":
-                with open(filePathAndName + ".csv", "w", 1) as csvFile:
-                    firmwareType = struct.unpack('<h', binFile.read(2))[0]
-                    dataType = struct.unpack('<h', binFile.read(2))[0]
-                    divisor = 1
-
-                    if firmwareType >= 1 and firmwareType <= 3:
-                        if dataType >= 0 and dataType <= 5:
-                            print("CONVERTING OPL BINARY DATA, PLEASE WAIT...")
-                            if firmwareType == 1 and dataType == 0:
-                                csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum\n")
-                                dataClass = 1
-                                divisor = 21
-                            elif firmwareType == 1 and dataType == 1:
-                                csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n")
-                                dataClass = 2
-                                divisor = 17
-                            elif firmwareType > 1 and dataType == 0:
-                                csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum\n")
-                                dataClass = 3
-                                divisor = 22
-                            elif firmwareType > 1 and dataType == 1:
-                                csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum\n")
-                                dataClass = 4
-                                divisor = 18
-                            elif firmwareType == 1 and dataType == 2:
-                                csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n")
-                                dataClass = 5
-                                divisor = 22
-                            elif firmwareType == 1 and dataType == 3:
-                                csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n")
-                                dataClass = 6
-                                divisor = 18
-                            elif firmwareType == 1 and dataType == 4:
-                                csvFile.write("//X,Y,Z,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n")
-                                dataClass = 7
-                                divisor = 36
-                            elif firmwareType == 1 and dataType == 5:
-                                csvFile.write("//Distance,Zenith,Azimuth,Inten-sity,Time,ReturnNum,ReturnType,sConf,iConf\n")
-                                dataClass = 8
-                                divisor = 24
-
-                            num_recs = int(bin_size / divisor)
-                            pbari = tqdm(total=num_recs, unit=" pts", desc="   ")
-
-                            while True:
-                                try:
-                                    #Mid-40/100 Cartesian single return
-                                    if dataClass == 1:
-                                        coord1 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord3 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        intensity = int.from_bytes(binFile.read(1), byteorder='little')
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.3f}".format(
-                                            coord2) + "," + "{0:.3f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + ",1\n")
-
-                                    # Mid-40/100 Spherical single return
-                                    elif dataClass == 2:
-                                        coord1 = float(struct.unpack('<I', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        coord3 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        intensity = int.from_bytes(binFile.read(1), byteorder='little')
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.2f}".format(
-                                            coord2) + "," + "{0:.2f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + ",1\n")
-
-                                    # Mid-40/100 Cartesian multiple return
-                                    elif dataClass == 3:
-                                        coord1 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord3 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        intensity = int.from_bytes(binFile.read(1), byteorder='little')
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        returnNum = (binFile.read(1)).decode('UTF-8')
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.3f}".format(
-                                            coord2) + "," + "{0:.3f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + "," + returnNum + "\n")
-
-                                    # Mid-40/100 Spherical multiple return
-                                    elif dataClass == 4:
-                                        coord1 = float(struct.unpack('<I', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        coord3 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        intensity = int.from_bytes(binFile.read(1), byteorder='little')
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        returnNum = (binFile.read(1)).decode('UTF-8')
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.2f}".format(
-                                            coord2) + "," + "{0:.2f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + "," + returnNum + "\n")
-
-                                    # Horizon/Tele-15 Cartesian single return (SDK Data Type 2)
-                                    elif dataClass == 5:
-                                        coord1 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord3 = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        intensity = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bits = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_conf = str(int(tag_bits[0:2], 2))
-                                        intensity_conf = str(int(tag_bits[2:4], 2))
-                                        returnType = str(int(tag_bits[4:6], 2))
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.3f}".format(
-                                            coord2) + "," + "{0:.3f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + ",1," + returnType + ","
-                                            + spatial_conf + "," + intensity_conf + "\n")
-
-                                    # Horizon/Tele-15 Spherical single return (SDK Data Type 3)
-                                    elif dataClass == 6:
-                                        coord1 = float(struct.unpack('<I', binFile.read(4))[0]) / 1000.0
-                                        coord2 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        coord3 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        intensity = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bits = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_conf = str(int(tag_bits[0:2], 2))
-                                        intensity_conf = str(int(tag_bits[2:4], 2))
-                                        returnType = str(int(tag_bits[4:6], 2))
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                        csvFile.write("{0:.3f}".format(coord1) + "," + "{0:.2f}".format(
-                                            coord2) + "," + "{0:.2f}".format(coord3) + "," + str(
-                                            intensity) + "," + "{0:.6f}".format(timestamp_sec) + ",1," + returnType + ","
-                                                      + spatial_conf + "," + intensity_conf + "\n")
-
-                                    # Horizon/Tele-15 Cartesian dual return (SDK Data Type 4)
-                                    elif dataClass == 7:
-                                        coord1a = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord2a = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord3a = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        intensitya = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bitsa = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_confa = str(int(tag_bitsa[0:2], 2))
-                                        intensity_confa = str(int(tag_bitsa[2:4], 2))
-                                        returnTypea = str(int(tag_bitsa[4:6], 2))
-
-                                        coord1b = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord2b = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        coord3b = float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0
-                                        intensityb = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bitsb = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_confb = str(int(tag_bitsb[0:2], 2))
-                                        intensity_confb = str(int(tag_bitsb[2:4], 2))
-                                        returnTypeb = str(int(tag_bitsb[4:6], 2))
-
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-
-                                        csvFile.write("{0:.3f}".format(coord1a) + "," + "{0:.3f}".format(
-                                            coord2a) + "," + "{0:.3f}".format(coord3a) + "," + str(
-                                            intensitya) + "," + "{0:.6f}".format(timestamp_sec) + ",1," + returnTypea + ","
-                                                      + spatial_confa + "," + intensity_confa + "\n")
-
-                                        csvFile.write("{0:.3f}".format(coord1b) + "," + "{0:.3f}".format(
-                                            coord2b) + "," + "{0:.3f}".format(coord3b) + "," + str(
-                                            intensityb) + "," + "{0:.6f}".format(timestamp_sec) + ",2," + returnTypeb + ","
-                                                      + spatial_confb + "," + intensity_confb + "\n")
-
-                                    # Horizon/Tele-15 Spherical dual return (SDK Data Type 5)
-                                    elif dataClass == 8:
-                                        coord2 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        coord3 = float(struct.unpack('<H', binFile.read(2))[0]) / 100.0
-                                        coord1a = float(struct.unpack('<I', binFile.read(4))[0]) / 1000.0
-                                        intensitya = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bitsa = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_confa = str(int(tag_bitsa[0:2], 2))
-                                        intensity_confa = str(int(tag_bitsa[2:4], 2))
-                                        returnTypea = str(int(tag_bitsa[4:6], 2))
-
-                                        coord1b = float(struct.unpack('<I', binFile.read(4))[0]) / 1000.0
-                                        intensityb = struct.unpack('<B', binFile.read(1))[0]
-                                        tag_bitsb = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                        spatial_confb = str(int(tag_bitsb[0:2], 2))
-                                        intensity_confb = str(int(tag_bitsb[2:4], 2))
-                                        returnTypeb = str(int(tag_bitsb[4:6], 2))
-
-                                        timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-
-                                        csvFile.write("{0:.3f}".format(coord1a) + "," + "{0:.2f}".format(
-                                            coord2) + "," + "{0:.2f}".format(coord3) + "," + str(
-                                            intensitya) + "," + "{0:.6f}".format(timestamp_sec) + ",1," + returnTypea + ","
-                                                      + spatial_confa + "," + intensity_confa + "\n")
-
-                                        csvFile.write("{0:.3f}".format(coord1b) + "," + "{0:.2f}".format(
-                                            coord2) + "," + "{0:.2f}".format(coord3) + "," + str(
-                                            intensityb) + "," + "{0:.6f}".format(timestamp_sec) + ",2," + returnTypeb + ","
-                                                      + spatial_confb + "," + intensity_confb + "\n")
-
-                                    pbari.update(1)
-
-                                except:
-                                    break
+            # v1 and v2 headers, the file is left at the first record
+            binInfo = _readBinHeader(binFile)
+            if binInfo is not None:
+                firmwareType = binInfo["firmwareType"]
+
+                if firmwareType >= 1 and firmwareType <= 3:
+                    if binInfo["dataClass"]:
+                        print("CONVERTING OPL BINARY DATA, PLEASE WAIT...")
+
+                        pbari = None
+                        pointProgress = progress
+                        if pointProgress is None:
+                            pbari = tqdm(total=binInfo["count"], unit=" pts", desc="   ")
+                            pointProgress = lambda done, total: pbari.update(done - pbari.n)
+
+                        with open(filePathAndName + ".csv", "w") as csvFile:
+                            _writeBinCSV(binFile, binInfo, csvFile, pointProgress)
 
+                        if pbari is not None:
                             pbari.close()
-                            binFile.close()
-                            print("   - Point data was converted successfully to CSV, see file: " + filePathAndName + ".csv")
-                            if deleteBin:
-                                os.remove(filePathAndName)
-                                print("     * OPL point data binary file has been deleted")
-                            print()
-                            time.sleep(0.5)
-                        else:
-                            print("*** ERROR: The OPL point data binary file reported a wrong data type ***")
-                            binFile.close()
+                        binFile.close()
+                        print("   - Point data was converted successfully to CSV, see file: " + filePathAndName + ".csv")
+                        if deleteBin:
+                            os.remove(filePathAndName)
+                            print("     * OPL point data binary file has been deleted")
+                        print()
+                        time.sleep(0.5)
                     else:
-                        print("*** ERROR: The OPL point data binary file reported a wrong firmware type ***")
+                        print("*** ERROR: The OPL point data binary file reported a wrong data type ***")
                         binFile.close()
+                else:
+                    print("*** ERROR: The OPL point data binary file reported a wrong firmware type ***")
+                    binFile.close()
 
                 # check for and convert IMU BIN data (if it exists)
                 path_file = Path(filePathAndName)
@@ -3732,42 +4377,7 @@ def _convertBin2CSV(filePathAndName, deleteBin):
                 IMU_file = filename + "_IMU" + exten
 
                 if os.path.exists(IMU_file) and os.path.isfile(IMU_file):
-                    bin_size2 = Path(IMU_file).stat().st_size - 15
-                    num_recs = int(bin_size2/32)
-                    binFile2 = open(IMU_file, "rb")
-
-                    checkMessage = (binFile2.read(15)).decode('UTF-8')
-                    if checkMessage == "OPENPYLIVOX_IMU":
-                        with open(IMU_file + ".csv", "w", 1) as csvFile2:
-                            csvFile2.write("//gyro_x,gyro_y,gyro_z,acc_x,acc_y,acc_z,time\n")
-                            pbari2 = tqdm(total=num_recs, unit=" records", desc="   ")
-                            while True:
-                                try:
-                                    gyro_x = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    gyro_y = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    gyro_z = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_x = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_y = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_z = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    timestamp_sec = "{0:.6f}".format(struct.unpack('<d', binFile2.read(8))[0])
-
-                                    csvFile2.write(gyro_x + "," + gyro_y + "," + gyro_z + "," + acc_x + "," + acc_y +
-                                        "," + acc_z + "," + timestamp_sec + "\n")
-
-                                    pbari2.update(1)
-
-                                except:
-                                    break
-
-                            pbari2.close()
-                            binFile2.close()
-                            print("   - IMU data was converted successfully to CSV, see file: " + IMU_file + ".csv")
-                            if deleteBin:
-                                os.remove(IMU_file)
-                                print("     * OPL IMU data binary file has been deleted")
-                    else:
-                        print("*** ERROR: The file was not recognized as an OpenPyLivox binary IMU data file ***")
-                        binFile2.close()
+                    _convertIMUBin2CSV(IMU_file, deleteBin, progress)
             else:
                 print("*** ERROR: The file was not recognized as an OpenPyLivox binary point data file ***")
                 binFile.close()
@@ -3775,168 +4385,131 @@ def _convertBin2CSV(filePathAndName, deleteBin):
         binFile.close()
         print("*** ERROR: An unknown error occurred while converting OPL binary data ***")
 
-def convertBin2CSV(filePathAndName, deleteBin=False):
+# progress is an optional callable progress(records converted, total records) replacing the progress bar
+def convertBin2CSV(filePathAndName, deleteBin=False, progress=None):
     print()
     path_file = Path(filePathAndName)
     filename = path_file.stem
     exten = path_file.suffix
 
     if os.path.isfile(filePathAndName):
-        _convertBin2CSV(filePathAndName, deleteBin)
+        _convertBin2CSV(filePathAndName, deleteBin, progress)
 
     if os.path.isfile(filename + "_M" + exten):
-        _convertBin2CSV(filename + "_M" + exten, deleteBin)
+        _convertBin2CSV(filename + "_M" + exten, deleteBin, progress)
 
     if os.path.isfile(filename + "_R" + exten):
-        _convertBin2CSV(filename + "_R" + exten, deleteBin)
+        _convertBin2CSV(filename + "_R" + exten, deleteBin, progress)
+
+def _lasColumns(records, dataClass, version):
+
+    # integer coordinates (mm), intensity, GPS time and return number of a block of Cartesian records,
+    # the two returns of a dual return record become consecutive points
+    if dataClass == 7:
+        x = np.stack((records['x'], records['x2']), axis=1).ravel()
+        y = np.stack((records['y'], records['y2']), axis=1).ravel()
+        z = np.stack((records['z'], records['z2']), axis=1).ravel()
+        intensity = np.stack((records['intensity'], records['intensity2']), axis=1).ravel()
+        times = np.repeat(records['time'], 2)
+        returnNums = np.tile(np.array([1, 2], dtype=np.uint8), len(records))
+    else:
+        x = records['x']
+        y = records['y']
+        z = records['z']
+        intensity = records['intensity']
+        times = records['time']
+        if dataClass == 3:
+            returnNums = _binReturnNumbers(records, version)
+        else:
+            returnNums = np.ones(len(records), dtype=np.uint8)
+
+    return x, y, z, intensity, times, returnNums
+
+
+def _writeBinLAS(binFile, binInfo, lasFilePathAndName, progress=None, chunkSize=_BIN_CHUNK_RECORDS):
+
+    # convert the Cartesian records of an open OPENPYLIVOX file to a LAS 1.2 (point format 3) file in two streaming passes,
+    # the first pass finds the coordinate offsets, the second writes the points block by block
+    dataClass = binInfo["dataClass"]
+    total = binInfo["count"]
+
+    mins = np.full(3, np.iinfo(np.int32).max, dtype=np.int64)
+    done = 0
+    while done < total:
+        records = np.fromfile(binFile, dtype=binInfo["dtype"], count=min(chunkSize, total - done))
+        if len(records) == 0:
+            break
+        x, y, z = _lasColumns(records, dataClass, binInfo["version"])[0:3]
+        mins = np.minimum(mins, [x.min(), y.min(), z.min()])
+        done += len(records)
+    total = done
+    if total == 0:
+        mins[:] = 0
+
+    # offsets are the whole metres below the smallest coordinates
+    offsets = np.floor_divide(mins, 1000)
+
+    hdr = laspy.LasHeader(point_format=3, version="1.2")
+    # the ID fields must be less than or equal to 32 characters in length
+    hdr.system_identifier = "OpenPyLivox"
+    hdr.generating_software = "OpenPyLivox V1.1.0"
+    hdr.offsets = offsets.astype(np.float64)
+    hdr.scales = np.array([0.001, 0.001, 0.001])
+
+    binFile.seek(binInfo["offset"])
+    done = 0
+    with laspy.open(lasFilePathAndName, mode="w", header=hdr) as lasFile:
+        while done < total:
+            records = np.fromfile(binFile, dtype=binInfo["dtype"], count=min(chunkSize, total - done))
+            if len(records) == 0:
+                break
+            x, y, z, intensity, times, returnNums = _lasColumns(records, dataClass, binInfo["version"])
+
+            points = laspy.ScaleAwarePointRecord.zeros(len(x), header=hdr)
+            # the records hold millimetres, the same integers as the LAS coordinates at a 0.001 scale
+            points.X = x - offsets[0] * 1000
+            points.Y = y - offsets[1] * 1000
+            points.Z = z - offsets[2] * 1000
+            points.gps_time = times
+            points.intensity = intensity
+            points.return_number = returnNums
+            lasFile.write_points(points)
+
+            done += len(records)
+            if progress is not None:
+                progress(done, total)
 
-def _convertBin2LAS(filePathAndName, deleteBin):
+    return done
+
+
+def _convertBin2LAS(filePathAndName, deleteBin, progress=None):
 
     binFile = None
-    csvFile = None
-    imuFile = None
-    imu_csvFile = None
 
     try:
-        dataClass = 0
         if os.path.exists(filePathAndName) and os.path.isfile(filePathAndName):
-            bin_size = Path(filePathAndName).stat().st_size - 15
             binFile = open(filePathAndName, "rb")
 
-            checkMessage = (binFile.read(11)).decode('UTF-8')
-            if checkMessage == "OPENPYLIVOX":
-                firmwareType = struct.unpack('<h', binFile.read(2))[0]
-                dataType = struct.unpack('<h', binFile.read(2))[0]
-                divisor = 1
+            # v1 and v2 headers, the file is left at the first record
+            binInfo = _readBinHeader(binFile)
+            if binInfo is not None:
+                firmwareType = binInfo["firmwareType"]
 
                 if firmwareType >= 1 and firmwareType <= 3:
                     #LAS file creation only works with Cartesian data types (decided not to convert spherical obs.)
-                    if dataType == 0 or dataType == 2 or dataType == 4:
+                    if binInfo["dataClass"] in (1, 3, 5, 7):
                         print("CONVERTING OPL BINARY DATA, PLEASE WAIT...")
 
-                        coord1s = []
-                        coord2s = []
-                        coord3s = []
-                        intensity = []
-                        times = []
-                        returnNums = []
-
-                        if firmwareType == 1 and dataType == 0:
-                            dataClass = 1
-                            divisor = 21
-                        elif firmwareType > 1 and dataType == 0:
-                            dataClass = 3
-                            divisor = 22
-                        elif firmwareType == 1 and dataType == 2:
-                            dataClass = 5
-                            divisor = 22
-                        elif firmwareType == 1 and dataType == 4:
-                            dataClass = 7
-                            divisor = 36
-
-                        num_recs = int(bin_size / divisor)
-                        pbari = tqdm(total=num_recs, unit=" pts", desc="   ")
-
-                        while True:
-                            try:
-                                #Mid-40/100 Cartesian single return
-                                if dataClass == 1:
-                                    coord1s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord2s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord3s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    intensity.append(int.from_bytes(binFile.read(1), byteorder='little'))
-                                    times.append(float(struct.unpack('<d', binFile.read(8))[0]))
-                                    returnNums.append(1)
-
-                                # Mid-40/100 Cartesian multiple return
-                                elif dataClass == 3:
-                                    coord1s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord2s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord3s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    intensity.append(int.from_bytes(binFile.read(1), byteorder='little'))
-                                    times.append(float(struct.unpack('<d', binFile.read(8))[0]))
-                                    returnNums.append(int((binFile.read(1)).decode('UTF-8')))
-
-                                # Horizon/Tele-15 Cartesian single return (SDK Data Type 2)
-                                elif dataClass == 5:
-                                    coord1s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord2s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord3s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    intensity.append(struct.unpack('<B', binFile.read(1))[0])
-                                    tag_bits = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                    times.append(float(struct.unpack('<d', binFile.read(8))[0]))
-                                    returnNums.append(1)
-
-                                # Horizon/Tele-15 Cartesian dual return (SDK Data Type 4)
-                                elif dataClass == 7:
-                                    coord1s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord2s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord3s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    intensity.append(struct.unpack('<B', binFile.read(1))[0])
-                                    tag_bits = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                    returnNums.append(1)
-
-                                    coord1s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord2s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    coord3s.append(float(struct.unpack('<i', binFile.read(4))[0]) / 1000.0)
-                                    intensity.append(struct.unpack('<B', binFile.read(1))[0])
-                                    tag_bits = str(bin(int.from_bytes(binFile.read(1), byteorder='little')))[2:].zfill(8)
-                                    returnNums.append(2)
-
-                                    timestamp_sec = float(struct.unpack('<d', binFile.read(8))[0])
-                                    times.append(timestamp_sec)
-                                    times.append(timestamp_sec)
-
-                                pbari.update(1)
-
-                            except:
-                                break
-
-                        #save lists of point data attributes to LAS file
-                        hdr = laspy.header.Header()
-                        hdr.version = "1.2"
-                        hdr.data_format_id = 3
-
-                        # the following ID fields must be less than or equal to 32 characters in length
-                        System_ID = "OpenPyLivox"
-                        Software_ID = "OpenPyLivox V1.1.0"
-
-                        if len(System_ID) < 32:
-                            missingLength = 32 - len(System_ID)
-                            for i in range(0, missingLength):
-                                System_ID += " "
+                        pbari = None
+                        pointProgress = progress
+                        if pointProgress is None:
+                            pbari = tqdm(total=binInfo["count"], unit=" pts", desc="   ")
+                            pointProgress = lambda done, total: pbari.update(done - pbari.n)
 
-                        if len(Software_ID) < 32:
-                            missingLength = 32 - len(Software_ID)
-                            for i in range(0, missingLength):
-                                Software_ID += " "
+                        _writeBinLAS(binFile, binInfo, filePathAndName + ".las", pointProgress)
 
-                        hdr.system_id = System_ID
-                        hdr.software_id = Software_ID
-
-                        lasfile = laspy.file.File(filePathAndName + ".las", mode="w", header=hdr)
-
-                        coord1s = np.asarray(coord1s, dtype=np.float32)
-                        coord2s = np.asarray(coord2s, dtype=np.float32)
-                        coord3s = np.asarray(coord3s, dtype=np.float32)
-
-                        xmin = np.floor(np.min(coord1s))
-                        ymin = np.floor(np.min(coord2s))
-                        zmin = np.floor(np.min(coord3s))
-                        lasfile.header.offset = [xmin, ymin, zmin]
-
-                        lasfile.header.scale = [0.001, 0.001, 0.001]
-
-                        lasfile.x = coord1s
-                        lasfile.y = coord2s
-                        lasfile.z = coord3s
-                        lasfile.gps_time = np.asarray(times, dtype=np.float32)
-                        lasfile.intensity = np.asarray(intensity, dtype=np.int16)
-                        lasfile.return_num = np.asarray(returnNums, dtype=np.int8)
-
-                        lasfile.close()
-
-                        pbari.close()
+                        if pbari is not None:
+                            pbari.close()
                         binFile.close()
                         print("   - Point data was converted successfully to LAS, see file: " + filePathAndName + ".las")
                         if deleteBin:
@@ -3958,42 +4531,7 @@ def _convertBin2LAS(filePathAndName, deleteBin):
                 IMU_file = filename + "_IMU" + exten
 
                 if os.path.exists(IMU_file) and os.path.isfile(IMU_file):
-                    bin_size2 = Path(IMU_file).stat().st_size - 15
-                    num_recs = int(bin_size2/32)
-                    binFile2 = open(IMU_file, "rb")
-
-                    checkMessage = (binFile2.read(15)).decode('UTF-8')
-                    if checkMessage == "OPENPYLIVOX_IMU":
-                        with open(IMU_file + ".csv", "w", 1) as csvFile2:
-                            csvFile2.write("//gyro_x,gyro_y,gyro_z,acc_x,acc_y,acc_z,time\n")
-                            pbari2 = tqdm(total=num_recs, unit=" records", desc="   ")
-                            while True:
-                                try:
-                                    gyro_x = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    gyro_y = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    gyro_z = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_x = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_y = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    acc_z = "{0:.6f}".format(struct.unpack('<f', binFile2.read(4))[0])
-                                    timestamp_sec = "{0:.6f}".format(struct.unpack('<d', binFile2.read(8))[0])
-
-                                    csvFile2.write(gyro_x + "," + gyro_y + "," + gyro_z + "," + acc_x + "," + acc_y +
-                                        "," + acc_z + "," + timestamp_sec + "\n")
-
-                                    pbari2.update(1)
-
-                                except:
-                                    break
-
-                            pbari2.close()
-                            binFile2.close()
-                            print("   - IMU data was converted successfully to CSV, see file: " + IMU_file + ".csv")
-                            if deleteBin:
-                                os.remove(IMU_file)
-                                print("     * OPL IMU data binary file has been deleted")
-                    else:
-                        print("*** ERROR: The file was not recognized as an OpenPyLivox binary IMU data file ***")
-                        binFile2.close()
+                    _convertIMUBin2CSV(IMU_file, deleteBin, progress)
             else:
                 print("*** ERROR: The file was not recognized as an OpenPyLivox binary point data file ***")
                 binFile.close()
@@ -4001,17 +4539,18 @@ def _convertBin2LAS(filePathAndName, deleteBin):
         binFile.close()
         print("*** ERROR: An unknown error occurred while converting OPL binary data ***")
 
-def convertBin2LAS(filePathAndName, deleteBin=False):
+# progress is an optional callable progress(records converted, total records) replacing the progress bar
+def convertBin2LAS(filePathAndName, deleteBin=False, progress=None):
     print()
     path_file = Path(filePathAndName)
     filename = path_file.stem
     exten = path_file.suffix
 
     if os.path.isfile(filePathAndName):
-        _convertBin2LAS(filePathAndName, deleteBin)
+        _convertBin2LAS(filePathAndName, deleteBin, progress)
 
     if os.path.isfile(filename + "_M" + exten):
-        _convertBin2LAS(filename + "_M" + exten, deleteBin)
+        _convertBin2LAS(filename + "_M" + exten, deleteBin, progress)
 
     if os.path.isfile(filename + "_R" + exten):
-        _convertBin2LAS(filename + "_R" + exten, deleteBin)
+        _convertBin2LAS(filename + "_R" + exten, deleteBin, progress)
@@ -36,7 +36,8 @@ from multiprocessing import shared_memory
 
 class PointCloudProcessor:
     
-    def __init__(self, gps_file_name, null_points, num_points, data_ready_for_proc, data_processor_empty, data_processor_not_copying):
+    def __init__(self, gps_file_name, null_points, num_points, data_ready_for_proc, data_processor_empty, data_processor_not_copying,
+                 slot_ring=None, record_consumed=None):
         
         
         #self.data_array = None
@@ -46,19 +47,27 @@ class PointCloudProcessor:
         self.data_processor_empty = data_processor_empty
         self.not_copying = data_processor_not_copying
         self.null_points = null_points
+        #Optional event set once a record has been copied out of SHARED_BUFF, the capture thread may then decode into it
+        self.record_consumed = record_consumed
+        #Optional ring of shared point buffers (slotring.SlotRing) used instead of SHARED_BUFF and the events
+        self.slot_ring = slot_ring
         
         #Read collection config file for parameters and routines
         self.conf = configparser.ConfigParser()
         self.conf.read('processing_config.ini') 
         self.conf_sections = self.conf.sections()
+        #Select the processing kernels (NumPy or Numba), NumPy if the section is missing
+        backend = pf.set_backend(self.conf.get('Backend', 'kernel_backend', fallback='numpy'))
+        print("PROCESSOR SAYS: processing backend: ", backend)
 
         
-        #Obtain data array from shared memory
-        self.shared_memory_array = shared_memory.SharedMemory(name='SHARED_BUFF')
-        #Bind shared data array to numpy array
-        self.shared_array = np.ndarray((self._num_points,3), dtype='float32', buffer=self.shared_memory_array.buf)
-        print("PROCESSOR SAYS: shared_memory: ",self.shared_memory_array)
-        print("PROCESSOR SAYS: shape of shared_array: ",self.shared_array.shape)
+        if self.slot_ring is None:
+            #Obtain data array from shared memory
+            self.shared_memory_array = shared_memory.SharedMemory(name='SHARED_BUFF')
+            #Bind shared data array to numpy array
+            self.shared_array = np.ndarray((self._num_points,3), dtype='float32', buffer=self.shared_memory_array.buf)
+            print("PROCESSOR SAYS: shared_memory: ",self.shared_memory_array)
+            print("PROCESSOR SAYS: shape of shared_array: ",self.shared_array.shape)
         #Load ground truth elevation measurements
         #self.ground_elevation = np.load('FILENAME.npy')
         self.ground_elevation = 3
@@ -74,21 +83,38 @@ class PointCloudProcessor:
     def run_processing(self, records_per_session):
         for n in range(records_per_session):
             file_num = str(n)
-            #Wait until data is ready
-            print("PROCESSOR SAYS: Processor waiting for data!")
-            self.data_ready.wait()
-            #Set flag to indicate copying is in progress, not to start overwriting
-            self.not_copying.clear()
-            print("PROCESSOR SAYS: Processor copying data from shared array!")
-            #Copy data from shared array locally to process
-            self.data = np.copy(self.shared_array)
-            filename_bytes = self.gps_file_name.value
-            filename_string = filename_bytes.decode('utf-8')
-            nullPts = self.null_points.value
-            #Reset copying flag
-            self.not_copying.set()
-            #Set flag to True indicating that this process is occupied
-            self.data_processor_empty.clear()
+            if self.slot_ring is not None:
+                #Wait for a filled slot, it stays owned by the processor (no copy) until released below,
+                #stop once the capture side has ended the session without publishing any more records
+                print("PROCESSOR SAYS: Processor waiting for a filled slot!")
+                record = None
+                while record is None:
+                    record = self.slot_ring.next(timeout=1.0)
+                    if record is None and self.slot_ring.finished():
+                        print("PROCESSOR SAYS: Capture session ended after " + file_num + " records!")
+                        return
+                slot, nullPts, filename_string = record
+                self.data = self.slot_ring.array(slot)
+            else:
+                #Wait until data is ready
+                print("PROCESSOR SAYS: Processor waiting for data!")
+                self.data_ready.wait()
+                #Set flag to indicate copying is in progress, not to start overwriting
+                self.not_copying.clear()
+                print("PROCESSOR SAYS: Processor copying data from shared array!")
+                #Copy data from shared array locally to process
+                self.data = np.copy(self.shared_array)
+                filename_bytes = self.gps_file_name.value
+                filename_string = filename_bytes.decode('utf-8')
+                nullPts = self.null_points.value
+                #Record has been taken out of the shared array, the capture thread may start writing the next one into it
+                self.data_ready.clear()
+                if self.record_consumed is not None:
+                    self.record_consumed.set()
+                #Reset copying flag
+                self.not_copying.set()
+                #Set flag to True indicating that this process is occupied
+                self.data_processor_empty.clear()
             
             #---------Ground/snow elevation estimation routine----------
             
@@ -135,21 +161,44 @@ class PointCloudProcessor:
                                  float(self.conf['Density3D']['max_distance_y']),
                                  float(self.conf['Density3D']['max_distance_z']))
                 
-                #function call for 3d density routine
-                density3d = pf.Binning3D(self.data, bin_sizes, 
-                                               use_distance_params, max_distances)
+                #dense grid, or only the occupied voxels when the grid would exceed the memory budget
+                output_mode = self.conf.get('Density3D', 'output_mode', fallback='dense')
+                max_dense_bytes = int(self.conf.getfloat('Density3D', 'max_dense_mb', fallback=64) * 1024 * 1024)
+                
+                #function call for 3d density routine, over the fixed config grid or bins from the data
+                if self.conf.getboolean('Density3D', 'fixed_edges', fallback=False):
+                    origin = (float(self.conf['Density3D']['origin_x']),
+                              float(self.conf['Density3D']['origin_y']),
+                              float(self.conf['Density3D']['origin_z']))
+                    num_bins = tuple(int(round(d/s)) for d,s in zip(max_distances, bin_sizes))
+                    density3d = pf.FixedBinning3D(self.data, origin, bin_sizes, num_bins,
+                                                  self.conf.get('Density3D', 'count_dtype', fallback='uint16'),
+                                                  output_mode, max_dense_bytes)
+                else:
+                    density3d = pf.Binning3D(self.data, bin_sizes, 
+                                                   use_distance_params, max_distances,
+                                                   output_mode, max_dense_bytes)
                 
                 #Generate binary filename and save data to file
+                #(sparse files are .npz, pf.LoadDensity3D reads and densifies both)
                 print("PROCESSOR SAYS: Processor saving 3d density data file!")
-                np.save(filename_string + '_3d_density_'+file_num+'.npy', density3d)
+                if isinstance(density3d, pf.SparseVoxels):
+                    density3d.save(filename_string + '_3d_density_'+file_num+'.npz')
+                else:
+                    np.save(filename_string + '_3d_density_'+file_num+'.npy', density3d)
             
                 
             #------ Put in more data processing function calls here if desired ------
             
             #------------------------------------------------------------------------
             
-            #Set flag to indicate process is complete and ready for more data    
-            self.data_processor_empty.set()
+            if self.slot_ring is not None:
+                #Hand the slot back to the capture side
+                self.data = None
+                self.slot_ring.release(slot)
+            else:
+                #Set flag to indicate process is complete and ready for more data    
+                self.data_processor_empty.set()
              
             
         
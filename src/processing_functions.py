@@ -8,9 +8,13 @@ Created on Mon Jun 27 15:27:10 2022
 
 # Module containing point cloud processing functions. Functions are called in 
 # pointcloudprocessor.py. Parameters for arguments are found in processing_config.ini.
-# At the moment, the JIT compilation given by Numba is not implemented due to some Numpy
-# functionality which is not supported. Thorough testing has not been done as to whether 
-# the JIT compilation is faster with these routines.
+# Routines that reduce points per 2D/3D bin build a BinIndex (linear bin key of every point,
+# grouped once) and use its per-bin min, max, sum, count, mean, variance and order statistics.
+# The point loops of the routines exist twice: as NumPy array operations and as Numba
+# kernels (written with plain loops and the NumPy calls Numba supports). The kernels are
+# compiled on first use and cached on disk (cache=True), so only the first session after an
+# update pays the compile time. Which backend is used is set with set_backend(), from the
+# [Backend] section of processing_config.ini, and NumPy is used when Numba is not installed.
 
 # Written by Fletcher Wadsworth for NCAR|UCAR, found at:
 #     https://github.com/fwadswor/SnowMeasureLivox-NCAR
@@ -20,14 +24,299 @@ Created on Mon Jun 27 15:27:10 2022
 # &&&&&&&&&&&&
 
 #Import libraries
-#from numba import jit
 import numpy as np
 #import math
+#Numba is optional, the kernels are only compiled when it is installed
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+#Kernel backend of the processing routines, 'numpy' or 'numba'
+_backend = 'numpy'
+
+def set_backend(name):
+    """
+    Selects the kernel backend of the processing routines.
+    
+    Parameters
+    ----------
+        name : str
+            'numpy', 'numba' or 'auto' (Numba when installed, NumPy otherwise)
+    
+    Returns
+    -------
+        backend : str
+            backend in use, 'numpy' when Numba was asked for but is not installed
+    """
+    global _backend
+    name = name.strip().lower()
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'numpy'
+    if name not in ('numpy', 'numba'):
+        raise ValueError("unknown processing backend: " + name)
+    if name == 'numba' and numba is None:
+        print("Numba is not installed, using the NumPy processing backend")
+        name = 'numpy'
+    _backend = name
+    return _backend
+
+
+def get_backend():
+    return _backend
+
+
+#----- Numba kernels -----
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _ground_reduce_numba(group, z, num_groups, min_thresh):
+        #Per group min, then sum and count of the points within min_thresh of it, point by point
+        point_count = group.shape[0]
+        min_z = np.full(num_groups, np.inf, dtype=np.float32)
+        for p1 in range(point_count):
+            if z[p1] < min_z[group[p1]]:
+                min_z[group[p1]] = z[p1]
+        
+        sum_z = np.zeros(num_groups, dtype=np.float32)
+        count_z = np.zeros(num_groups, dtype=np.int32)
+        near_min = np.zeros(point_count, dtype=np.bool_)
+        for p2 in range(point_count):
+            b = group[p2]
+            if np.float64(z[p2]) <= np.float64(min_z[b]) + min_thresh:
+                sum_z[b] += z[p2]
+                count_z[b] += 1
+                near_min[p2] = True
+        return sum_z, count_z, near_min
+
+    @numba.njit(cache=True)
+    def _histogram3d_numba(data, edges_x, edges_y, edges_z, hist):
+        #Count points per bin with the edges and edge rules of np.histogramdd
+        #(bins are half open except the last one, which includes its right edge)
+        for p in range(data.shape[0]):
+            ix = _edge_bin(edges_x, np.float64(data[p, 0]))
+            iy = _edge_bin(edges_y, np.float64(data[p, 1]))
+            iz = _edge_bin(edges_z, np.float64(data[p, 2]))
+            if ix >= 0 and iy >= 0 and iz >= 0:
+                hist[ix, iy, iz] += 1
+        return hist
+
+    @numba.njit(cache=True)
+    def _edge_bin(edges, value):
+        #Bin of value, -1 if outside the edges (or NaN)
+        num_bins = edges.shape[0] - 1
+        if not (edges[0] <= value <= edges[num_bins]):
+            return -1
+        if value == edges[num_bins]:
+            return num_bins - 1
+        #Guess from the (uniform) edge spacing, then step to the bin whose edges enclose value
+        index = min(int((value - edges[0]) / (edges[num_bins] - edges[0]) * num_bins), num_bins - 1)
+        while index > 0 and value < edges[index]:
+            index -= 1
+        while index < num_bins - 1 and value >= edges[index + 1]:
+            index += 1
+        return index
+
+
+def _histogram_edges(values, num_bins):
+    #Bin edges np.histogramdd uses for an integer number of bins
+    first_edge, last_edge = values.min(), values.max()
+    if first_edge == last_edge:
+        first_edge = first_edge - 0.5
+        last_edge = last_edge + 0.5
+    return np.linspace(first_edge, last_edge, num_bins + 1, dtype=np.result_type(values, float))
+
+
+
+#----- Grouped reductions over a bin index -----
+
+def _axis_bins(coords, origin, bin_sizes):
+    #Bin of every point along each axis of a regular grid
+    return [np.floor((coords[:,d] - origin[d])/bin_sizes[d]).astype(np.intp) for d in range(coords.shape[1])]
+
+
+def _axis_bins_mm(coords, origin_mm, bin_sizes_mm):
+    #Bin of every point along each axis of a regular grid in whole millimeters (the resolution of the
+    #sensor coordinates), a point on an edge always falls in the bin that starts there
+    indices = []
+    for d in range(coords.shape[1]):
+        mm = coords[:,d].astype('float64')
+        mm *= 1000.0
+        np.rint(mm, out=mm)
+        index = mm.astype(np.intp)
+        index -= origin_mm[d]
+        index //= bin_sizes_mm[d]
+        indices.append(index)
+    return indices
+
+
+def _bin_keys(indices, shape):
+    #Points inside the grid and the linear (C order) bin index of each of them
+    in_grid = np.ones(indices[0].shape[0], dtype='bool')
+    for index, n in zip(indices, shape):
+        in_grid &= (index >= 0) & (index < n)
+    if in_grid.all():
+        return in_grid, np.ravel_multi_index(indices, shape)
+    return in_grid, np.ravel_multi_index([index[in_grid] for index in indices], shape)
+
+
+def _table_fits(num_bins, num_points):
+    #Whether a per-bin table (bincount) is cheaper than sorting the points
+    return num_bins <= max(4*num_points, 1 << 16)
+
+
+class BinIndex:
+    """
+    Linear bin key of every point of a cloud over a regular 2D or 3D grid, computed once and
+    shared by per-bin reductions. The points are grouped by key (a bincount table when the
+    grid is small compared to the cloud, a sort otherwise), so every reduction is a single
+    O(N) pass over the occupied bins, and the k-th order statistics one O(N log N) sort.
+    
+    Parameters
+    ----------
+        coords : numpy array
+            coordinates of shape (# points, D), D = 2 or 3 (e.g. data[:,:2] for x-y bins)
+        origin : sequence of floats
+            lower corner of the grid in each dimension
+        bin_sizes : sequence of floats
+            bin side length in each dimension
+        num_bins : sequence of ints
+            number of bins in each dimension
+    
+    Attributes
+    ----------
+        shape : tuple of ints, the grid shape
+        in_grid : bool array, points inside the grid (the others are not part of any bin)
+        keys : int array, linear (C order) index of every occupied bin, ascending
+        group : int array, position in keys of the bin of every in-grid point
+        counts : int array, number of points in every occupied bin
+    
+    Notes
+    -----
+        Reductions take per-point values of all the points given to the constructor, or of
+        the in-grid points only (as returned by select() and take(), where masks are always
+        over these), and return one value per occupied bin (ordered as keys). grid() scatters
+        them into an array of the grid shape, take() back to the in-grid points.
+    """
+    
+    def __init__(self, coords, origin, bin_sizes, num_bins):
+        self._build(_axis_bins(coords, origin, bin_sizes), num_bins)
+    
+    @classmethod
+    def from_edges(cls, coords, edges):
+        """Bins given by explicit, increasing edges per dimension (rules of np.histogramdd)."""
+        self = cls.__new__(cls)
+        indices = []
+        for d in range(coords.shape[1]):
+            index = np.searchsorted(edges[d], coords[:,d], side='right') - 1
+            #The last bin includes its right edge
+            index[coords[:,d] == edges[d][-1]] -= 1
+            indices.append(index)
+        self._build(indices, [len(e) - 1 for e in edges])
+        return self
+    
+    def _build(self, indices, num_bins):
+        self.shape = tuple(int(n) for n in num_bins)
+        self.num_bins = int(np.prod(self.shape))
+        self.in_grid, point_bins = _bin_keys(indices, self.shape)
+        self.point_bins = point_bins
+        
+        if _table_fits(self.num_bins, point_bins.shape[0]):
+            #Grid small enough for a table with one entry per bin
+            counts = np.bincount(point_bins, minlength=self.num_bins)
+            self.keys = np.flatnonzero(counts)
+            self.counts = counts[self.keys]
+            lookup = np.empty(self.num_bins, dtype=np.intp)
+            lookup[self.keys] = np.arange(self.keys.shape[0])
+            self.group = lookup[point_bins]
+        else:
+            self.keys, self.group, self.counts = np.unique(point_bins, return_inverse=True, return_counts=True)
+        self.num_groups = self.keys.shape[0]
+    
+    def select(self, values):
+        #Values of the in-grid points, values that are already selected are returned as they are
+        if self.in_grid.all() or len(values) == len(self.point_bins):
+            return values
+        return values[self.in_grid]
+    
+    def take(self, bin_values):
+        #Value of its bin for every in-grid point
+        return bin_values[self.group]
+    
+    def grid(self, bin_values, fill=0, dtype=None):
+        #Dense array of the grid shape, fill in the empty bins
+        dense = np.full(self.num_bins, fill, dtype=dtype if dtype is not None else bin_values.dtype)
+        dense[self.keys] = bin_values
+        return dense.reshape(self.shape)
+    
+    def count(self, where=None):
+        if where is None:
+            return self.counts
+        return np.bincount(self.group[where], minlength=self.num_groups)
+    
+    def sum(self, values, where=None, dtype=None):
+        #Sum accumulated in point order in dtype (default: the values' dtype)
+        values = self.select(values)
+        group = self.group
+        if where is not None:
+            values, group = values[where], group[where]
+        out = np.zeros(self.num_groups, dtype=dtype if dtype is not None else values.dtype)
+        np.add.at(out, group, values)
+        return out
+    
+    def _extreme(self, ufunc, values, fill):
+        values = self.select(values)
+        out = np.full(self.num_groups, fill, dtype=values.dtype)
+        ufunc.at(out, self.group, values)
+        return out
+    
+    def min(self, values):
+        dtype = np.asarray(values).dtype
+        return self._extreme(np.minimum, values, np.inf if dtype.kind == 'f' else np.iinfo(dtype).max)
+    
+    def max(self, values):
+        dtype = np.asarray(values).dtype
+        return self._extreme(np.maximum, values, -np.inf if dtype.kind == 'f' else np.iinfo(dtype).min)
+    
+    def mean(self, values, where=None, dtype=None):
+        #Empty bins (all points excluded by where) are NaN
+        counts = self.count(where)
+        out = np.full(self.num_groups, np.nan, dtype='float64')
+        np.divide(self.sum(values, where, dtype), counts, out=out, where=counts > 0)
+        return out
+    
+    def var(self, values, ddof=0):
+        #Two pass variance in float64, NaN for bins with ddof points or fewer
+        values = self.select(values).astype('float64')
+        mean = np.bincount(self.group, values, minlength=self.num_groups)/self.counts
+        deviation = values - mean[self.group]
+        out = np.full(self.num_groups, np.nan, dtype='float64')
+        np.divide(np.bincount(self.group, deviation*deviation, minlength=self.num_groups), self.counts - ddof,
+                  out=out, where=self.counts > ddof)
+        return out
+    
+    def kth(self, values, k):
+        #k-th smallest value (k = 0 is the min) of every bin, NaN for bins with k points or fewer
+        values = self.select(values)
+        order = np.lexsort((values, self.group))
+        starts = np.cumsum(self.counts) - self.counts
+        has_k = self.counts > k
+        out = np.full(self.num_groups, np.nan, dtype=np.result_type(values, np.float32))
+        out[has_k] = values[order[starts[has_k] + k]]
+        return out
+    
+    def median(self, values):
+        #Lower median of every bin
+        values = self.select(values)
+        order = np.lexsort((values, self.group))
+        starts = np.cumsum(self.counts) - self.counts
+        return values[order[starts + (self.counts - 1)//2]]
 
 
 
 #Function to approximate average ground elevation in 10 cm bins
-#@jit
 def GroundVolumeMeasure(datapoints, ground_truth_elevations, save_above_ground, bin_size,
                         min_thresh, max_distance_enable, max_x, max_y):
     """
@@ -70,14 +359,12 @@ def GroundVolumeMeasure(datapoints, ground_truth_elevations, save_above_ground,
     
     #Determine whether to use provided max distance parameters or max distances from data
     if max_distance_enable:
-        #Prune points greater than distance thresholds from data array
+        #Prune points greater than distance thresholds from data array (one combined mask, one copy)
         #x values are strictly positive
         good_vals = datapoints[:,0] < max_x
-        datapoints = datapoints[good_vals]
         #origin is at center of y-z plane, 
-        good_vals = datapoints[:,1] < max_y /2
-        datapoints = datapoints[good_vals]
-        good_vals = datapoints[:,1] > -max_y/2 
+        good_vals &= datapoints[:,1] < max_y /2
+        good_vals &= datapoints[:,1] > -max_y/2 
         datapoints = datapoints[good_vals]
     else:
         max_x = np.max(datapoints[:,0])
@@ -90,61 +377,35 @@ def GroundVolumeMeasure(datapoints, ground_truth_elevations, save_above_ground,
     point_count = datapoints.shape[0]
     print("Max X: ",max_x," Max Y: ",max_y)
     print("Bin Size: ",bin_size)
-    #Preallocate arrays
     #Calculate number of square bins in area along both axes
     num_bins_x = int(max_x/bin_size)
     num_bins_y = int(max_y/bin_size)
     
-    #Init. array of zeros for sum of height values
-    sum_z = np.zeros((num_bins_x,num_bins_y),dtype='float32')
+    #Bin of each point in the x-y grid, points outside of the grid are not considered
+    bins = BinIndex(datapoints[:,:2], (0.0, 0.0), (bin_size, bin_size), (num_bins_x, num_bins_y))
+    z = bins.select(datapoints[:,2])
     
-    #Array of minimum heights in each bin, preset to large number
-    min_z = np.full((num_bins_x,num_bins_y), 10000)
-    
-    #Init. array of zeros for count of considered points in each bin
-    count_z = np.zeros((num_bins_x,num_bins_y),dtype='int32')
+    #Per bin min, then sum and count of the points within min_thresh of it
+    if _backend == 'numba':
+        sum_z, count_z, near_min = _ground_reduce_numba(bins.group, np.ascontiguousarray(z), bins.num_groups, float(min_thresh))
+    else:
+        min_z = bins.min(z)
+        near_min = z <= (bins.take(min_z).astype('float64') + min_thresh)
+        #(sums accumulate in point order in float32, the same as the point-by-point loop)
+        sum_z = bins.sum(z, where=near_min)
+        count_z = bins.count(where=near_min)
     
-    #If flag, initialize mask for indices corresponding to points above ground threshold
+    #If flag, mask of the points above ground threshold
     if save_above_ground:
         above_ground_mask = np.zeros(point_count, dtype='bool')
-        
-    #Compute bin indices for each point
-    x_bin = np.floor(datapoints[:,0]/bin_size).astype(int)
-    y_bin = np.floor(datapoints[:,1]/bin_size).astype(int)
-    #First pass: find min height of cloud points in each bin
-    print("starting find min")
-    for p1 in range(point_count):
-        
-        #x_bin = np.floor(datapoints[p1,0]/bin_size)
-        #y_bin = np.floor(datapoints[p1,1]/bin_size)
-        #replace current min with new point if less than
-        min_z[x_bin[p1],y_bin[p1]] = min(min_z[x_bin[p1],y_bin[p1]], datapoints[p1,2])
-        
-    #Second pass: if each point is within tolerance of min, 
-    #add height to sum and add 1 to count
-    print("Ending find min, starting averaging")
-    for p2 in range(point_count):
-        #Indices of which bin each point belongs to (*10 so that indexing and 
-        # bin size in cm are equal)
-        #x_bin = math.floor(datapoints[p2,0]/bin_size-1)
-        #y_bin = math.floor(datapoints[p2,1]/bin_size-1)
-        #Check height w.r.t bin minimum and threshold
-        if datapoints[p2,2] <= (min_z[x_bin[p1],y_bin[p1]] + min_thresh):
-            count_z[x_bin[p1],y_bin[p1]] += 1
-            sum_z[x_bin[p1],y_bin[p1]] += datapoints[p2,2]
-            
-        elif save_above_ground:
-            above_ground_mask[p2] = True
+        above_ground_mask[np.flatnonzero(bins.in_grid)[~near_min]] = True
+    
     print("Computing results")
     #elementwise division between bin sum and bin count arrays for 
-    #arithmetic mean per bin
-    avg_height = np.divide(sum_z,count_z)
-    #Replace NaN values from x/0 with 0
-    #Note: np.nan_to_num is not supported by Numba, must do manually
-    shape = avg_height.shape
-    avg_height = avg_height.ravel()
-    avg_height[np.isnan(avg_height)] = 0
-    avg_height = avg_height.reshape(shape)
+    #arithmetic mean per bin, empty bins are 0
+    avg_height = np.zeros(bins.num_groups, dtype='float64')
+    np.divide(sum_z, count_z, out=avg_height, where=count_z > 0)
+    avg_height = bins.grid(avg_height, fill=0)
     #Subtract ground elevation to get snowpack height estimate
     avg_elevations = avg_height - ground_truth_elevations
     
@@ -159,7 +420,75 @@ def GroundVolumeMeasure(datapoints, ground_truth_elevations, save_above_ground,
     return avg_elevations, air_points
 
 
-def Binning3D(data, binSizes, useDistanceParams, maxDistances):
+class SparseVoxels:
+    """
+    Occupied voxels of a 3D point count grid, the sparse output of Binning3D.
+    
+    Attributes
+    ----------
+        index : numpy array of dtype uint32
+            linear (C order) index of every occupied voxel, ascending
+        count : numpy array of dtype uint16
+            number of points in every occupied voxel (uint32 if a voxel holds more than 65535)
+        shape : tuple of ints
+            shape of the dense grid
+        edges : list of numpy arrays or None
+            bin edges along x, y and z
+    """
+    
+    def __init__(self, index, count, shape, edges=None):
+        self.shape = tuple(int(n) for n in shape)
+        #Smallest dtypes that hold the values (uint32 index / uint16 count unless they overflow)
+        self.index = np.asarray(index).astype('uint32' if np.prod(self.shape) <= 2**32 else 'int64')
+        count = np.asarray(count)
+        self.count = count.astype('uint16' if count.size == 0 or count.max() <= 65535 else 'uint32')
+        self.edges = edges
+    
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.count.nbytes
+    
+    def to_dense(self, dtype='float64'):
+        #Dense grid of the point counts, as returned by np.histogramdd
+        dense = np.zeros(int(np.prod(self.shape)), dtype=dtype)
+        dense[self.index] = self.count
+        return dense.reshape(self.shape)
+    
+    def save(self, filename):
+        #Uncompressed .npz holding index, count, shape (and the edges if known)
+        arrays = {'index': self.index, 'count': self.count, 'shape': np.array(self.shape, dtype='int64')}
+        if self.edges is not None:
+            for axis, edges in zip('xyz', self.edges):
+                arrays['edges_' + axis] = edges
+        np.savez(filename, **arrays)
+
+
+def LoadDensity3D(filename, densify=True):
+    """
+    Loads a 3D density file saved by the processor, dense (.npy) or sparse (.npz).
+    
+    Parameters
+    ----------
+        filename : str
+            path of the _3d_density_N file
+        densify : bool
+            return a sparse file as a dense float64 grid instead of a SparseVoxels
+    
+    Returns
+    -------
+        density3d : numpy array, or SparseVoxels if the file is sparse and densify is False
+    """
+    if not str(filename).endswith('.npz'):
+        return np.load(filename)
+    with np.load(filename) as archive:
+        edges = None
+        if 'edges_x' in archive:
+            edges = [archive['edges_' + axis] for axis in 'xyz']
+        voxels = SparseVoxels(archive['index'], archive['count'], archive['shape'], edges)
+    return voxels.to_dense() if densify else voxels
+
+
+def Binning3D(data, binSizes, useDistanceParams, maxDistances, outputMode='dense', maxDenseBytes=64 * 1024 * 1024):
     """
     Returns a 3D numpy array representing the density of point cloud points in
     bins over a defined 3D volume. Can be conceptualized as a 3D histogram.
@@ -176,13 +505,17 @@ def Binning3D(data, binSizes, useDistanceParams, maxDistances):
             distances under consideration or whether to consider the entire range of points
         bin_size : tuple of floats
             set max distance in each direction under consideration for density
-        
+        outputMode : str
+            'dense', 'sparse', or 'auto' (sparse when the dense grid would exceed maxDenseBytes)
+        maxDenseBytes : int
+            memory budget of the dense float64 grid in 'auto' mode
             
     
     Returns
     -------
         hist3d: np.array containing point counts in each bin. See documentation for
-        np.histogramdd for more information
+        np.histogramdd for more information. In sparse mode a SparseVoxels holding
+        only the occupied voxels (see LoadDensity3D to densify a saved one)
     """
     #find max value of each coordinate (x,y,z) in data array
     max_values_data = np.max(data, axis=0)
@@ -223,7 +556,84 @@ def Binning3D(data, binSizes, useDistanceParams, maxDistances):
 #     print(numBinsApprox)
 #     print('*'*40)
 
-    #numpy function call
-    hist3d,bins = np.histogramdd(data, numBinsApprox)
+    #Sparse output when asked for, or when the dense float64 grid would not fit the budget
+    sparse = outputMode == 'sparse' or (outputMode == 'auto' and int(np.prod(numBinsApprox)) * 8 > maxDenseBytes)
+    
+    #grouped count over the histogramdd bin edges, or the Numba kernel with the same edges
+    if sparse:
+        if data.shape[0] and min(numBinsApprox) > 0:
+            edges = [_histogram_edges(data[:,i], numBinsApprox[i]) for i in range(3)]
+            bins = BinIndex.from_edges(data, edges)
+            hist3d = SparseVoxels(bins.keys, bins.counts, bins.shape, edges)
+        else:
+            hist3d = SparseVoxels(np.empty(0), np.empty(0), numBinsApprox)
+    elif _backend == 'numba' and data.shape[0] and min(numBinsApprox) > 0:
+        edges = [_histogram_edges(data[:,i], numBinsApprox[i]) for i in range(3)]
+        hist3d = _histogram3d_numba(data, edges[0], edges[1], edges[2], np.zeros(numBinsApprox, dtype='float64'))
+    elif data.shape[0] and min(numBinsApprox) > 0:
+        #Point count per voxel, same edges and edge rules as np.histogramdd
+        bins = BinIndex.from_edges(data, [_histogram_edges(data[:,i], numBinsApprox[i]) for i in range(3)])
+        hist3d = bins.grid(bins.count(), fill=0, dtype='float64')
+    else:
+        hist3d,bins = np.histogramdd(data, numBinsApprox)
         
-    return hist3d
\ No newline at end of file
+    return hist3d
+
+
+def FixedBinning3D(data, origin, binSizes, numBins, countDtype='uint16', outputMode='dense', maxDenseBytes=64 * 1024 * 1024):
+    """
+    Point counts over a fixed 3D grid, so the grids of all records share the same voxels.
+    Fast path of Binning3D: one linear bin index per point and a bincount (or a sort of the
+    bin indices for grids much larger than the cloud), with compact unsigned integer counts.
+    Bins are assigned in whole millimeters (origin and bin sizes are rounded to them), so a
+    point on a bin edge is counted in the bin that starts at that edge.
+    
+    Parameters
+    ----------
+        data : numpy array of dtype float32
+            point cloud data of shape (# points, 3) containing x,y,z coords
+        origin : tuple of floats
+            lower corner of the grid in x,y,z (meters)
+        binSizes : tuple of floats
+            bin size in x,y,z (meters)
+        numBins : tuple of ints
+            number of bins in x,y,z, points outside of the grid are not counted
+        countDtype : str
+            unsigned integer dtype of the counts, counts above its max are saturated
+        outputMode : str
+            'dense', 'sparse', or 'auto' (sparse when the dense grid would exceed maxDenseBytes)
+        maxDenseBytes : int
+            memory budget of the dense count grid in 'auto' mode
+    
+    Returns
+    -------
+        hist3d: np.array of shape numBins and dtype countDtype, or SparseVoxels in sparse mode
+    """
+    shape = tuple(int(n) for n in numBins)
+    num_bins = int(np.prod(shape))
+    count_max = np.iinfo(countDtype).max
+    origin_mm = [int(round(o*1000)) for o in origin]
+    bin_sizes_mm = [max(int(round(s*1000)), 1) for s in binSizes]
+    in_grid, point_bins = _bin_keys(_axis_bins_mm(data, origin_mm, bin_sizes_mm), shape)
+    
+    #Occupied bins and their counts
+    if _table_fits(num_bins, point_bins.shape[0]):
+        counts = np.bincount(point_bins, minlength=num_bins)
+        keys = None
+    else:
+        keys, counts = np.unique(point_bins, return_counts=True)
+    counts = np.minimum(counts, count_max).astype(countDtype)
+    
+    sparse = outputMode == 'sparse' or (outputMode == 'auto' and num_bins * np.dtype(countDtype).itemsize > maxDenseBytes)
+    if sparse:
+        if keys is None:
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        edges = [(origin_mm[d] + bin_sizes_mm[d]*np.arange(shape[d] + 1))/1000.0 for d in range(3)]
+        return SparseVoxels(keys, counts, shape, edges)
+    
+    if keys is None:
+        return counts.reshape(shape)
+    hist3d = np.zeros(num_bins, dtype=countDtype)
+    hist3d[keys] = counts
+    return hist3d.reshape(shape)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# Module for recording and replaying the raw Livox UDP datagrams received by openpylivox.
+
+# A raw capture file starts with the ASCII header "OPENPYLIVOX_RAW" and is followed by one
+# record per datagram, appended in arrival order:
+#     arrival time (float64, seconds since the epoch), source (uint8, 0 = data, 1 = IMU),
+#     length (uint16), datagram bytes
+# Files are only ever appended to, so several sessions can be collected into the same file
+# and a file cut short by a power loss stays readable up to its last complete record.
+
+# Replaying a capture resends the datagrams to the data/IMU capture sockets at the original
+# speed, a multiple of it, or as fast as possible, so a field capture can be pushed through
+# _dataCaptureThread and PointCloudProcessor as often as needed.
+
+# With batch receive the data datagrams read by one recv_into batch share the arrival time of
+# the batch, so data datagrams are replayed by their Livox packet timestamps instead (IMU
+# datagrams follow the data datagram they arrived after). Arrival times are used before the
+# first timestamped data datagram, for captures without any, and across jumps of the sensor
+# clock (time synchronization, appended sessions).
+
+#     python rawcapture.py storm.raw 127.0.0.1 56001 --imu-port 56002 --speed 2
+
+# Written for the SnowMeasureLivox-NCAR project, found at:
+#     https://github.com/fwadswor/SnowMeasureLivox-NCAR
+
+
+#Import necessary libraries
+import argparse
+import socket
+import struct
+import time
+
+
+RAW_HEADER = b"OPENPYLIVOX_RAW"
+SOURCE_DATA = 0
+SOURCE_IMU = 1
+
+_RECORD = struct.Struct('<dBH')
+_TIMESTAMP_NS = struct.Struct('<Q')
+_TIMESTAMP_UTC = struct.Struct('<BBBBI')
+
+
+def _sensorTime(datagram):
+
+    # Livox timestamp of a data datagram in seconds (UTC timestamps: seconds into the day), None if not a point packet
+    if len(datagram) < 18 or datagram[0] != 5:
+        return None
+    timestamp_type = datagram[8]
+    if timestamp_type == 0 or timestamp_type == 1 or timestamp_type == 4:
+        return _TIMESTAMP_NS.unpack_from(datagram, 10)[0] / 1e9
+    if timestamp_type == 3:
+        year, month, day, hour, microsec = _TIMESTAMP_UTC.unpack_from(datagram, 10)
+        return hour * 3600.0 + microsec / 1e6
+    return None
+
+
+class RawRecorder(object):
+
+    def __init__(self, filePathAndName, bufferSize=1024 * 1024):
+
+        self.filePathAndName = filePathAndName
+        self.datagrams = 0
+        # buffered so a datagram costs two memory copies, not a system call
+        self._file = open(filePathAndName, "ab", bufferSize)
+        if self._file.tell() == 0:
+            self._file.write(RAW_HEADER)
+
+    def write(self, source, datagram, arrival=None):
+
+        if arrival is None:
+            arrival = time.time()
+        self._file.write(_RECORD.pack(arrival, source, len(datagram)))
+        self._file.write(datagram)
+        self.datagrams += 1
+
+    def close(self):
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def readRawCapture(filePathAndName, chunkSize=4 * 1024 * 1024):
+
+    # yields (arrival time, source, datagram) for every complete record in the file
+    with open(filePathAndName, "rb") as rawFile:
+        if rawFile.read(len(RAW_HEADER)) != RAW_HEADER:
+            raise ValueError("not an OPENPYLIVOX_RAW capture file: " + str(filePathAndName))
+
+        buffer = b''
+        pos = 0
+        while True:
+            chunk = rawFile.read(chunkSize)
+            if not chunk:
+                break
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            end = len(buffer)
+            while pos + _RECORD.size <= end:
+                arrival, source, length = _RECORD.unpack_from(buffer, pos)
+                start = pos + _RECORD.size
+                if start + length > end:
+                    break
+                yield arrival, source, buffer[start:start + length]
+                pos = start + length
+
+
+def replayRawCapture(filePathAndName, dataAddress, imuAddress=None, speed=1.0, maxGap=1.0, stop=None, sock=None):
+
+    # speed 1 = original timing, 2 = twice as fast, ..., 0 = as fast as possible
+    # gaps longer than maxGap seconds (e.g. between appended sessions) are shortened to maxGap
+    # stop is an optional callable, the replay ends early once it returns True
+    # returns the number of datagrams sent
+    ownSocket = sock is None
+    if ownSocket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+
+    sent = 0
+    lastArrival = None
+    lastClock = None
+    # replay time of the current datagram (seconds after the start) and the (sensor time, replay time) data
+    # datagrams are scheduled from
+    replayTime = 0.0
+    anchor = None
+    startTime = time.perf_counter()
+
+    try:
+        for arrival, source, datagram in readRawCapture(filePathAndName):
+            if stop is not None and stop():
+                break
+
+            if source == SOURCE_IMU:
+                address = imuAddress
+            else:
+                address = dataAddress
+            if address is None:
+                continue
+
+            if speed > 0:
+                clock = _sensorTime(datagram) if source == SOURCE_DATA else None
+                continuous = clock is not None and lastClock is not None and 0.0 <= clock - lastClock <= maxGap
+                if continuous:
+                    replayTime = max(replayTime, anchor[1] + (clock - anchor[0]) / speed)
+                elif lastArrival is not None and (clock is not None or anchor is None):
+                    replayTime += min(max(arrival - lastArrival, 0.0), maxGap) / speed
+                if clock is not None:
+                    if not continuous:
+                        anchor = (clock, replayTime)
+                    lastClock = clock
+                lastArrival = arrival
+                wait = startTime + replayTime - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+
+            try:
+                sock.sendto(datagram, address)
+            except OSError:
+                # receiver buffer full (loopback), the datagram is lost like on the wire
+                pass
+            sent += 1
+    finally:
+        if ownSocket:
+            sock.close()
+
+    return sent
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Replay an OPENPYLIVOX_RAW capture to the openpylivox data/IMU sockets")
+    parser.add_argument("file", help="raw capture file")
+    parser.add_argument("ip", help="computer IP the capture sockets are bound to")
+    parser.add_argument("data_port", type=int, help="data socket port")
+    parser.add_argument("--imu-port", type=int, default=0, help="IMU socket port (IMU datagrams are skipped if not given)")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of the original speed, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    imuAddress = (args.ip, args.imu_port) if args.imu_port else None
+    replayTime = time.perf_counter()
+    sent = replayRawCapture(args.file, (args.ip, args.data_port), imuAddress, args.speed)
+    replayTime = time.perf_counter() - replayTime
+    print("Replayed " + str(sent) + " datagrams in " + "{0:.2f}".format(replayTime) + " s")
+
+
+if __name__ == '__main__':
+    main()
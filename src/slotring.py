@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+# Module with a ring of point cloud buffers in shared memory, used to hand records
+# from the openpylivox capture thread to the PointCloudProcessor process.
+
+# The ring holds K equally sized slots in one mp.shared_memory segment. Every slot has
+# an ownership state (FREE -> FILLING -> READY -> PROCESSING -> FREE) kept in an mp.Array,
+# and slot indices are passed between the two sides through two mp.Queues:
+#     free queue  : slots the capture side may fill next
+#     ready queue : (slot, null points, filename) of records waiting to be processed
+# With K >= 2 the capture of record N+1 overlaps the processing of record N, so a session
+# is bounded by the slower of the two instead of by their sum.
+# The capture side ends a session with finish(), so a processor waiting on next() with a
+# timeout can stop instead of waiting for a record that will never come.
+
+# Written for the SnowMeasureLivox-NCAR project, found at:
+#     https://github.com/fwadswor/SnowMeasureLivox-NCAR
+
+
+#Import necessary libraries
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SlotRing:
+
+    #Slot ownership states
+    FREE = 0
+    FILLING = 1
+    READY = 2
+    PROCESSING = 3
+
+    def __init__(self, num_slots, num_points, name='SHARED_RING'):
+
+        if num_slots < 1:
+            raise ValueError("SlotRing needs at least one slot")
+
+        self.num_slots = int(num_slots)
+        self.num_points = int(num_points)
+        self.name = name
+
+        #Create one segment for all slots (num_points * 3 coords per point * 4 bytes per coord per slot)
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=self.num_slots * self.num_points * 12)
+        self._owner = True
+        self._state = mp.Array('b', self.num_slots)
+        self._free = mp.Queue()
+        self._ready = mp.Queue()
+        self._finished = mp.Event()
+        self._bind()
+
+        for slot in range(self.num_slots):
+            self._free.put(slot)
+
+    def _bind(self):
+        #Bind the shared segment to one (num_points, 3) float32 array per slot
+        ring = np.ndarray((self.num_slots, self.num_points, 3), dtype='float32', buffer=self._shm.buf)
+        self._arrays = [ring[slot] for slot in range(self.num_slots)]
+
+    def __getstate__(self):
+        #Child processes re-attach to the segment by name instead of pickling its contents
+        state = self.__dict__.copy()
+        del state['_shm']
+        del state['_arrays']
+        state['_owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        self._bind()
+
+    def array(self, slot):
+        return self._arrays[slot]
+
+    def state(self, slot):
+        return self._state[slot]
+
+    #----- capture side -----
+
+    def acquire(self, timeout=None):
+        #Take a free slot for filling, returns None if none became free within timeout (seconds)
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self._state[slot] = self.FILLING
+        return slot
+
+    def publish(self, slot, null_points, filename):
+        #Hand a filled slot to the processor
+        self._state[slot] = self.READY
+        self._ready.put((slot, int(null_points), filename))
+
+    def finish(self):
+        #No more records will be published (end of the session)
+        self._finished.set()
+
+    #----- processor side -----
+
+    def next(self, timeout=None):
+        #Take the oldest ready record, returns (slot, null points, filename) or None on timeout
+        try:
+            slot, null_points, filename = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self._state[slot] = self.PROCESSING
+        return slot, null_points, filename
+
+    def finished(self):
+        #Whether the capture side has ended the session
+        return self._finished.is_set()
+
+    def release(self, slot):
+        #Return a processed slot to the capture side
+        self._state[slot] = self.FREE
+        self._free.put(slot)
+
+    def close(self):
+        self._arrays = []
+        self._shm.close()
+
+    def unlink(self):
+        #Only the creating process removes the segment
+        if self._owner:
+            self._shm.unlink()